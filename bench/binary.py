@@ -0,0 +1,44 @@
+"""Binary AST size and load time against the repr: python -m bench.binary [copies] [repeat]"""
+
+import pickle
+from sys import argv
+from time import perf_counter
+from typing import Any, Callable
+
+from njc.binary import dump, load
+from njc.lexer import Lexer
+from njc.lib import ASTNode, source
+from njc.parser import Parser
+
+from .parser import PROGRAM
+
+
+def best(func: Callable[[], Any], repeat: int) -> float:
+    result = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        result = min(result, perf_counter() - start)
+    return result
+
+
+def main() -> None:
+    copies = int(argv[1]) if len(argv) > 1 else 500
+    repeat = int(argv[2]) if len(argv) > 2 else 3
+    source["<bench>"] = [PROGRAM] * copies
+    tree = Parser(Lexer("<bench>").lex_buffer(), "<bench>").parse()
+    text = repr(tree)
+    data = dump(tree)
+    pickled = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+    assert repr(load(data)) == text
+    rows = (
+        ("repr", len(text), best(lambda: repr(tree), repeat), best(lambda: eval(text, {"ASTNode": ASTNode}), repeat)),
+        ("pickle", len(pickled), best(lambda: pickle.dumps(tree, pickle.HIGHEST_PROTOCOL), repeat), best(lambda: pickle.loads(pickled), repeat)),
+        ("binary", len(data), best(lambda: dump(tree), repeat), best(lambda: load(data), repeat)),
+    )
+    for name, size, write, read in rows:
+        print(f"{name:>6}: {size / 1024:9.1f} KiB  dump {write * 1000:8.1f} ms  load {read * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Batch compile scaling: python -m bench.build [files] [copies] [max_jobs]"""
+
+from os import cpu_count
+from os.path import join
+from sys import argv
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from njc.build import collect, compile_files, Options
+
+from .parser import PROGRAM
+
+
+def main() -> None:
+    files = int(argv[1]) if len(argv) > 1 else 64
+    copies = int(argv[2]) if len(argv) > 2 else 50
+    max_jobs = int(argv[3]) if len(argv) > 3 else cpu_count() or 1
+    with TemporaryDirectory() as directory:
+        for i in range(files):
+            with open(join(directory, f"m{i}.nj"), "w") as f:
+                f.write(PROGRAM * copies)
+        paths = collect([directory])
+        options = Options(cache_dir="")
+        jobs = 1
+        base = 0.0
+        while jobs <= max_jobs:
+            start = perf_counter()
+            results = compile_files(paths, options, jobs)
+            elapsed = perf_counter() - start
+            assert not any(i.error for i in results)
+            base = base or elapsed
+            print(f"-j{jobs:<3} {elapsed:7.3f} s  {files / elapsed:7.1f} files/s  x{base / elapsed:.2f}")
+            jobs *= 2
+
+
+if __name__ == "__main__":
+    main()
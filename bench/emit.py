@@ -0,0 +1,44 @@
+"""Tree output, repr against the streaming writers: python -m bench.emit [size_mb]
+
+The last two rows parse as well: the whole tree, then written, against top-level nodes written as they are parsed."""
+
+import tracemalloc
+from os import devnull
+from sys import argv
+from time import perf_counter
+from typing import Callable, TextIO
+
+from njc.emit import write, write_nodes
+from njc.lexer import Lexer
+from njc.lib import source, SourceFile
+from njc.parser import Parser
+
+from .generate import generate
+
+
+def run(name: str, func: Callable[[TextIO], None]) -> None:
+    with open(devnull, "w") as f:
+        start = perf_counter()
+        func(f)
+        elapsed = perf_counter() - start
+        tracemalloc.start()
+        func(f)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    print(f"{name:<8} {elapsed:6.2f} s  peak {peak / 1024 / 1024:8.1f} MB")
+
+
+def main() -> None:
+    size = int(float(argv[1]) * 1024 * 1024) if len(argv) > 1 else 2 * 1024 * 1024
+    source["<bench>"] = SourceFile("<bench>", generate("mixed", size))
+    tree = Parser(Lexer("<bench>").iter_tokens(), "<bench>").parse()
+    run("print", lambda f: print(repr(tree), file=f))
+    for i in ("repr", "jsonl", "pretty"):
+        run(i, lambda f: write(tree, f, i))
+    del tree
+    run("parse", lambda f: write(Parser(Lexer("<bench>").iter_tokens(), "<bench>").parse(), f, "jsonl"))
+    run("stream", lambda f: write_nodes(Parser(Lexer("<bench>").iter_tokens(), "<bench>").iter_parse(), "<bench>", f, "jsonl"))
+
+
+if __name__ == "__main__":
+    main()
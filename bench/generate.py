@@ -0,0 +1,134 @@
+"""Synthetic NewJack programs: python -m bench.generate [shape] [size_kb] [seed] > file.nj
+
+Programs follow grammar.bnf, restricted to the constructs the parser builds trees for: imports, variable
+declarations, functions with declarations, expression statements and returns, and comments.
+"""
+
+from random import Random
+from sys import argv
+
+SHAPES = ("declarations", "expressions", "strings", "functions", "mixed")
+# ">>" is lexed as one token, nested type arguments need the space. "<" and "**" are left out, as they were
+# when the parser could not take them, so the programs and the saved baselines keep their shape
+TYPES = ("int", "float", "str", "bool", "char", "pointer<int>", "arr<int>", "arr<pointer<float> >")
+OPERATORS = ("+", "-", "*", "/", "%", "==", "!=", ">", "<=", ">=", "&&", "||", "&", "|", "<<", ">>")
+WORDS = ("alpha", "beta", "gamma", "delta", "node", "tree", "value", "index", "count", "total", "left", "right")
+
+
+class Generator:
+    def __init__(self, seed: int = 0) -> None:
+        self.random = Random(seed)
+        self.names = 0
+
+    def name(self) -> str:
+        self.names += 1
+        return f"{self.random.choice(WORDS)}_{self.names}"
+
+    def text(self, length: int) -> str:
+        words: list[str] = []
+        while sum(len(i) + 1 for i in words) < length:
+            words.append(self.random.choice(WORDS))
+        return " ".join(words)
+
+    def literal(self) -> str:
+        kind = self.random.randrange(6)
+        if kind == 0:
+            return str(self.random.randrange(100000))
+        elif kind == 1:
+            return f"{self.random.randrange(1000)}.{self.random.randrange(1000)}"
+        elif kind == 2:
+            return f'"{self.text(self.random.randrange(4, 24))}"'
+        elif kind == 3:
+            return f"'{self.random.choice('abcxyz')}'"
+        elif kind == 4:
+            return self.random.choice(("true", "false", "NULL"))
+        return self.random.choice(WORDS)
+
+    def term(self, depth: int) -> str:
+        kind = self.random.randrange(8) if depth > 0 else 0
+        if kind <= 2:
+            return self.literal()
+        elif kind == 3:
+            return f"({self.expression(depth - 1)})"
+        elif kind == 4:
+            return self.random.choice("-!@") + self.term(depth - 1)
+        elif kind == 5:
+            arguments = ", ".join(self.expression(depth - 1) for _ in range(self.random.randrange(4)))
+            return f"{self.random.choice(WORDS)}({arguments})"
+        elif kind == 6:
+            return f"{self.random.choice(WORDS)}[{self.expression(depth - 1)}]"
+        return "[" + ", ".join(self.expression(depth - 1) for _ in range(self.random.randrange(1, 4))) + "]"
+
+    def expression(self, depth: int, terms: int = 3) -> str:
+        parts = [self.term(depth)]
+        for _ in range(self.random.randrange(terms)):
+            parts.append(self.random.choice(OPERATORS))
+            parts.append(self.term(depth))
+        return " ".join(parts)
+
+    def nested(self, depth: int) -> str:
+        # one expression with parentheses depth levels deep
+        code = self.term(0)
+        for _ in range(depth):
+            code = f"({code} {self.random.choice(OPERATORS)} {self.term(1)}) {self.random.choice(OPERATORS)} {self.term(0)}"
+        return code
+
+    def declaration(self, expression: str = "", indent: str = "") -> str:
+        kind = self.random.choice(("var", "var", "constant", "var global"))
+        return f"{indent}{kind} {self.random.choice(TYPES)} {self.name()} = {expression or self.expression(2)};\n"
+
+    def statement(self, indent: str) -> str:
+        kind = self.random.randrange(4)
+        if kind == 0:
+            return self.declaration(indent=indent)
+        elif kind == 1:
+            return f"{indent}{self.random.choice(WORDS)} {self.random.choice(('=', '+=', '-=', '*='))} {self.expression(2)};\n"
+        elif kind == 2:
+            return f"{indent}{self.random.choice(WORDS)}({self.expression(1)}, {self.expression(1)});\n"
+        return f"{indent}// {self.text(30)}\n"
+
+    def function(self, statements: int) -> str:
+        arguments = ", ".join(f"{self.random.choice(TYPES)} {self.name()}" for _ in range(self.random.randrange(4)))
+        body = "".join(self.statement("    ") for _ in range(statements))
+        return f"function {self.random.choice(TYPES)} {self.name()}({arguments}) {{\n{body}    return {self.expression(2)};\n}}\n\n"
+
+    def comment(self, length: int) -> str:
+        if self.random.randrange(2):
+            return f"// {self.text(length)}\n"
+        return f"/* {self.text(length // 2)}\n   {self.text(length // 2)} */\n"
+
+    def unit(self, shape: str) -> str:
+        if shape == "declarations":
+            if self.random.randrange(50) == 0:
+                return f"import {self.random.choice(('list', 'math', 'random'))};\n"
+            return self.declaration(self.expression(1, 2))
+        elif shape == "expressions":
+            return self.declaration(self.nested(self.random.randrange(10, 40)))
+        elif shape == "strings":
+            if self.random.randrange(2):
+                return self.comment(self.random.randrange(200, 2000))
+            return self.declaration(f'"{self.text(self.random.randrange(200, 2000))}"')
+        elif shape == "functions":
+            return self.function(self.random.randrange(100, 300))
+        return self.unit(self.random.choice(SHAPES[:-1]))
+
+    def program(self, shape: str, size: int) -> str:
+        # about size bytes of code
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown shape {shape}")
+        units: list[str] = []
+        length = 0
+        while length < size:
+            units.append(self.unit(shape))
+            length += len(units[-1])
+        return "".join(units)
+
+
+def generate(shape: str, size: int, seed: int = 0) -> str:
+    return Generator(seed).program(shape, size)
+
+
+if __name__ == "__main__":
+    shape = argv[1] if len(argv) > 1 else "mixed"
+    size = int(float(argv[2]) * 1024) if len(argv) > 2 else 64 * 1024
+    print(generate(shape, size, int(argv[3]) if len(argv) > 3 else 0), end="")
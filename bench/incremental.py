@@ -0,0 +1,43 @@
+"""Edit latency of an incrementally parsed buffer: python -m bench.incremental [lines] [edits]"""
+
+from statistics import median
+from sys import argv
+from time import perf_counter
+
+from njc.incremental import Document
+
+from .parser import PROGRAM
+
+
+def main() -> None:
+    lines = int(argv[1]) if len(argv) > 1 else 50000
+    edits = int(argv[2]) if len(argv) > 2 else 200
+    length = PROGRAM.count("\n")
+    copies = max(lines // length, 1)
+    start = perf_counter()
+    document = Document("<bench>", PROGRAM * copies)
+    full = perf_counter() - start
+    print(f"{copies * length} lines, {len(document.units)} units: full parse {full * 1000:.1f} ms")
+    # (name, line in the copy, column, replacement) of edits typed in the middle of the buffer
+    cases = [
+        ("rename a global", 14, 8, "x"),
+        ("statement in a body", 26, 4, "e = 1;\n    "),
+        ("new declaration", 1, 0, "var int z = 5;\n"),
+        ("open a function", 25, 0, "function int g() {\n"),
+    ]
+    middle = copies // 2 * length
+    for name, line, column, text in cases:
+        times = []
+        for _ in range(edits):
+            start = perf_counter()
+            document.edit((middle + line, column), (middle + line, column), text)
+            times.append(perf_counter() - start)
+            # undo, so every edit starts from the same buffer
+            end = (middle + line + text.count("\n"), len(text.rsplit("\n", 1)[-1]) + (column if "\n" not in text else 0))
+            document.edit((middle + line, column), end, "")
+        print(f"{name:<22} median {median(times) * 1000:7.3f} ms  max {max(times) * 1000:7.3f} ms  x{full / median(times):,.0f}")
+    assert not document.errors
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Interpreter micro-benchmarks: python -m bench.interpreter [iterations] [repeat] [benchmarks...]
+
+Each benchmark is a NewJack program running its operation a given number of times; the rate is operations
+per second of running, the program parsed and compiled once beforehand.
+"""
+
+from sys import argv
+from time import perf_counter
+from typing import Any
+
+from njc.interpreter import Interpreter
+from njc.lexer import Lexer
+from njc.lib import source, SourceFile
+from njc.parser import Parser
+
+# the body of a loop run n times, i counting from 0
+BENCHMARKS = {
+    "loops": "",
+    "arithmetic": "        total = (total + i * 3 - i / 7) % 1000003;\n",
+    "calls": "        total = add(total, i);\n",
+    "fib": "",
+    "arrays": "        xs[i % 64] = xs[(i + 1) % 64] + 1;\n",
+}
+# fib(n) makes about 1.6 ** n calls, so its n is chosen to match the iterations of the others
+FIB = """\
+function int fib(int n) {
+    if (n < 2) {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+
+function int main(int n) {
+    return fib(n);
+}
+"""
+
+
+def program(name: str) -> str:
+    if name == "fib":
+        return FIB
+    return (
+        "var arr<int> xs = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,\n"
+        "    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0];\n"
+        "function int add(int a, int b) {\n    return a + b;\n}\n\n"
+        "function int main(int n) {\n    var int total = 0;\n    var int i = 0;\n"
+        f"    while (i < n) {{\n{BENCHMARKS[name]}        i += 1;\n    }}\n    return total;\n}}\n"
+    )
+
+
+def measure(name: str, iterations: int, repeat: int) -> tuple[float, float, int]:
+    # (load seconds, run seconds, operations)
+    file = f"<bench {name}>"
+    source[file] = SourceFile(file, program(name))
+    start = perf_counter()
+    module = Interpreter().load(Parser(Lexer(file).iter_tokens(), file).parse())
+    compiled = perf_counter() - start
+    main: Any = module.names["main"]
+    n = iterations
+    operations = iterations
+    if name == "fib":
+        # calls of fib(n) for n = 0, 1, ... up to the largest making no more calls than the iterations
+        calls = [1, 1]
+        while calls[-1] + calls[-2] + 1 <= iterations:
+            calls.append(calls[-1] + calls[-2] + 1)
+        n = len(calls) - 1
+        operations = calls[-1]
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        main(n)
+        best = min(best, perf_counter() - start)
+    return compiled, best, operations
+
+
+def main() -> None:
+    args = argv[1:]
+    iterations = int(float(args[0])) if args else 200000
+    repeat = int(args[1]) if len(args) > 1 else 3
+    names = args[2:] or list(BENCHMARKS)
+    print(f"{'benchmark':<11} {'ops':>9} {'load ms':>10} {'run s':>7} {'ops/s':>12}")
+    for name in names:
+        compiled, run, operations = measure(name, iterations, repeat)
+        print(f"{name:<11} {operations:9} {compiled * 1000:10.2f} {run:7.3f} {operations / run:12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Lexer throughput: python -m bench.lexer [size_mb] [repeat]"""
+
+from os import remove
+from os.path import dirname, join
+from sys import argv
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+
+from njc.lexer import ENGINES, Lexer
+from njc.lib import source, SourceFile
+
+EXAMPLE = join(dirname(dirname(__file__)), "example.nj")
+
+
+def make_source(size: int) -> list[str]:
+    with open(EXAMPLE, "r") as f:
+        lines = f.readlines()
+    code: list[str] = []
+    n = 0
+    while n < size:
+        code.extend(lines)
+        n += sum(len(i) for i in lines)
+    return code
+
+
+def bench(code: list[str], engine: str, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        source["<bench>"] = code.copy()
+        start = perf_counter()
+        count = len(Lexer("<bench>", engine).lex())
+        best = min(best, perf_counter() - start)
+    return best, count
+
+
+def bench_file(path: str, mapped: bool, repeat: int) -> float:
+    # open + lex, from a file on disk
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        if mapped:
+            source[path] = SourceFile.open(path)
+        else:
+            with open(path, "r") as f:
+                source[path] = f.readlines()
+        Lexer(path).lex()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    size = int(float(argv[1]) * 1024 * 1024) if len(argv) > 1 else 1024 * 1024
+    repeat = int(argv[2]) if len(argv) > 2 else 3
+    code = make_source(size)
+    mb = sum(len(i) for i in code) / 1024 / 1024
+    print(f"source: {mb:.2f} MB")
+    for engine in ENGINES:
+        t, count = bench(code, engine, repeat)
+        print(f"{engine:>6}: {t:.3f} s  {mb / t:.2f} MB/s  {count} tokens")
+    with NamedTemporaryFile("w", suffix=".nj", delete=False) as f:
+        f.writelines(code)
+    try:
+        for name, mapped in (("readlines", False), ("mmap", True)):
+            t = bench_file(f.name, mapped, repeat)
+            print(f"{name:>9}: {t:.3f} s  {mb / t:.2f} MB/s  (open + lex)")
+    finally:
+        remove(f.name)
+
+
+if __name__ == "__main__":
+    main()
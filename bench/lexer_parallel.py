@@ -0,0 +1,41 @@
+"""Parallel lexing of one large file: python -m bench.lexer_parallel [size_mb] [max_jobs] [repeat]"""
+
+from os import cpu_count
+from sys import argv
+from time import perf_counter
+
+from njc.lexer import Lexer, split
+from njc.lib import source, SourceFile
+
+from .generate import generate
+
+
+def best(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    size = int(float(argv[1]) * 1024 * 1024) if len(argv) > 1 else 8 * 1024 * 1024
+    jobs = int(argv[2]) if len(argv) > 2 else cpu_count() or 1
+    repeat = int(argv[3]) if len(argv) > 3 else 3
+    source["<bench>"] = SourceFile("<bench>", generate("mixed", size))
+    mb = len(source["<bench>"].data) / 1024 / 1024
+    serial = Lexer("<bench>").lex_buffer()
+    t = best(lambda: split(source["<bench>"].data, jobs * 4), repeat)
+    print(f"source: {mb:.2f} MB, {len(serial)} tokens, {cpu_count()} cores; finding {jobs * 4} split points {t * 1000:.1f} ms")
+    serial_time = best(lambda: Lexer("<bench>").lex_buffer(), repeat)
+    print(f"serial   {serial_time:6.3f} s  {mb / serial_time:6.2f} MB/s")
+    for i in range(2, jobs + 1) if jobs > 1 else [2]:
+        parallel = Lexer("<bench>").lex_parallel(i)
+        assert (parallel.codes, parallel.offsets, parallel.lengths) == (serial.codes, serial.offsets, serial.lengths)
+        t = best(lambda: Lexer("<bench>").lex_parallel(i), repeat)
+        print(f"-j{i:<6} {t:6.3f} s  {mb / t:6.2f} MB/s  x{serial_time / t:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""AST node memory: python -m bench.nodes [copies]"""
+
+import tracemalloc
+from sys import argv
+from typing import Any, Callable
+
+from njc.lexer import Lexer
+from njc.lib import source
+from njc.nodes import from_ast, to_ast
+from njc.parser import Parser
+
+from .parser import PROGRAM
+
+
+def measure(tree: Any, convert: Callable[[Any], Any]) -> tuple[Any, int]:
+    # both conversions rebuild only nodes and lists and share the leaf strings, so this compares node storage
+    tracemalloc.start()
+    result = convert(tree)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def count(node: Any) -> int:
+    if isinstance(node, list):
+        return sum(count(i) for i in node)
+    elif hasattr(node, "args"):
+        return 1 + sum(count(i) for i in node.args.values())
+    return 0
+
+
+def main() -> None:
+    copies = int(argv[1]) if len(argv) > 1 else 2000
+    source["<bench>"] = [PROGRAM] * copies
+    tree = Parser(Lexer("<bench>").lex_buffer(), "<bench>").parse()
+    nodes = count(tree)
+    print(f"{nodes} nodes")
+    old, size = measure(tree, to_ast)
+    print(f"{'ASTNode':>8}: {size / 1024 / 1024:7.2f} MB  {size / nodes:6.1f} B/node")
+    _, size = measure(old, from_ast)
+    print(f"{'Node':>8}: {size / 1024 / 1024:7.2f} MB  {size / nodes:6.1f} B/node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Parser throughput: python -m bench.parser [copies] [repeat] [postfix|tree]"""
+
+from sys import argv
+from time import perf_counter
+
+from njc.lexer import Lexer
+from njc.lib import source
+from njc.parser import Parser
+
+PROGRAM = """\
+import list;
+import "<path>/userlib" as userlib;
+
+var int a = 0;
+constant int b = 1;
+var global int c = 2;
+constant global int d = b + c * b - a;
+var pointer<int> p = @a;
+var type T = type(pointer, int);
+var arr<T> p_arr = [p, @b, p];
+var int a1, a2 = 0;
+var int a4 = (a + 1) * (b - 2) / 3, a5;
+var float f = 1.5 * a4 * 2 + -a5;
+
+function int main<T>(T a, int b, arr<int> c) {
+    var int e = 4;
+    var pointer<T> p3 = @a;
+    e = e + c[b] * 2 - f(a, b, e) % 7;
+    e += b << 2 >> 1 && !e || e == b;
+    return e;
+}
+"""
+
+
+def main() -> None:
+    copies = int(argv[1]) if len(argv) > 1 else 2000
+    repeat = int(argv[2]) if len(argv) > 2 else 3
+    expression = argv[3] if len(argv) > 3 else "postfix"
+    source["<bench>"] = [PROGRAM] * copies
+    tokens = Lexer("<bench>").lex()
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        Parser(tokens, "<bench>", expression).parse()
+        best = min(best, perf_counter() - start)
+    print(f"{expression}: {len(tokens)} tokens: {best:.3f} s  {len(tokens) / best:,.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Cold CLI runs against a warm server: python -m bench.server [copies] [repeat]"""
+
+import subprocess
+import sys
+from os.path import exists, join
+from statistics import median
+from sys import argv
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+from typing import Callable
+
+from njc.server import Client, path_uri
+
+from .parser import PROGRAM
+
+
+def timed(func: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    return median(times)
+
+
+def main() -> None:
+    copies = int(argv[1]) if len(argv) > 1 else 50
+    repeat = int(argv[2]) if len(argv) > 2 else 10
+    with TemporaryDirectory() as directory:
+        path = join(directory, "main.nj")
+        with open(path, "w") as f:
+            f.write(PROGRAM * copies)
+        cache = join(directory, ".njcache")
+
+        def cli(*flags: str) -> None:
+            subprocess.run([sys.executable, "-m", "njc.main", path, *flags], check=True, stdout=subprocess.DEVNULL)
+
+        rows = [
+            ("cli, no cache", timed(lambda: cli("--no-cache"), repeat)),
+            ("cli, disk cache", timed(lambda: cli(f"--cache={cache}"), repeat)),
+        ]
+        socket = join(directory, "njc.sock")
+        server = subprocess.Popen([sys.executable, "-m", "njc.server", f"--socket={socket}", "--no-cache"])
+        try:
+            while not exists(socket):
+                sleep(0.01)
+            client = Client(socket)
+            client.request("njc/compile", {"paths": [path]})
+            rows.append(("server, compile", timed(lambda: client.request("njc/compile", {"paths": [path]}), repeat)))
+            rows.append(("server, parse + repr", timed(lambda: client.request("njc/parse", {"path": path}), repeat)))
+            uri = path_uri(path)
+            client.notify("textDocument/didOpen", {"textDocument": {"uri": uri, "text": PROGRAM * copies}})
+            line = PROGRAM.count("\n") * (copies // 2) + 14
+            edit = {"range": {"start": {"line": line, "character": 8}, "end": {"line": line, "character": 9}}, "text": "a"}
+
+            def change() -> None:
+                client.notify("textDocument/didChange", {"textDocument": {"uri": uri}, "contentChanges": [edit]})
+                client.request("njc/compile", {"paths": [path]})
+
+            rows.append(("server, edit + compile", timed(change, repeat)))
+            client.close()
+        finally:
+            server.terminate()
+            server.wait()
+    cold = rows[0][1]
+    for name, elapsed in rows:
+        print(f"{name:<24} {elapsed * 1000:9.2f} ms  x{cold / elapsed:,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Load test of the compile service: python -m bench.service [clients] [requests] [files] [batch] [jobs]"""
+
+import asyncio
+import json
+import subprocess
+import sys
+from os.path import exists, join
+from sys import argv
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+
+from .parser import PROGRAM
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def client(socket: str, paths: list[str], requests: int, latencies: list[float]) -> None:
+    # sends every request up front, like a build farm handing over its jobs, and times each file from the
+    # moment its request was written to the moment its answer arrived
+    reader, writer = await asyncio.open_unix_connection(socket, limit=2**24)
+    sent: dict[int, float] = {}
+
+    async def send() -> None:
+        for i in range(requests):
+            sent[i] = perf_counter()
+            writer.write(json.dumps({"id": i, "paths": paths}).encode() + b"\n")
+            # stalls once the service stops reading
+            await writer.drain()
+        writer.write_eof()
+
+    sender = asyncio.ensure_future(send())
+    async for line in reader:
+        answer = json.loads(line)
+        if "path" in answer:
+            assert not answer["error"], answer["error"]
+            latencies.append(perf_counter() - sent[answer["id"]])
+    await sender
+    writer.close()
+
+
+async def load(socket: str, paths: list[str], clients: int, requests: int) -> None:
+    latencies: list[float] = []
+    start = perf_counter()
+    await asyncio.gather(*(client(socket, paths, requests, latencies) for _ in range(clients)))
+    elapsed = perf_counter() - start
+    print(
+        f"{len(latencies)} files in {elapsed:.2f} s  {len(latencies) / elapsed:,.0f} files/s  "
+        f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms  p99 {percentile(latencies, 0.99) * 1000:.1f} ms"
+    )
+
+
+def main() -> None:
+    clients = int(argv[1]) if len(argv) > 1 else 8
+    requests = int(argv[2]) if len(argv) > 2 else 20
+    files = int(argv[3]) if len(argv) > 3 else 8
+    batch = int(argv[4]) if len(argv) > 4 else 16
+    jobs = int(argv[5]) if len(argv) > 5 else 0
+    with TemporaryDirectory() as directory:
+        paths = []
+        for i in range(files):
+            paths.append(join(directory, f"m{i}.nj"))
+            with open(paths[-1], "w") as f:
+                f.write(PROGRAM * 5)
+        socket = join(directory, "njc.sock")
+        command = [sys.executable, "-m", "njc.service", f"--socket={socket}", "--no-cache", f"--batch={batch}", f"-j{jobs}"]
+        service = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        try:
+            while not exists(socket):
+                sleep(0.01)
+            print(f"{clients} clients x {requests} requests x {files} files, batch {batch}")
+            asyncio.run(load(socket, paths, clients, requests))
+        finally:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == "__main__":
+    main()
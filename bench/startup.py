@@ -0,0 +1,62 @@
+"""Cold start of each njc command: python -m bench.startup [repeat]"""
+
+import subprocess
+import sys
+from os.path import join
+from statistics import median
+from sys import argv
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from .parser import PROGRAM
+
+
+def imports(command: list[str]) -> tuple[float, int]:
+    # (seconds spent importing, number of modules imported) from python -X importtime; lines look like
+    # "import time: self [us] | cumulative | imported package", nested imports indented below their importer
+    process = subprocess.run([sys.executable, "-X", "importtime", *command], capture_output=True, text=True)
+    total = 0
+    count = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        count += 1
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total / 1e6, count
+
+
+def wall(command: list[str], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        subprocess.run([sys.executable, *command], check=True, stdout=subprocess.DEVNULL)
+        times.append(perf_counter() - start)
+    return median(times)
+
+
+def main() -> None:
+    repeat = int(argv[1]) if len(argv) > 1 else 10
+    with TemporaryDirectory() as directory:
+        path = join(directory, "main.nj")
+        other = join(directory, "other.nj")
+        for i in (path, other):
+            with open(i, "w") as f:
+                f.write(PROGRAM)
+        commands = {
+            "python": ["-c", "pass"],
+            "njc --help": ["-m", "njc", "--help"],
+            "njc lex": ["-m", "njc", "lex", path],
+            "njc parse": ["-m", "njc", "parse", path, "--no-cache"],
+            "njc dump-ast": ["-m", "njc", "dump-ast", path, "--no-cache"],
+            "njc check": ["-m", "njc", "check", path, "--no-cache"],
+            "njc check -j2": ["-m", "njc", "check", path, other, "--no-cache", "-j2"],
+        }
+        for name, command in commands.items():
+            imported, count = imports(command)
+            print(f"{name:<14} imports {imported * 1000:6.1f} ms ({count:3} modules)  wall {wall(command, repeat) * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
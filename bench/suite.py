@@ -0,0 +1,131 @@
+"""Lexer and parser throughput on generated programs, against saved baselines.
+
+python -m bench.suite [size_mb] [repeat] [--save] [--check[=THRESHOLD]] [--baseline=PATH] [shapes...]
+
+--save writes the results as the new baseline; --check exits with 1 when a shape is more than THRESHOLD (0.25)
+slower or uses that much more memory than its baseline.
+"""
+
+import json
+import tracemalloc
+from os.path import dirname, exists, join
+from sys import argv
+from time import perf_counter
+from typing import Any
+
+from njc.lexer import Lexer
+from njc.lib import source, SourceFile
+from njc.nodes import Node
+from njc.parser import Parser
+
+from .generate import generate, SHAPES
+
+BASELINE = join(dirname(__file__), "baseline.json")
+THRESHOLD = 0.25
+# higher is better for throughput, lower for memory
+METRICS = {"lexer_mb_s": 1, "parser_tokens_s": 1, "peak_mb": -1}
+
+
+def count_nodes(tree: Node) -> int:
+    count = 0
+    stack: list[Any] = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Node):
+            count += 1
+            stack.extend(getattr(item, i) for i in item.fields)
+        elif isinstance(item, list):
+            stack.extend(item)
+    return count
+
+
+def measure(shape: str, size: int, repeat: int) -> dict[str, Any]:
+    code = generate(shape, size)
+    source["<bench>"] = SourceFile("<bench>", code)
+    mb = len(source["<bench>"].data) / 1024 / 1024
+    lex = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        tokens = Lexer("<bench>").lex()
+        lex = min(lex, perf_counter() - start)
+    parse = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        tree = Parser(tokens, "<bench>").parse()
+        parse = min(parse, perf_counter() - start)
+    nodes = count_nodes(tree)
+    count = len(tokens)
+    del tree, tokens
+    # lex and parse once more under tracemalloc, which slows them down too much to time
+    tracemalloc.start()
+    Parser(Lexer("<bench>").iter_tokens(), "<bench>").parse()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "mb": round(mb, 3),
+        "tokens": count,
+        "nodes": nodes,
+        "lexer_mb_s": round(mb / lex, 3),
+        "parser_tokens_s": round(count / parse),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]], threshold: float) -> list[str]:
+    regressions: list[str] = []
+    for shape, result in results.items():
+        base = baseline.get(shape)
+        if base is None:
+            continue
+        if base["nodes"] != result["nodes"] and base["mb"] == result["mb"]:
+            print(f"{shape}: {result['nodes']} nodes, baseline {base['nodes']}; the tree changed shape")
+        for metric, direction in METRICS.items():
+            change = (result[metric] - base[metric]) / base[metric] * direction
+            if change < -threshold:
+                regressions.append(f"{shape}: {metric} {result[metric]} against {base[metric]} ({change:+.0%})")
+    return regressions
+
+
+def main() -> None:
+    flags = [i for i in argv[1:] if i.startswith("--")]
+    args = [i for i in argv[1:] if not i.startswith("--")]
+    size = int(float(args[0]) * 1024 * 1024) if args else 1024 * 1024
+    repeat = int(args[1]) if len(args) > 1 else 5
+    shapes = args[2:] or list(SHAPES)
+    path = BASELINE
+    check = None
+    for i in flags:
+        if i.startswith("--baseline="):
+            path = i[len("--baseline=") :]
+        elif i == "--check":
+            check = THRESHOLD
+        elif i.startswith("--check="):
+            check = float(i[len("--check=") :])
+
+    results: dict[str, dict[str, Any]] = {}
+    print(f"{'shape':<13} {'MB':>6} {'tokens':>8} {'nodes':>8} {'lexer MB/s':>10} {'parser tok/s':>12} {'peak MB':>8}")
+    for shape in shapes:
+        result = results[shape] = measure(shape, size, repeat)
+        print(
+            f"{shape:<13} {result['mb']:6.2f} {result['tokens']:8} {result['nodes']:8} {result['lexer_mb_s']:10.2f} "
+            f"{result['parser_tokens_s']:12,} {result['peak_mb']:8.1f}"
+        )
+    baseline: dict[str, dict[str, Any]] = {}
+    if exists(path):
+        with open(path) as f:
+            baseline = json.load(f)
+    if check is not None:
+        regressions = compare(results, baseline, check)
+        for i in regressions:
+            print("regression:", i)
+        if regressions:
+            raise SystemExit(1)
+    if "--save" in flags:
+        baseline.update(results)
+        with open(path, "w") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Token storage memory: python -m bench.tokens [size_mb]"""
+
+import tracemalloc
+from sys import argv
+from typing import Callable, Sized
+
+from njc.lexer import Lexer
+from njc.lib import source
+
+from .lexer import make_source
+
+
+def measure(code: list[str], build: Callable[[Lexer], Sized]) -> tuple[int, int, int]:
+    source["<bench>"] = code.copy()
+    lexer = Lexer("<bench>")
+    tracemalloc.start()
+    tokens = build(lexer)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak, len(tokens)
+
+
+def main() -> None:
+    size = int(float(argv[1]) * 1024 * 1024) if len(argv) > 1 else 1024 * 1024
+    code = make_source(size)
+    print(f"source: {sum(len(i) for i in code) / 1024 / 1024:.2f} MB")
+    for name, build in (("list[Token]", Lexer.lex), ("TokenBuffer", Lexer.lex_buffer)):
+        current, peak, count = measure(code, build)
+        print(f"{name:>12}: {current / 1024 / 1024:7.2f} MB retained  {peak / 1024 / 1024:7.2f} MB peak  {current / count:6.1f} B/token")
+
+
+if __name__ == "__main__":
+    main()
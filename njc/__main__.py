@@ -0,0 +1,7 @@
+from sys import argv
+
+from .main import run
+
+# guarded so worker processes that re-import the main module do not start another compile
+if __name__ == "__main__":
+    run(argv[1:])
@@ -0,0 +1,157 @@
+import re
+from typing import Any
+
+from .nodes import Node, NODES, Type
+
+# "NJA" and the format version; bump the version whenever the encoding or a node's fields change
+MAGIC = b"NJA\x02"
+# ops; node kinds are NODE + their index in KINDS
+NONE, FALSE, TRUE, STRING, LIST, SHARED, KEEP, NODE = range(8)
+KINDS = tuple(NODES.values())
+KIND_TAG = {cls: NODE + i for i, cls in enumerate(KINDS)}
+SIZES = tuple(len(cls.fields) for cls in KINDS)
+LONG_VARINT = re.compile(rb"[\x80-\xff]+[\x00-\x7f]")
+
+# layout: MAGIC, varint string count, each string as varint length + UTF-8, varint op count, the ops, then the
+# varint operands of the ops that take one. The ops rebuild the tree in post-order on a stack: NONE/FALSE/TRUE
+# push a constant, STRING pushes the string at its operand index, LIST pops operand items into a list, a node
+# op pops one value per field in Node.fields order, KEEP remembers the node on top for SHARED to push again by
+# its operand index. Type nodes are kept since the parser interns them; any other node met twice is written
+# twice. Operands are a separate stream so load can take them in one step when every one of them fits in a byte
+
+
+def write_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    n = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def dump(tree: Node) -> bytes:
+    ops = bytearray()
+    operands = bytearray()
+    strings: dict[str, int] = {}
+    kept: dict[int, int] = {}
+    kind_tag = KIND_TAG
+
+    def write(value: Any) -> None:
+        cls = type(value)
+        if cls is str:
+            index = strings.get(value)
+            if index is None:
+                index = strings[value] = len(strings)
+            ops.append(STRING)
+            write_varint(operands, index)
+        elif cls is list:
+            for i in value:
+                write(i)
+            ops.append(LIST)
+            write_varint(operands, len(value))
+        elif value is None:
+            ops.append(NONE)
+        elif cls is bool:
+            ops.append(TRUE if value else FALSE)
+        elif cls in kind_tag:
+            if cls is Type:
+                index = kept.get(id(value))
+                if index is not None:
+                    ops.append(SHARED)
+                    write_varint(operands, index)
+                    return
+            for i in cls.fields:
+                write(getattr(value, i))
+            ops.append(kind_tag[cls])
+            if cls is Type:
+                ops.append(KEEP)
+                kept[id(value)] = len(kept)
+        else:
+            raise TypeError(f"Cannot serialize {cls.__name__}")
+
+    write(tree)
+    out = bytearray(MAGIC)
+    write_varint(out, len(strings))
+    for i in strings:
+        data = i.encode()
+        write_varint(out, len(data))
+        out += data
+    write_varint(out, len(ops))
+    return bytes(out + ops + operands)
+
+
+def load(data: bytes) -> Node:
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError("Not a binary AST or an unsupported format version")
+    strings: list[str] = []
+    try:
+        count, pos = read_varint(data, len(MAGIC))
+        for _ in range(count):
+            n, pos = read_varint(data, pos)
+            strings.append(data[pos : pos + n].decode())
+            pos += n
+        count, pos = read_varint(data, pos)
+    except IndexError:
+        raise ValueError("Truncated binary AST") from None
+    ops = data[pos : pos + count]
+    rest = data[pos + count :]
+    if len(ops) != count:
+        raise ValueError("Truncated binary AST")
+    # single byte operands are taken a run at a time, only the few longer ones are decoded one by one
+    values: list[int] = []
+    pos = 0
+    for m in LONG_VARINT.finditer(rest):
+        values += rest[pos : m.start()]
+        values.append(read_varint(rest, m.start())[0])
+        pos = m.end()
+    values += rest[pos:]
+    operand = iter(values).__next__
+    kinds = KINDS
+    sizes = SIZES
+    kept: list[Node] = []
+    stack: list[Any] = []
+    push = stack.append
+    try:
+        for tag in ops:
+            if tag >= NODE:
+                tag -= NODE
+                size = sizes[tag]
+                if size:
+                    node = kinds[tag](*stack[-size:])
+                    del stack[-size:]
+                    push(node)
+                else:
+                    push(kinds[tag]())
+            elif tag == STRING:
+                push(strings[operand()])
+            elif tag == NONE:
+                push(None)
+            elif tag == LIST:
+                n = operand()
+                if n:
+                    items = stack[-n:]
+                    del stack[-n:]
+                    push(items)
+                else:
+                    push([])
+            elif tag == SHARED:
+                push(kept[operand()])
+            elif tag == KEEP:
+                kept.append(stack[-1])
+            else:
+                push(tag == TRUE)
+    except (IndexError, StopIteration, TypeError):
+        raise ValueError("Malformed binary AST") from None
+    if len(stack) != 1:
+        raise ValueError("Malformed binary AST")
+    return stack[0]
@@ -0,0 +1,104 @@
+from itertools import repeat
+from os import cpu_count, walk
+from os.path import isdir, join
+from typing import Any, Iterator, Optional
+
+from .binary import dump, load
+from .cache import Cache, Stats
+from .lexer import Lexer
+from .lib import CompileError, Options, source, SourceFile
+from .nodes import Node, Root
+from .parser import Parser
+
+EXTENSION = ".nj"
+
+
+class Result:
+    # the outcome of compiling one file; exactly one of ast and error is set
+    def __init__(self, path: str, ast: Optional[Node] = None, error: str = "", stats: Optional[Stats] = None) -> None:
+        self.path = path
+        self.error = error
+        self.stats = stats if stats is not None else Stats()
+        self._ast = ast
+        self._data: Optional[bytes] = None
+
+    @property
+    def ast(self) -> Optional[Node]:
+        # a tree from a worker is only decoded when asked for
+        if self._ast is None and self._data is not None:
+            self._ast = load(self._data)
+        return self._ast
+
+    def binary(self) -> bytes:
+        if self._data is None:
+            assert self._ast is not None
+            self._data = dump(self._ast)
+        return self._data
+
+    def __getstate__(self) -> dict[str, Any]:
+        # trees cross the process boundary in the binary format, which is smaller and faster than pickle
+        state = self.__dict__.copy()
+        state["_data"] = self.binary() if not self.error else None
+        state["_ast"] = None
+        return state
+
+
+def collect(paths: list[str]) -> list[str]:
+    # files as given, directories replaced by the .nj files below them in sorted order, duplicates dropped
+    files: list[str] = []
+    for path in paths:
+        if isdir(path):
+            for root, dirs, names in walk(path):
+                dirs[:] = sorted(i for i in dirs if not i.startswith("."))
+                files.extend(join(root, i) for i in sorted(names) if i.endswith(EXTENSION))
+        else:
+            files.append(path)
+    return list(dict.fromkeys(files))
+
+
+def parse_file(path: str, options: Options, cache: Optional[Cache] = None) -> Node:
+    source[path] = SourceFile.open(path)
+    key = Cache.key(source[path].data, options.expression) if cache is not None else ""
+    ast = cache.get(key) if cache is not None else None
+    if ast is None:
+        ast = Parser(Lexer(path, options.engine).iter_tokens(), path, options.expression).parse()
+        if cache is not None:
+            cache.put(key, ast)
+    elif isinstance(ast, Root):
+        # entries are shared by files with the same content
+        ast.file = path
+    return ast
+
+
+def iter_file(path: str, options: Options) -> Iterator[Node]:
+    # the top-level nodes of path as they are parsed; the cache needs the whole tree, so it is not used
+    source[path] = SourceFile.open(path)
+    return Parser(Lexer(path, options.engine).iter_tokens(), path, options.expression).iter_parse()
+
+
+def compile_file(path: str, options: Options) -> Result:
+    cache = Cache(options.cache_dir) if options.cache_dir else None
+    stats = cache.stats if cache is not None else None
+    try:
+        return Result(path, parse_file(path, options, cache), stats=stats)
+    except CompileError as e:
+        return Result(path, error=str(e), stats=stats)
+    except Exception as e:
+        return Result(path, error=f"{type(e).__name__}: {e}", stats=stats)
+    finally:
+        # the mapped source is only needed while parsing
+        source.pop(path, None)
+
+
+def compile_files(paths: list[str], options: Options, jobs: int = 0) -> list[Result]:
+    # results come back in the order of paths whatever order the workers finish in; jobs <= 0 means one per core
+    if jobs <= 0:
+        jobs = cpu_count() or 1
+    jobs = min(jobs, len(paths))
+    if jobs <= 1:
+        return [compile_file(i, options) for i in paths]
+    # the pool machinery is a third of the import time of the compiler, load it only for parallel builds
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(jobs) as pool:
+        return list(pool.map(compile_file, paths, repeat(options), chunksize=max(1, len(paths) // (jobs * 4))))
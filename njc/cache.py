@@ -0,0 +1,138 @@
+from hashlib import sha256
+from os import getpid, makedirs, replace, scandir, unlink, utime
+from os.path import join
+from typing import Any, Optional
+
+from .binary import dump, load
+from .lib import CACHE_DIR, VERSION
+from .nodes import Node
+
+CACHE_LIMIT = 64 * 1024 * 1024
+# bytes under each cache directory as this process last counted them plus what it has written since; the
+# directory is only listed again once that passes the limit. Writes of other processes are seen at that listing
+used: dict[str, int] = {}
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def add(self, other: "Stats") -> None:
+        for i in vars(self):
+            setattr(self, i, getattr(self, i) + getattr(other, i))
+
+    def report(self) -> str:
+        return (
+            f"cache: {self.hits} hits, {self.misses} misses, {self.stores} stores, {self.evictions} evictions, "
+            f"{self.bytes_read} bytes read, {self.bytes_written} bytes written"
+        )
+
+
+class Cache:
+    # parsed trees on disk, one file per key. A key covers the source bytes, the compiler version and every
+    # option that changes the tree, so entries never need invalidating; the least recently used ones are
+    # deleted once the directory grows past limit bytes
+    def __init__(self, directory: str = CACHE_DIR, limit: int = CACHE_LIMIT) -> None:
+        self.directory = directory
+        self.limit = limit
+        self.stats = Stats()
+
+    @staticmethod
+    def key(data: Any, *options: str) -> str:
+        h = sha256(VERSION.encode())
+        for i in options:
+            h.update(b"\0" + i.encode())
+        h.update(b"\0")
+        h.update(data)
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return join(self.directory, key + ".ast")
+
+    def get(self, key: str) -> Optional[Node]:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # the modification time is the recency used for eviction; an entry evicted since it was read is a miss
+            utime(path)
+            tree = load(data)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        except Exception:
+            # a truncated or foreign entry, drop it and parse again
+            self.stats.misses += 1
+            self.remove(path)
+            return None
+        self.stats.hits += 1
+        self.stats.bytes_read += len(data)
+        return tree
+
+    def put(self, key: str, tree: Node) -> None:
+        data = dump(tree)
+        makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        # write then rename so a concurrent reader never sees a partial entry
+        temp = f"{path}.{getpid()}.tmp"
+        with open(temp, "wb") as f:
+            f.write(data)
+        replace(temp, path)
+        self.stats.stores += 1
+        self.stats.bytes_written += len(data)
+        total = used.get(self.directory)
+        # the first write of the process counts the directory, this entry included
+        total = used[self.directory] = self.size() if total is None else total + len(data)
+        if total > self.limit:
+            self.evict()
+
+    def size(self) -> int:
+        try:
+            return sum(i.stat().st_size for i in scandir(self.directory) if i.name.endswith(".ast"))
+        except FileNotFoundError:
+            return 0
+
+    def evict(self) -> None:
+        entries: list[tuple[int, int, str]] = []
+        try:
+            for i in scandir(self.directory):
+                if i.name.endswith(".ast"):
+                    try:
+                        stat = i.stat()
+                    except FileNotFoundError:
+                        # removed by another process
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, i.path))
+        except FileNotFoundError:
+            pass
+        total = sum(i[1] for i in entries)
+        if total > self.limit:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.limit:
+                    break
+                self.remove(path)
+                total -= size
+                self.stats.evictions += 1
+        used[self.directory] = total
+
+    def clear(self) -> None:
+        try:
+            for i in scandir(self.directory):
+                if i.name.endswith(".ast"):
+                    self.remove(i.path)
+        except FileNotFoundError:
+            pass
+        used.pop(self.directory, None)
+
+    @staticmethod
+    def remove(path: str) -> None:
+        try:
+            unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,187 @@
+import json
+from typing import Any, Iterable, TextIO, Union
+
+from .lib import ASTNode
+from .nodes import Node
+
+FORMATS = ("repr", "jsonl", "pretty")
+# pieces of text collected before a write to the stream
+CHUNK = 4096
+
+Tree = Union[Node, ASTNode]
+
+
+def items(node: Tree) -> list[tuple[str, Any]]:
+    # the fields of a node in repr order: value first, the rest as they are declared
+    args = list(node.args.items())
+    for i, (key, _) in enumerate(args):
+        if key == "value":
+            args.insert(0, args.pop(i))
+            break
+    return args
+
+
+class Writer:
+    # buffers small pieces into large writes
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self.parts: list[str] = []
+
+    def write(self, text: str) -> None:
+        self.parts.append(text)
+        if len(self.parts) >= CHUNK:
+            self.flush()
+
+    def flush(self) -> None:
+        self.stream.write("".join(self.parts))
+        self.parts.clear()
+
+
+def order(cls: type) -> list[tuple[str, str]]:
+    # (slot, text before the value) of a node class in repr order
+    fields = sorted(zip(cls.fields, cls.keys), key=lambda i: i[1] != "value")
+    return [(slot, "" if key == "value" else f"{key} = ") for slot, key in fields]
+
+
+ORDERS: dict[type, list[tuple[str, str]]] = {}
+
+
+def write_repr(tree: Tree, stream: TextIO) -> None:
+    # exactly repr(tree), written as it is produced. The stack holds text, which is written as is, and nodes and
+    # lists still to be rendered; strings are rendered before they are pushed, so any str popped is text
+    parts: list[str] = []
+    write = parts.append
+    stack: list[Any] = [tree]
+    push = stack.append
+    pop = stack.pop
+    containers = (Node, ASTNode, list)
+    while stack:
+        item = pop()
+        if type(item) is str:
+            write(item)
+            if len(parts) >= CHUNK:
+                stream.write("".join(parts))
+                parts.clear()
+            continue
+        pieces: list[Any] = []
+        if isinstance(item, Node):
+            fields = ORDERS.get(type(item))
+            if fields is None:
+                fields = ORDERS[type(item)] = order(type(item))
+            for slot, prefix in fields:
+                value = getattr(item, slot)
+                if value is None:
+                    continue
+                if pieces:
+                    pieces.append(", " + prefix)
+                elif prefix:
+                    pieces.append(prefix)
+                pieces.append(value if isinstance(value, containers) else repr(value))
+            write(f"ASTNode('{item.type}', ")
+            push(")")
+        elif isinstance(item, ASTNode):
+            for key, value in items(item):
+                if pieces or key != "value":
+                    pieces.append((", " if pieces else "") + ("" if key == "value" else f"{key} = "))
+                pieces.append(value if isinstance(value, containers) else repr(value))
+            write(f"ASTNode('{item.type}', ")
+            push(")")
+        elif isinstance(item, list):
+            for value in item:
+                if pieces:
+                    pieces.append(", ")
+                pieces.append(value if isinstance(value, containers) else repr(value))
+            write("[")
+            push("]")
+        else:
+            write(repr(item))
+            continue
+        pieces.reverse()
+        stack.extend(pieces)
+    stream.write("".join(parts))
+
+
+def has_nodes(value: Any) -> bool:
+    return isinstance(value, (Node, ASTNode)) or isinstance(value, list) and any(isinstance(i, (Node, ASTNode)) for i in value)
+
+
+def write_jsonl(tree: Tree, stream: TextIO, place: tuple[Any, Any, Any] = (None, None, None), count: int = 0) -> int:
+    # one JSON object per node in pre-order: {"id", "parent", "key", "index", "type", scalar fields...}. A node
+    # names its parent, the field of the parent it sits in and its place in that field when the field is a list.
+    # place is (parent, key, index) of tree, ids start at count; returns the next free id
+    writer = Writer(stream)
+    stack: list[tuple[Tree, Any, Any, Any]] = [(tree, *place)]
+    while stack:
+        node, parent, key, index = stack.pop()
+        number = count
+        count += 1
+        line: dict[str, Any] = {"id": number, "parent": parent, "key": key, "index": index, "type": node.type}
+        children: list[tuple[Tree, Any, Any, Any]] = []
+        for field, value in items(node):
+            if not has_nodes(value):
+                line[field] = value
+            elif isinstance(value, list):
+                children.extend((child, number, field, i) for i, child in enumerate(value))
+            else:
+                children.append((value, number, field, None))
+        writer.write(json.dumps(line) + "\n")
+        stack.extend(reversed(children))
+    writer.flush()
+    return count
+
+
+def write_pretty(tree: Tree, stream: TextIO, depth: int = 0, label: str = "") -> None:
+    # an indented outline, one node per line with its scalar fields, children below it labelled with the field
+    # they sit in
+    writer = Writer(stream)
+    stack: list[tuple[Tree, int, str]] = [(tree, depth, label)]
+    while stack:
+        node, depth, label = stack.pop()
+        children: list[tuple[Tree, int, str]] = []
+        scalars: list[str] = []
+        for field, value in items(node):
+            if not has_nodes(value):
+                scalars.append(f"{field}={value!r}")
+            elif isinstance(value, list):
+                children.extend((child, depth + 1, f"{field}[{i}]: ") for i, child in enumerate(value))
+            else:
+                children.append((value, depth + 1, f"{field}: "))
+        writer.write("  " * depth + label + " ".join([node.type, *scalars]) + "\n")
+        stack.extend(reversed(children))
+    writer.flush()
+
+
+def write(tree: Tree, stream: TextIO, format: str = "repr") -> None:
+    if format == "repr":
+        write_repr(tree, stream)
+        stream.write("\n")
+    elif format == "jsonl":
+        write_jsonl(tree, stream)
+    elif format == "pretty":
+        write_pretty(tree, stream)
+    else:
+        raise ValueError(f"Unknown output format {format}")
+
+
+def write_nodes(nodes: Iterable[Tree], file: str, stream: TextIO, format: str = "repr") -> None:
+    # what write() gives for the root of nodes, holding only one top-level node at a time
+    if format not in FORMATS:
+        raise ValueError(f"Unknown output format {format}")
+    if format == "repr":
+        stream.write("ASTNode('root', [")
+    elif format == "jsonl":
+        stream.write(json.dumps({"id": 0, "parent": None, "key": None, "index": None, "type": "root", "file": file}) + "\n")
+    else:
+        stream.write(f"root file={file!r}\n")
+    count = 1
+    for i, node in enumerate(nodes):
+        if format == "repr":
+            if i:
+                stream.write(", ")
+            write_repr(node, stream)
+        elif format == "jsonl":
+            count = write_jsonl(node, stream, (0, "value", i), count)
+        else:
+            write_pretty(node, stream, 1, f"value[{i}]: ")
+    if format == "repr":
+        stream.write(f"], file = {file!r})\n")
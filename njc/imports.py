@@ -0,0 +1,144 @@
+from collections import deque
+from os import cpu_count
+from os.path import abspath, dirname, isabs, join
+from typing import Iterable, Optional
+
+from . import stdlib
+from .build import compile_file, EXTENSION, Options, Result
+from .lib import ImportCycleError
+from .nodes import Import, Node, Root
+
+
+class Module:
+    # one source file of the program; every importer of a path shares the same Module
+    def __init__(self, path: str, result: Result, imports: list[str], stdlib: list[str]) -> None:
+        self.path = path
+        self.result = result
+        self.imports = imports
+        self.stdlib = stdlib
+        self.importers: list[str] = []
+
+    @property
+    def ast(self) -> Optional[Node]:
+        return self.result.ast
+
+    @property
+    def error(self) -> str:
+        return self.result.error
+
+
+def import_path(importer: str, name: str) -> str:
+    # `import "dir/userlib" as userlib;` names dir/userlib.nj relative to the importing file
+    path = name[1:-1] if name.startswith('"') and name.endswith('"') else name
+    if not path.endswith(EXTENSION):
+        path += EXTENSION
+    if not isabs(path):
+        path = join(dirname(importer), path)
+    return abspath(path)
+
+
+def stdlib_imports(ast: Optional[Node]) -> list[str]:
+    if not isinstance(ast, Root):
+        return []
+    return list(dict.fromkeys(i.name for i in ast.value if isinstance(i, Import) and not i.name.startswith('"')))
+
+
+def userlib_imports(path: str, ast: Optional[Node]) -> list[str]:
+    # stdlib imports are plain identifiers, userlib imports are string literals
+    if not isinstance(ast, Root):
+        return []
+    imports = (import_path(path, i.name) for i in ast.value if isinstance(i, Import) and i.name.startswith('"'))
+    return list(dict.fromkeys(imports))
+
+
+class Graph:
+    def __init__(self) -> None:
+        self.modules: dict[str, Module] = {}
+        # the stdlib modules imported anywhere in the program, by name
+        self.stdlib: dict[str, Root] = {}
+
+    def add(self, result: Result) -> list[str]:
+        # register a parsed file and return the files it imports
+        path = result.path
+        imports = userlib_imports(path, result.ast) if not result.error else []
+        names = stdlib_imports(result.ast) if not result.error else []
+        for i in names:
+            self.stdlib[i] = stdlib.module(i)
+        self.modules[path] = Module(path, result, imports, names)
+        return imports
+
+    def link(self) -> None:
+        # modules arrive in whatever order the pool finishes them, keep the graph itself deterministic
+        self.modules = dict(sorted(self.modules.items()))
+        for module in self.modules.values():
+            for i in module.imports:
+                self.modules[i].importers.append(module.path)
+
+    def levels(self) -> list[list[str]]:
+        # modules grouped so that each one comes after everything it imports; the modules of one level do not
+        # depend on each other and can be processed concurrently
+        remaining = {path: len(module.imports) for path, module in self.modules.items()}
+        level = sorted(path for path, count in remaining.items() if count == 0)
+        levels: list[list[str]] = []
+        while level:
+            levels.append(level)
+            following: list[str] = []
+            for path in level:
+                del remaining[path]
+                for importer in self.modules[path].importers:
+                    remaining[importer] -= 1
+                    if remaining[importer] == 0:
+                        following.append(importer)
+            level = sorted(following)
+        if remaining:
+            raise ImportCycleError(self.cycle(remaining))
+        return levels
+
+    def order(self) -> list[str]:
+        return [path for level in self.levels() for path in level]
+
+    def cycle(self, paths: Iterable[str]) -> list[str]:
+        # every module left over by levels() is on or behind a cycle; walk imports until a path repeats
+        candidates = set(paths)
+        path = min(candidates)
+        seen: dict[str, int] = {}
+        walk: list[str] = []
+        while path not in seen:
+            seen[path] = len(walk)
+            walk.append(path)
+            path = min(i for i in self.modules[path].imports if i in candidates)
+        return walk[seen[path] :] + [path]
+
+    def errors(self) -> list[Module]:
+        return [i for i in self.modules.values() if i.error]
+
+
+def resolve(paths: list[str], options: Options, jobs: int = 0) -> Graph:
+    # parse the given files and everything they import, each file once. A file is handed to the pool as soon
+    # as the first module importing it has been parsed, so independent modules are parsed side by side
+    graph = Graph()
+    seen: set[str] = set()
+
+    def discover(found: Iterable[str]) -> list[str]:
+        new = [i for i in found if i not in seen]
+        seen.update(new)
+        return new
+
+    if jobs <= 0:
+        jobs = cpu_count() or 1
+    queue = deque(discover(abspath(i) for i in paths))
+    if jobs <= 1:
+        while queue:
+            queue.extend(discover(graph.add(compile_file(queue.popleft(), options))))
+    else:
+        from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+        with ProcessPoolExecutor(jobs) as pool:
+            running: set[Future[Result]] = {pool.submit(compile_file, i, options) for i in queue}
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for i in discover(graph.add(future.result())):
+                        running.add(pool.submit(compile_file, i, options))
+    graph.link()
+    return graph
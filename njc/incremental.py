@@ -0,0 +1,166 @@
+from bisect import bisect_right
+from typing import Optional
+
+from .lexer import Lexer
+from .lib import CompileError, source, SourceFile
+from .nodes import Node, Root
+from .parser import Parser
+
+
+class Unit:
+    # the bytes [start, end) of the buffer and the top-level nodes parsed from them. start is the end of the
+    # previous unit, so units tile the whole buffer and every start is a place the lexer can begin at
+    __slots__ = ("start", "end", "nodes", "error", "location", "reach")
+
+    def __init__(
+        self, start: int, end: int, nodes: list[Node], error: str = "", location: tuple[int, int] = (-1, -1), reach: int = -1
+    ) -> None:
+        self.start = start
+        self.end = end
+        self.nodes = nodes
+        self.error = error
+        # (line, column) the error was reported at
+        self.location = location
+        # the furthest byte the parser looked at while parsing the unit, including its lookahead
+        self.reach = max(reach, end)
+
+    def move(self, delta: int) -> None:
+        self.start += delta
+        self.end += delta
+        self.reach += delta
+
+
+class Document:
+    """An edited buffer kept parsed between edits.
+
+    An edit re-lexes from the start of the first top-level unit that could have seen the changed bytes and
+    re-parses units until one ends where an old unit behind the edit started; every unit from there on is kept.
+    Moving the kept units is deferred: the offsets of units[moved:] are all off by shift, which is settled one
+    unit at a time as later edits move between places in the buffer.
+    """
+
+    def __init__(self, path: str, text: str, expression: str = "postfix") -> None:
+        self.path = path
+        self.expression = expression
+        self.code = SourceFile(path, text)
+        self.units, _ = self.reparse(self.code, 0, [], 0, 0)
+        self.moved = len(self.units)
+        self.shift = 0
+        # units with an error, always in front of moved
+        self.failed = [i for i in self.units if i.error]
+        self._ast: Optional[Root] = None
+
+    @property
+    def ast(self) -> Root:
+        if self._ast is None:
+            self._ast = Root([node for unit in self.units for node in unit.nodes], self.path)
+        return self._ast
+
+    @property
+    def errors(self) -> list[str]:
+        return [i.error for i in self.failed]
+
+    @property
+    def text(self) -> str:
+        return self.code.data.decode()
+
+    def start(self, index: int) -> int:
+        # the offset unit index starts at in the current buffer
+        if index >= len(self.units):
+            return len(self.code.data)
+        return self.units[index].start + (self.shift if index >= self.moved else 0)
+
+    def find(self, offset: int, low: int = 0) -> int:
+        # the first unit at or after low that starts at or after offset
+        high = len(self.units)
+        while low < high:
+            middle = (low + high) // 2
+            if self.start(middle) < offset:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def settle(self, index: int) -> None:
+        # apply the deferred shift to the units between moved and index, so that it covers units[index:]
+        units = self.units
+        if self.shift and index < self.moved:
+            for i in range(index, self.moved):
+                units[i].move(-self.shift)
+        elif self.shift:
+            for i in range(self.moved, index):
+                units[i].move(self.shift)
+        self.moved = index
+
+    def edit(self, start: tuple[int, int], end: tuple[int, int], text: str) -> None:
+        # replace the text between two (line, column) locations, lines counted from 1 and columns from 0
+        old = self.code
+        a = old.offset(*start)
+        b = old.offset(*end)
+        if b < a:
+            raise ValueError(f"Edit ends before it starts: {start} {end}")
+        inserted = text.encode()
+        delta = len(inserted) - (b - a)
+        data = old.data[:a] + inserted + old.data[b:]
+        # line starts before the edit stay, the ones behind it move by delta
+        starts = old.starts
+        new_starts = starts[: bisect_right(starts, a)]
+        new_starts.extend(a + i + 1 for i, c in enumerate(inserted) if c == 10)
+        new_starts.extend(map(delta.__add__, starts[bisect_right(starts, b) :]))
+        code = SourceFile(self.path, data, new_starts)
+
+        units = self.units
+        # the first unit that looked at the edited bytes, the units whose lookahead reached them, and one more
+        # whose last token may grow into the edit
+        i = self.find(a + 1) - 1
+        while i > 0 and units[i - 1].reach + (self.shift if i - 1 >= self.moved else 0) >= a:
+            i -= 1
+        i = max(i - 1, 0)
+        limit = b
+        if self.failed:
+            # errors are always parsed again, their messages hold locations
+            i = min(i, self.find(self.failed[0].start))
+            limit = max(limit, self.failed[-1].end)
+        # old units that only cover bytes behind the edit can be kept once the new parse lines up with them
+        tail, resume = self.reparse(code, self.start(i), units, self.find(limit, i + 1), delta)
+        self.settle(resume)
+        units[i:resume] = tail
+        self.moved = i + len(tail)
+        self.shift += delta
+        self.failed = [unit for unit in tail if unit.error]
+        self.code = code
+        self._ast = None
+
+    def reparse(self, code: SourceFile, start: int, old: list[Unit], index: int, delta: int) -> tuple[list[Unit], int]:
+        # parse units from start until one ends where old[index:] has a unit starting once moved by delta, then
+        # return them and the index of the first old unit to keep
+        source[self.path] = code
+        units: list[Unit] = []
+        parser = Parser(Lexer(self.path).iter_regex(start), self.path, self.expression)
+        while True:
+            while index < len(old) and self.start(index) + delta < start:
+                index += 1
+            if index < len(old) and self.start(index) + delta == start:
+                return units, index
+            try:
+                nodes = parser.parse_unit()
+            except CompileError as e:
+                # skip to the next old unit behind the error, or to the end of the buffer
+                while index < len(old) and self.start(index) + delta <= start:
+                    index += 1
+                end = self.start(index) + delta if index < len(old) else len(code.data)
+                units.append(Unit(start, end, [], str(e), e.location))
+                start = end
+                if index == len(old):
+                    return units, index
+                parser = Parser(Lexer(self.path).iter_regex(start), self.path, self.expression)
+                continue
+            if nodes is None:
+                # trailing whitespace and comments
+                if start < len(code.data):
+                    units.append(Unit(start, len(code.data), []))
+                return units, len(old)
+            end = parser.now.offset + parser.now.length
+            reach = max((i.offset + i.length for i in parser.buffer), default=end)
+            units.append(Unit(start, end, nodes, reach=reach))
+            start = end
@@ -0,0 +1,873 @@
+import operator
+import sys
+from math import fmod
+from typing import Any, Callable, Optional, TextIO, Union
+
+from .lexer import Lexer
+from .lib import get_source, ImportCycleError, source, SourceFile, Token
+from .nodes import Arr, Binary, Bool, Break, Call, Char, Continue, Depointer, Empty, Expression, Float, For, Function, If, Import, Int, Neg, Node, Not, Operator
+from .nodes import Pass, Pointer, Return, Root, String, Term, Tuple, VarDecl, Variable, Void, While
+from .parser import Parser
+
+# A program runs in two steps. compile turns the tree into nested closures: every name is resolved to a slot of
+# a frame, every operator to a Python callable and every call to its target, so running never looks at a node
+# type or a name. Expressions are closures frame -> value. Statements are closures frame -> None, or a Jump for
+# return, break and continue, which the loop or call around them handles. A frame is a list, slot 0 holds the
+# return value of its call
+Code = Callable[[list[Any]], Any]
+
+
+class RunError(Exception):
+    pass
+
+
+# Python errors a running program can cause: they are turned into a RunError at the statement they came from
+FAULTS = (ArithmeticError, AttributeError, IndexError, KeyError, RecursionError, TypeError, ValueError)
+
+
+def fault(error: Exception, location: Optional[Token], file: str) -> RunError:
+    message = "maximum recursion depth exceeded" if isinstance(error, RecursionError) else f"{type(error).__name__}: {error}"
+    if location is None:
+        return RunError(f'File "{file}"\n{message}')
+    line, column = location.location
+    return RunError(f'File "{location.file}", line {line}, in {column}\n{message}\n{get_source(location.file).line(line)}' + " " * column + "^")
+
+
+class Jump:
+    __slots__ = ("kind", "label")
+
+    def __init__(self, kind: str, label: Optional[str] = None) -> None:
+        self.kind = kind
+        self.label = label
+
+
+RETURN = Jump("return")
+CONTINUE = Jump("continue")
+BREAK = Jump("break")
+
+
+def divide(a: Any, b: Any) -> Any:
+    # C division: integers truncate toward zero
+    if type(a) is int and type(b) is int:
+        q = abs(a) // abs(b)
+        return q if (a < 0) == (b < 0) else -q
+    return a / b
+
+
+def remainder(a: Any, b: Any) -> Any:
+    # C remainder, with the sign of a
+    if type(a) is int and type(b) is int:
+        return a - b * divide(a, b)
+    return fmod(a, b)
+
+
+OPERATORS: dict[str, Callable[[Any, Any], Any]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": divide,
+    "%": remainder,
+    "**": operator.pow,
+    "<<": operator.lshift,
+    ">>": operator.rshift,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "&": operator.and_,
+    "|": operator.or_,
+}
+ASSIGNMENTS = {"=": None, "+=": "+", "-=": "-", "*=": "*", "/=": "/", "%=": "%"}
+# value of a declaration without one
+DEFAULTS = {"int": 0, "float": 0.0, "str": "", "char": "\0", "bool": False}
+
+
+def show(value: Any) -> str:
+    # values as NewJack writes them
+    if value is True:
+        return "true"
+    elif value is False:
+        return "false"
+    elif value is None:
+        return "NULL"
+    elif isinstance(value, (list, tuple)):
+        return ("[{}]" if isinstance(value, list) else "({})").format(", ".join(map(show, value)))
+    return str(value)
+
+
+class Ref:
+    # what "@" gives: a slot of a frame, or an item of an array
+    __slots__ = ("frame", "index")
+
+    def __init__(self, frame: Any, index: Any) -> None:
+        self.frame = frame
+        self.index = index
+
+    def __repr__(self) -> str:
+        return f"Ref({self.index})"
+
+
+class Routine:
+    # a compiled function; the body is filled in once every name of its module is known. A body of several
+    # statements reports its own errors, those of a lone statement are reported by the call at location
+    __slots__ = ("name", "arity", "size", "body", "file", "location")
+
+    def __init__(self, name: str, arity: int, file: str = "") -> None:
+        self.name = name
+        self.arity = arity
+        self.size = arity + 1
+        self.body: Code = nothing
+        self.file = file
+        self.location: Optional[Token] = None
+
+    def __call__(self, *args: Any) -> Any:
+        if len(args) != self.arity:
+            raise RunError(f"{self.name} takes {self.arity} arguments, {len(args)} given")
+        frame = [None, *args]
+        frame.extend([None] * (self.size - len(frame)))
+        try:
+            self.body(frame)
+        except FAULTS as e:
+            raise fault(e, self.location, self.file) from e
+        return frame[0]
+
+    def __repr__(self) -> str:
+        return f"<function {self.name}>"
+
+
+def nothing(frame: list[Any]) -> None:
+    return None
+
+
+class Scope:
+    # names of one function, or of the top level of a module, to slots of its frame; blocks nest inside it
+    def __init__(self) -> None:
+        self.blocks: list[dict[str, int]] = [{}]
+        self.size = 1
+        # labels of the loops around the code being compiled, None for a loop without one
+        self.loops: list[Optional[str]] = []
+
+    def declare(self, name: str) -> int:
+        slot = self.blocks[-1][name] = self.size
+        self.size += 1
+        return slot
+
+    def find(self, name: str) -> Optional[int]:
+        for block in reversed(self.blocks):
+            slot = block.get(name)
+            if slot is not None:
+                return slot
+        return None
+
+
+class Module:
+    def __init__(self, file: str) -> None:
+        self.file = file
+        self.scope = Scope()
+        # functions and imported modules by name
+        self.names: dict[str, Union[Routine, "Module"]] = {}
+        # the frame of the top level, which holds the variables of the module
+        self.globals: list[Any] = []
+        self.code: Code = nothing
+
+    def __repr__(self) -> str:
+        return f"<module {self.file}>"
+
+
+class Interpreter:
+    def __init__(self, expression: str = "postfix", output: Optional[TextIO] = None, stdin: Optional[Callable[[str], str]] = None, engine: str = "regex") -> None:
+        # the lexer and expression shape for the modules the interpreter parses itself
+        self.shape = expression
+        self.engine = engine
+        # the first token of the statements of the modules parsed with it, for the place of runtime errors
+        self.locations: dict[Node, Token] = {}
+        # files of the modules being compiled, innermost last
+        self.loading: list[str] = []
+        self.output = output if output is not None else sys.stdout
+        self.modules: dict[str, Module] = {}
+        self.builtins: dict[str, Callable[..., Any]] = {
+            "print": lambda *args: print(*map(show, args), file=self.output),
+            "input": stdin if stdin is not None else input,
+            "len": len,
+            "range": range,
+            "int": int,
+            "float": float,
+            "str": show,
+            "bool": bool,
+            "char": chr,
+        }
+        # what compile knows of a closure: ("local", slot) for a read of a slot of the frame, ("constant", value)
+        self.known: dict[Code, tuple[str, Any]] = {}
+        self.module = Module("")
+        self.scope = self.module.scope
+
+    def parse(self, path: str) -> Root:
+        # parse a file, keeping where its statements are
+        source[path] = SourceFile.open(path)
+        return Parser(Lexer(path, self.engine).iter_tokens(), path, self.shape, locations=self.locations).parse()
+
+    def load(self, tree: Root) -> Module:
+        # compile a module and run its top level
+        module = self.compile_module(tree)
+        module.code(module.globals)
+        return module
+
+    def run(self, tree: Root) -> Any:
+        # the top level, then main() when the module has one; the result of main
+        module = self.load(tree)
+        main = module.names.get("main")
+        if isinstance(main, Routine):
+            if main.arity:
+                raise RunError("main must not take arguments")
+            return main()
+        return None
+
+    # modules
+
+    def compile_module(self, tree: Root) -> Module:
+        module = Module(tree.file)
+        self.modules[tree.file] = module
+        outer = (self.module, self.scope)
+        self.module = module
+        self.scope = module.scope
+        self.loading.append(tree.file)
+        try:
+            functions: list[tuple[Routine, Function]] = []
+            statements: list[Node] = []
+            for node in tree.value:
+                if isinstance(node, Function):
+                    routine = module.names[node.name] = Routine(node.name, len(node.arguments), tree.file)
+                    functions.append((routine, node))
+                elif isinstance(node, Import):
+                    module.names[node.alias] = self.import_module(node.name)
+                else:
+                    statements.append(node)
+            # the top level declares the variables of the module, the functions see all of them
+            module.code = self.sequence(statements, True)
+            module.globals = [None] * module.scope.size
+            for routine, node in functions:
+                self.compile_function(routine, node)
+        finally:
+            self.module, self.scope = outer
+            self.loading.pop()
+        return module
+
+    def import_module(self, name: str) -> Module:
+        from . import stdlib
+        from .imports import import_path
+
+        if name.startswith('"'):
+            path = import_path(self.module.file, name)
+            module = self.modules.get(path)
+            if module is None:
+                module = self.load(self.parse(path))
+        else:
+            module = self.modules.get(stdlib.file_name(name))
+            if module is None:
+                module = self.load(stdlib.module(name))
+        # a module still being compiled imports, through the ones after it, the module importing it
+        if module.file in self.loading:
+            raise ImportCycleError([*self.loading[self.loading.index(module.file) :], module.file])
+        return module
+
+    def compile_function(self, routine: Routine, node: Function) -> None:
+        outer = self.scope
+        self.scope = Scope()
+        try:
+            for i in node.arguments:
+                self.scope.declare(i.name)
+            routine.body = self.block(node.body)
+            if len(node.body) == 1:
+                routine.location = self.locations.get(node.body[0])
+            routine.size = self.scope.size
+        finally:
+            self.scope = outer
+
+    # statements
+
+    def block(self, nodes: list[Node]) -> Code:
+        self.scope.blocks.append({})
+        try:
+            return self.sequence(nodes)
+        finally:
+            self.scope.blocks.pop()
+
+    def sequence(self, nodes: list[Node], outer: bool = False) -> Code:
+        # statements run one after the other until one jumps. A Python error in a statement becomes a RunError
+        # at the innermost statement of a sequence it is in; a lone statement is left to the sequence or call
+        # around it, unless the sequence is the top level of a module (outer)
+        codes = tuple(self.statement(i) for i in nodes)
+        locations = tuple(self.locations.get(i) for i in nodes)
+        file = self.module.file
+        if not codes:
+            return nothing
+        elif len(codes) == 1 and not outer:
+            return codes[0]
+        elif len(codes) == 1:
+            (code,) = codes
+
+            def run1(f: list[Any]) -> Optional[Jump]:
+                try:
+                    return code(f)
+                except FAULTS as e:
+                    raise fault(e, locations[0], file) from e
+
+            return run1
+        elif len(codes) == 2:
+            first, second = codes
+
+            def run2(f: list[Any]) -> Optional[Jump]:
+                try:
+                    jump = first(f)
+                except FAULTS as e:
+                    raise fault(e, locations[0], file) from e
+                if jump is not None:
+                    return jump
+                try:
+                    return second(f)
+                except FAULTS as e:
+                    raise fault(e, locations[1], file) from e
+
+            return run2
+
+        def run(f: list[Any]) -> Optional[Jump]:
+            for code in codes:
+                try:
+                    jump = code(f)
+                except FAULTS as e:
+                    raise fault(e, locations[codes.index(code)], file) from e
+                if jump is not None:
+                    return jump
+            return None
+
+        return run
+
+    def statement(self, node: Node) -> Code:
+        compile = STATEMENTS.get(type(node))
+        if compile is None:
+            raise RunError(f"{node.type} statements are not supported")
+        return compile(self, node)
+
+    def var(self, node: VarDecl) -> Code:
+        if isinstance(node.expression, Empty):
+            value = self.constant(DEFAULTS.get(node.var_type.type_a))
+        else:
+            value = self.expression(node.expression)
+        # declared after its value is compiled, so "var int a = a;" reads an outer a
+        slot = self.scope.declare(node.name)
+
+        def run(f: list[Any]) -> None:
+            f[slot] = value(f)
+
+        return run
+
+    def expression_statement(self, node: Expression) -> Code:
+        tree = self.tree(node)
+        if isinstance(tree, Binary) and tree.value in ASSIGNMENTS:
+            return self.assign(tree, False)
+        value = self.compile(tree)
+
+        def run(f: list[Any]) -> None:
+            value(f)
+
+        return run
+
+    def return_statement(self, node: Return) -> Code:
+        value = self.constant(None) if isinstance(node.value, Empty) else self.expression(node.value)
+
+        def run(f: list[Any]) -> Jump:
+            f[0] = value(f)
+            return RETURN
+
+        return run
+
+    def if_statement(self, node: If) -> Code:
+        condition = self.expression(node.condition)
+        body = self.block(node.body)
+        if not node.else_body:
+
+            def run(f: list[Any]) -> Optional[Jump]:
+                if condition(f):
+                    return body(f)
+                return None
+
+            return run
+        else_body = self.block(node.else_body)
+
+        def run_else(f: list[Any]) -> Optional[Jump]:
+            if condition(f):
+                return body(f)
+            return else_body(f)
+
+        return run_else
+
+    def loop(self, label: Optional[str], body: list[Node]) -> Code:
+        self.scope.loops.append(label)
+        try:
+            return self.block(body)
+        finally:
+            self.scope.loops.pop()
+
+    def while_statement(self, node: While) -> Code:
+        condition = self.expression(node.condition)
+        body = self.loop(node.label, node.body)
+        else_body = self.block(node.else_body)
+        label = node.label
+
+        def run(f: list[Any]) -> Optional[Jump]:
+            while condition(f):
+                jump = body(f)
+                if jump is not None and jump is not CONTINUE:
+                    if jump.kind != "break":
+                        return jump
+                    return None if jump.label is None or jump.label == label else jump
+            return else_body(f)
+
+        return run
+
+    def for_statement(self, node: For) -> Code:
+        iterator = self.variable(node.iterator)
+        self.scope.blocks.append({})
+        try:
+            slot = self.scope.declare(node.var.name)
+            body = self.loop(node.label, node.body)
+        finally:
+            self.scope.blocks.pop()
+        else_body = self.block(node.else_body)
+        label = node.label
+
+        def run(f: list[Any]) -> Optional[Jump]:
+            for f[slot] in iterator(f):
+                jump = body(f)
+                if jump is not None and jump is not CONTINUE:
+                    if jump.kind != "break":
+                        return jump
+                    return None if jump.label is None or jump.label == label else jump
+            return else_body(f)
+
+        return run
+
+    def break_statement(self, node: Break) -> Code:
+        loops = self.scope.loops
+        if not loops:
+            raise RunError("break outside a loop")
+        if node.label is not None and node.label not in loops:
+            raise RunError(f"break to an unknown loop {node.label}")
+        jump = BREAK if node.label is None else Jump("break", node.label)
+        return lambda f: jump
+
+    def continue_statement(self, node: Continue) -> Code:
+        if not self.scope.loops:
+            raise RunError("continue outside a loop")
+        return lambda f: CONTINUE
+
+    def pass_statement(self, node: Pass) -> Code:
+        return nothing
+
+    # expressions
+
+    def constant(self, value: Any) -> Code:
+        code: Code = lambda f: value
+        self.known[code] = ("constant", value)
+        return code
+
+    def tree(self, node: Expression) -> Node:
+        # the "tree" shape of an expression; a postfix list is rebuilt into Binary nodes
+        if not isinstance(node.value, list):
+            return node.value
+        stack: list[Node] = []
+        for i in node.value:
+            if isinstance(i, Operator):
+                right = stack.pop()
+                stack.append(Binary(i.value, stack.pop(), right))
+            else:
+                stack.append(i)
+        if len(stack) != 1:
+            raise RunError("Malformed expression")
+        return stack[0]
+
+    def expression(self, node: Node) -> Code:
+        return self.compile(self.tree(node) if isinstance(node, Expression) else node)
+
+    def compile(self, node: Node) -> Code:
+        compile = EXPRESSIONS.get(type(node))
+        if compile is None:
+            raise RunError(f"{node.type} expressions are not supported")
+        return compile(self, node)
+
+    def term(self, node: Term) -> Code:
+        assert node.value is not None
+        return self.compile(node.value)
+
+    def literal(self, node: Node) -> Code:
+        if isinstance(node, Int):
+            return self.constant(int(node.value))
+        elif isinstance(node, Float):
+            return self.constant(float(node.value))
+        elif isinstance(node, (String, Char)):
+            return self.constant(node.value[1:-1])
+        elif isinstance(node, Bool):
+            return self.constant(node.value == "true")
+        return self.constant(None)
+
+    def binary(self, node: Binary) -> Code:
+        if node.value in ASSIGNMENTS:
+            return self.assign(node, True)
+        left = self.compile(node.left)
+        right = self.compile(node.right)
+        if node.value == "&&":
+            return lambda f: bool(left(f)) and bool(right(f))
+        elif node.value == "||":
+            return lambda f: bool(left(f)) or bool(right(f))
+        op = OPERATORS.get(node.value)
+        if op is None:
+            raise RunError(f"Unknown operator {node.value}")
+        a = self.known.get(left)
+        b = self.known.get(right)
+        if a is not None and b is not None and a[0] == b[0] == "constant":
+            try:
+                return self.constant(op(a[1], b[1]))
+            except Exception:
+                pass
+        # reads of the frame and constants are done in place rather than by calling their closures
+        if a is not None and a[0] == "local":
+            i = a[1]
+            if b is not None and b[0] == "constant":
+                c = b[1]
+                return lambda f: op(f[i], c)
+            elif b is not None and b[0] == "local":
+                j = b[1]
+                return lambda f: op(f[i], f[j])
+            return lambda f: op(f[i], right(f))
+        if b is not None and b[0] == "constant":
+            c = b[1]
+            return lambda f: op(left(f), c)
+        return lambda f: op(left(f), right(f))
+
+    def unary(self, node: Node) -> Code:
+        assert isinstance(node, (Not, Neg, Pointer, Depointer))
+        if isinstance(node, Pointer):
+            return self.pointer(node.value)
+        value = self.compile(node.value)
+        if isinstance(node, Not):
+            return lambda f: not value(f)
+        elif isinstance(node, Neg):
+            return lambda f: -value(f)
+
+        def load(f: list[Any]) -> Any:
+            ref = value(f)
+            return ref.frame[ref.index]
+
+        return load
+
+    def arr_literal(self, node: Arr) -> Code:
+        items = tuple(self.expression(i) for i in node.value)
+        return lambda f: [i(f) for i in items]
+
+    def tuple_literal(self, node: Tuple) -> Code:
+        items = tuple(self.expression(i) for i in node.value)
+        return lambda f: tuple(i(f) for i in items)
+
+    # names
+
+    def resolve(self, name: str) -> tuple[str, Any]:
+        # ("local", slot), ("global", slot), ("function", routine), ("module", module) or ("builtin", callable)
+        slot = self.scope.find(name)
+        if slot is not None:
+            return "local", slot
+        module = self.module
+        if self.scope is not module.scope:
+            slot = module.scope.blocks[0].get(name)
+            if slot is not None:
+                return "global", slot
+        target = module.names.get(name)
+        if isinstance(target, Routine):
+            return "function", target
+        elif isinstance(target, Module):
+            return "module", target
+        elif name in self.builtins:
+            return "builtin", self.builtins[name]
+        raise RunError(f"{name} is not defined")
+
+    def name(self, name: str) -> Code:
+        kind, target = self.resolve(name)
+        if kind == "local":
+            code: Code = lambda f: f[target]
+            self.known[code] = ("local", target)
+            return code
+        elif kind == "global":
+            return self.global_name(self.module, target)
+        elif kind == "module":
+            raise RunError(f"{name} is a module")
+        return self.constant(target)
+
+    def global_name(self, module: Module, slot: int) -> Code:
+        # read from the functions of the module, compiled once its frame is made, and from other modules
+        values = module.globals
+        return lambda f: values[slot]
+
+    def attribute(self, node: Variable) -> Code:
+        # module.name, or the length of a value
+        assert node.attr is not None
+        kind, target = self.resolve(node.value)
+        if kind == "module":
+            return self.member(target, node.attr)
+        if node.attr.value == "length" and node.attr.index is None and node.attr.attr is None:
+            value = self.name(node.value)
+            return lambda f: len(value(f))
+        raise RunError(f"Unknown attribute {node.attr.value}")
+
+    def member(self, module: Module, node: Union[Variable, Call]) -> Code:
+        # the parser nests "module.f(x)" as a call in the attribute
+        if isinstance(node, Call):
+            if node.var.attr is not None or node.var.index is not None:
+                raise RunError(f"{module.file} has no function {node.var.value}")
+            routine = module.names.get(node.var.value)
+            args = tuple(self.expression(i) for i in node.arguments)
+            if isinstance(routine, Routine):
+                return self.call_routine(routine, args)
+            function = self.member(module, node.var)
+            return lambda f: function(f)(*[i(f) for i in args])
+        if node.attr is not None:
+            raise RunError(f"Unknown attribute {node.attr.value}")
+        slot = module.scope.blocks[0].get(node.value)
+        if slot is not None:
+            value = self.global_name(module, slot)
+        elif isinstance(module.names.get(node.value), Routine):
+            value = self.constant(module.names[node.value])
+        else:
+            raise RunError(f"{module.file} has no {node.value}")
+        return self.index(value, node.index)
+
+    def index(self, value: Code, index: Optional[Expression]) -> Code:
+        if index is None:
+            return value
+        item = self.expression(index)
+        return lambda f: value(f)[item(f)]
+
+    def variable(self, node: Union[Variable, Call]) -> Code:
+        if isinstance(node, Call):
+            return self.call(node)
+        if node.attr is not None:
+            return self.attribute(node)
+        return self.index(self.name(node.value), node.index)
+
+    def pointer(self, node: Node) -> Code:
+        # @name and @name[index]
+        variable = node.value if isinstance(node, Term) else node
+        if not isinstance(variable, Variable) or variable.attr is not None:
+            raise RunError("@ needs a variable")
+        if variable.index is not None:
+            value = self.name(variable.value)
+            item = self.expression(variable.index)
+            return lambda f: Ref(value(f), item(f))
+        kind, target = self.resolve(variable.value)
+        if kind == "local":
+            return lambda f: Ref(f, target)
+        elif kind == "global":
+            values = self.module.globals
+            return lambda f: Ref(values, target)
+        raise RunError(f"@ needs a variable, {variable.value} is a {kind}")
+
+    def store(self, node: Node) -> Callable[[Code], Code]:
+        # for the target of an assignment, a function making the closure that stores the result of a closure
+        # there and gives it back
+        node = self.unwrap(node)
+        if isinstance(node, Term) and isinstance(node.value, Depointer):
+            ref = self.compile(node.value.value)
+
+            def through(value: Code) -> Code:
+                def run(f: list[Any]) -> Any:
+                    r = ref(f)
+                    result = r.frame[r.index] = value(f)
+                    return result
+
+                return run
+
+            return through
+        if not isinstance(node, Variable):
+            raise RunError(f"Cannot assign to {node.type}")
+        if node.attr is not None:
+            kind, target = self.resolve(node.value)
+            if kind != "module" or node.attr.attr is not None:
+                raise RunError("Only variables of modules can be assigned to")
+            slot = target.scope.blocks[0].get(node.attr.value)
+            if slot is None:
+                raise RunError(f"{target.file} has no variable {node.attr.value}")
+            values = target.globals
+            return self.store_item(lambda f: values, slot, node.attr.index)
+        kind, target = self.resolve(node.value)
+        if kind == "local":
+            if node.index is None:
+
+                def local(value: Code) -> Code:
+                    def run(f: list[Any]) -> Any:
+                        result = f[target] = value(f)
+                        return result
+
+                    return run
+
+                return local
+            return self.store_item(self.name(node.value), None, node.index)
+        elif kind == "global":
+            values = self.module.globals
+            return self.store_item(lambda f: values, target, node.index)
+        raise RunError(f"Cannot assign to the {kind} {node.value}")
+
+    def store_item(self, container: Code, slot: Optional[int], index: Optional[Expression]) -> Callable[[Code], Code]:
+        # container[slot], then [index] of that when there is one
+        if index is None:
+
+            def whole(value: Code) -> Code:
+                def run(f: list[Any]) -> Any:
+                    result = container(f)[slot] = value(f)
+                    return result
+
+                return run
+
+            return whole
+        item = self.expression(index)
+        outer = container if slot is None else (lambda f: container(f)[slot])
+
+        def indexed(value: Code) -> Code:
+            def run(f: list[Any]) -> Any:
+                result = outer(f)[item(f)] = value(f)
+                return result
+
+            return run
+
+        return indexed
+
+    def assign(self, node: Binary, result: bool) -> Code:
+        # "=" and the compound assignments; as a statement (result False) a store of a slot is made directly
+        op = ASSIGNMENTS[node.value]
+        value = self.compile(node.right) if op is None else self.binary(Binary(op, node.left, node.right))
+        target = self.unwrap(node.left)
+        if not result and isinstance(target, Variable) and target.attr is None and target.index is None:
+            kind, slot = self.resolve(target.value)
+            if kind == "local":
+
+                def run(f: list[Any]) -> None:
+                    f[slot] = value(f)
+
+                return run
+        store = self.store(node.left)(value)
+        if result:
+            return store
+
+        # a statement gives None or a Jump, never the value stored
+        def statement(f: list[Any]) -> None:
+            store(f)
+
+        return statement
+
+    def unwrap(self, node: Node) -> Node:
+        while isinstance(node, Term) and node.value is not None and not isinstance(node.value, Depointer):
+            node = node.value
+        return node
+
+    def call(self, node: Call) -> Code:
+        args = tuple(self.expression(i) for i in node.arguments)
+        var = node.var
+        if var.attr is None and var.index is None:
+            kind, target = self.resolve(var.value)
+        else:
+            kind, target = "value", self.variable(var)
+        if kind == "function":
+            return self.call_routine(target, args)
+        elif kind == "builtin":
+            return self.call_builtin(target, args)
+        elif kind == "module":
+            raise RunError(f"{var.value} is a module")
+        function = self.name(var.value) if kind != "value" else target
+        return lambda f: function(f)(*[i(f) for i in args])
+
+    def call_routine(self, routine: Routine, args: tuple[Code, ...]) -> Code:
+        # the frame is built here, the arguments going to the slots after the return value
+        if len(args) != routine.arity:
+            raise RunError(f"{routine.name} takes {routine.arity} arguments, {len(args)} given")
+        if len(args) == 0:
+
+            def call0(f: list[Any]) -> Any:
+                frame = [None] * routine.size
+                try:
+                    routine.body(frame)
+                except FAULTS as e:
+                    raise fault(e, routine.location, routine.file) from e
+                return frame[0]
+
+            return call0
+        elif len(args) == 1:
+            (a,) = args
+
+            def call1(f: list[Any]) -> Any:
+                frame = [None] * routine.size
+                frame[1] = a(f)
+                try:
+                    routine.body(frame)
+                except FAULTS as e:
+                    raise fault(e, routine.location, routine.file) from e
+                return frame[0]
+
+            return call1
+        elif len(args) == 2:
+            a, b = args
+
+            def call2(f: list[Any]) -> Any:
+                frame = [None] * routine.size
+                frame[1] = a(f)
+                frame[2] = b(f)
+                try:
+                    routine.body(frame)
+                except FAULTS as e:
+                    raise fault(e, routine.location, routine.file) from e
+                return frame[0]
+
+            return call2
+        end = len(args) + 1
+
+        def call(f: list[Any]) -> Any:
+            frame = [None] * routine.size
+            frame[1:end] = [i(f) for i in args]
+            try:
+                routine.body(frame)
+            except FAULTS as e:
+                raise fault(e, routine.location, routine.file) from e
+            return frame[0]
+
+        return call
+
+    def call_builtin(self, function: Callable[..., Any], args: tuple[Code, ...]) -> Code:
+        if len(args) == 1:
+            (a,) = args
+            return lambda f: function(a(f))
+        elif len(args) == 2:
+            a, b = args
+            return lambda f: function(a(f), b(f))
+        return lambda f: function(*[i(f) for i in args])
+
+
+STATEMENTS: dict[type, Callable[[Interpreter, Any], Code]] = {
+    VarDecl: Interpreter.var,
+    Expression: Interpreter.expression_statement,
+    Return: Interpreter.return_statement,
+    If: Interpreter.if_statement,
+    While: Interpreter.while_statement,
+    For: Interpreter.for_statement,
+    Break: Interpreter.break_statement,
+    Continue: Interpreter.continue_statement,
+    Pass: Interpreter.pass_statement,
+}
+EXPRESSIONS: dict[type, Callable[[Interpreter, Any], Code]] = {
+    Term: Interpreter.term,
+    Expression: Interpreter.expression,
+    Binary: Interpreter.binary,
+    Variable: Interpreter.variable,
+    Call: Interpreter.call,
+    Arr: Interpreter.arr_literal,
+    Tuple: Interpreter.tuple_literal,
+    **{cls: Interpreter.literal for cls in (Int, Float, String, Char, Bool, Void, Empty)},
+    **{cls: Interpreter.unary for cls in (Not, Neg, Pointer, Depointer)},
+}
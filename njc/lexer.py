@@ -1,40 +1,389 @@
-from .lib import atoz, AtoZ, digit, keyword, symbol, Token, CompileError, source
+import re
+from array import array
+from itertools import repeat
+from os import cpu_count
+from typing import Iterator, NoReturn, Optional
+
+from .lib import atoz, AtoZ, CODES, digit, ENGINES, get_source, keyword, KIND_CODE, source, SourceFile, SpanToken, symbol, Token, TokenBuffer, CompileError
+
+KEYWORDS = frozenset(keyword)
+COMMENT, CHAR, STRING, INT, FLOAT, IDENTIFIER = (KIND_CODE[i] for i in ("comment", "char", "string", "int", "float", "identifier"))
+# matched against the UTF-8 bytes of the source; whitespace and characters outside ASCII are finished off
+# in Lexer.scan so the result is the same as the state engine's str-based rules
+TOKEN_RE = re.compile(
+    rb"""
+    [ \t\n\r\f\v\x1c-\x1f]*(?:
+    (?P<comment>\#[^\n]*\n?|//[^\n]*\n?|/\*[\s\S]*?(?<=\*)/|/\*[\s\S]*)
+    |(?P<number>-?[0-9]+(?:\.[0-9]*)?)
+    |(?P<identifier>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<string>"[^"]*"?)
+    |(?P<char>'(?:[^'\x80-\xff]|[\xc0-\xff][\x80-\xbf]*)')
+    |(?P<symbol>\*\*|<<|>>|==|!=|<=|>=|&&|\|\||\+=|-=|\*=|/=|%=|[()\[\]{},;:.+\-*/%<>&|=@^!])
+    |(?P<other>[^ \t\n\r\f\v\x1c-\x1f])
+    )""",
+    re.VERBOSE,
+)
+# the comments, strings and chars of TOKEN_RE. Everything between them is code, where a newline ends every token
+# before it, so the line after it is a place to cut the file for parallel lexing
+LITERAL_RE = re.compile(rb"""\#[^\n]*\n?|//[^\n]*\n?|/\*[\s\S]*?(?<=\*)/|/\*[\s\S]*|"[^"]*"?|'(?:[^'\x80-\xff]|[\xc0-\xff][\x80-\xbf]*)'""")
+# classes of the bytes of the source for the table engine; bytes from 0x80 on start a character outside ASCII,
+# they only mean something as whitespace or inside comments and literals
+OTHER, SPACE, WORD, DIGIT, MINUS, SLASH, SYMBOL, STRING_QUOTE, CHAR_QUOTE, HASH, WIDE = range(11)
+# "/*"; a "-" or "/" is classed again by the byte after it, "//" as HASH, "-1" as DIGIT
+BLOCK = 11
+SPACES = b" \t\n\r\f\v\x1c\x1d\x1e\x1f"
+LETTERS = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_"
+DIGITS = b"0123456789"
+WORD_CHARS = LETTERS + DIGITS
+CLASSES = bytearray(256)
+for chars, kind in ((SPACES, SPACE), (LETTERS, WORD), (DIGITS, DIGIT), (b"()[]{},;:.+*%<>&|=@^!", SYMBOL), (b"-", MINUS), (b"/", SLASH), (b'"', STRING_QUOTE), (b"'", CHAR_QUOTE), (b"#", HASH)):
+    for i in chars:
+        CLASSES[i] = kind
+CLASSES[0x80:] = bytes([WIDE]) * 0x80
+# symbols by their bytes to (content, code), the two-character ones are tried first
+SYMBOL_PAIRS = {i.encode(): (i, CODES[i]) for i in symbol if len(i) == 2}
+SYMBOL_CHARS = {ord(i): (i, CODES[i]) for i in symbol if len(i) == 1}
+# bytes looked at per step when skipping a run of one class
+WINDOW = 64
+# smallest piece of a file lexed on its own
+PIECE = 256 * 1024
+# bytes past its end a piece is sent with, the error checks of a quote look up to five bytes ahead
+OVERLAP = 8
+
+
+def char_length(lead: int) -> int:
+    # number of bytes in the UTF-8 sequence starting with this byte
+    if lead < 0xC0:
+        return 1
+    elif lead < 0xE0:
+        return 2
+    elif lead < 0xF0:
+        return 3
+    return 4
+
+
+def skip(data: bytes, pos: int, chars: bytes) -> int:
+    # the first offset from pos on whose byte is not one of chars
+    while True:
+        window = data[pos : pos + WINDOW]
+        rest = window.lstrip(chars)
+        pos += len(window) - len(rest)
+        if rest or not window:
+            return pos
+
+
+def split(data: bytes, parts: int) -> list[int]:
+    # offsets cutting data into at most parts pieces of about the same size, from 0 to len(data); every cut is at
+    # the start of a line and outside comments and literals
+    size = len(data)
+    points = [0]
+    pos = 0
+    literals = LITERAL_RE.finditer(data)
+    m = next(literals, None)
+    for i in range(1, parts):
+        target = size * i // parts
+        # pos is always in code, m the next literal after it
+        while True:
+            literal = size if m is None else m.start()
+            if literal > target:
+                newline = data.find(b"\n", max(pos, target), literal)
+                if newline != -1:
+                    pos = newline + 1
+                    break
+            if m is None:
+                pos = size
+                break
+            pos = m.end()
+            m = next(literals, None)
+        if pos >= size:
+            break
+        points.append(pos)
+    points.append(size)
+    return points
+
+
+def lex_piece(data: bytes, start: int, end: int, engine: str = "regex") -> tuple[array, array, array, Optional[tuple[str, tuple[int, int]]]]:
+    # (codes, offsets, lengths, error) of the tokens starting in data[:end], data being the file from byte start on.
+    # error is the message and the location in data of the first CompileError; pieces start lines, so only the
+    # line number of a location needs to be moved
+    file = f"<piece {start}>"
+    source[file] = SourceFile(file, data)
+    codes = array("B")
+    offsets = array("L")
+    lengths = array("L")
+    try:
+        for _, code, offset, length, _ in Lexer(file, engine).scan(0, end):
+            codes.append(code)
+            offsets.append(offset + start)
+            lengths.append(length)
+    except CompileError as e:
+        return codes, offsets, lengths, (e.message, e.location)
+    finally:
+        source.pop(file, None)
+    return codes, offsets, lengths, None
 
 
 class Lexer:
-    def __init__(self, file: str) -> None:
-        self.source = source[file]
-        self.source[-1] += " "
+    def __init__(self, file: str, engine: str = "regex") -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown lexer engine {engine}")
+        self.source = get_source(file)
         self.file = file
+        self.engine = engine
 
-    def error(self, message: str, location: tuple[int, int]) -> None:
-        raise CompileError(message, self.file, self.source[location[0] - 1], location)
+    def error(self, message: str, location: tuple[int, int]) -> NoReturn:
+        raise CompileError(message, self.file, self.source.line(location[0]), location)
 
     def lex(self) -> list[Token]:
-        tokens: list[Token] = []
+        return list(self.iter_tokens())
+
+    def iter_tokens(self) -> Iterator[Token]:
+        if self.engine == "state":
+            return self.iter_state()
+        return self.iter_regex()
+
+    def iter_regex(self, pos: int = 0) -> Iterator[Token]:
+        # the tokens of scan(), which is the table engine's when that is chosen
+        source = self.source
+        for kind, code, start, length, content in self.scan(pos):
+            if content is None:
+                yield SpanToken(kind, source, start, length)
+            else:
+                yield Token.at(kind, code, content, source, start, length)
+
+    def lex_buffer(self) -> TokenBuffer:
+        buffer = TokenBuffer(self.source)
+        for _, code, start, length, _ in self.scan():
+            buffer.append(code, start, length)
+        return buffer
+
+    def lex_parallel(self, jobs: int = 0, piece: int = PIECE) -> TokenBuffer:
+        # lex_buffer() over pieces of the file lexed in a process pool; pieces are cut where no token can span
+        # them, so the tokens are the same. jobs <= 0 means one per core
+        if jobs <= 0:
+            jobs = cpu_count() or 1
+        data = self.source.data
+        # a few pieces per worker even out the ones that lex slower
+        points = split(data, min(jobs * 4, len(data) // piece))
+        if jobs <= 1 or len(points) <= 2:
+            return self.lex_buffer()
+        from concurrent.futures import ProcessPoolExecutor
+
+        buffer = TokenBuffer(self.source)
+        starts = points[:-1]
+        with ProcessPoolExecutor(min(jobs, len(starts))) as pool:
+            pieces = pool.map(
+                lex_piece,
+                (data[a : b + OVERLAP] for a, b in zip(points, points[1:])),
+                starts,
+                (b - a for a, b in zip(points, points[1:])),
+                repeat("table" if self.engine == "table" else "regex"),
+            )
+            for start, (codes, offsets, lengths, error) in zip(starts, pieces):
+                buffer.codes.extend(codes)
+                buffer.offsets.extend(offsets)
+                buffer.lengths.extend(lengths)
+                if error is not None:
+                    message, (line, column) = error
+                    self.error(message, (line + data.count(b"\n", 0, start), column))
+        return buffer
+
+    def scan(self, pos: int = 0, end: Optional[int] = None) -> Iterator[tuple[str, int, int, int, Optional[str]]]:
+        # (type, code, offset, length, content); content is None for comments and strings, which are decoded
+        # lazily. pos must be a token boundary, the lexer keeps no state between tokens. Stops before the first
+        # token starting at or after end
+        if self.engine == "table":
+            return self.scan_table(pos, end)
+        return self.scan_regex(pos, end)
+
+    def scan_regex(self, pos: int = 0, end: Optional[int] = None) -> Iterator[tuple[str, int, int, int, Optional[str]]]:
+        data = self.source.data
+        size = len(data)
+        stop = size if end is None else end
+        match = TOKEN_RE.match
+        while True:
+            m = match(data, pos)
+            if m is None:
+                break
+            kind = m.lastgroup
+            assert kind is not None
+            start, pos = m.span(kind)
+            if start >= stop:
+                break
+            if kind == "identifier":
+                content = m.group(kind).decode()
+                code = CODES.get(content)
+                if code is None:
+                    yield "identifier", IDENTIFIER, start, pos - start, content
+                else:
+                    yield "keyword", code, start, pos - start, content
+            elif kind == "symbol":
+                content = m.group(kind).decode()
+                yield "symbol", CODES[content], start, pos - start, content
+            elif kind == "number":
+                content = m.group(kind).decode()
+                if "." in content:
+                    yield "float", FLOAT, start, pos - start, content
+                else:
+                    yield "int", INT, start, pos - start, content
+            elif kind == "comment":
+                if data[start] == 0x23 or data[start + 1] == 0x2F:  # '#' or '//'
+                    if data[pos - 1] != 0x0A:
+                        break
+                    yield "comment", COMMENT, start, pos - start - 1, None
+                elif pos - start < 3 or data[pos - 2 : pos] != b"*/":
+                    break
+                else:
+                    yield "comment", COMMENT, start, pos - start, None
+            elif kind == "string":
+                if pos - start < 2 or data[pos - 1] != 0x22:
+                    break
+                yield "string", STRING, start, pos - start, None
+            elif kind == "char":
+                yield "char", CHAR, start, pos - start, m.group(kind).decode()
+            elif data[start] >= 0x80:
+                pos = self.wide(start)
+            elif data[start] != 0x27:
+                self.error(f"Invalid character {chr(data[start])}", self.source.location(start))
+            else:
+                self.quote(start)
+                break
+
+    def wide(self, start: int) -> int:
+        # the end of a character outside ASCII, which is only allowed as whitespace
+        data = self.source.data
+        pos = start + char_length(data[start])
+        char = data[start:pos].decode(errors="replace")
+        if not char.isspace():
+            self.error(f"Invalid character {char}", self.source.location(start))
+        return pos
+
+    def quote(self, start: int) -> None:
+        # a quote that does not start a char constant: report it like the state engine does, or return at EOF
+        data = self.source.data
+        size = len(data)
+        if start + 1 >= size:
+            return
+        if data[start + 1] == 0x27:
+            self.error("Character constant too long or too short", self.source.location(start + 1))
+        end = start + 1 + char_length(data[start + 1])
+        if end < size:
+            self.error("Character constant too long", self.source.location(end))
+        # the state engine reports this one column past the last character of the file
+        line, column = self.source.location(start + 1)
+        self.error("Character constant too long", (line, column + 1))
+
+    def scan_table(self, pos: int = 0, end: Optional[int] = None) -> Iterator[tuple[str, int, int, int, Optional[str]]]:
+        # scan_regex() without the regex: the class of the first byte picks the kind of token and runs of one class
+        # are skipped with bytes.lstrip, so code costs a few steps per token rather than per character.
+        # Characters outside ASCII are decoded only where they stand alone, literals and comments are found by
+        # their closing bytes
+        data = self.source.data
+        size = len(data)
+        stop = size if end is None else end
+        classes = CLASSES
+        pairs = SYMBOL_PAIRS
+        while pos < size:
+            kind = classes[data[pos]]
+            if kind == SPACE:
+                # mostly a single space, runs are indentation
+                pos += 1
+                if pos < size and classes[data[pos]] == SPACE:
+                    pos = skip(data, pos + 1, SPACES)
+                continue
+            start = pos
+            if start >= stop:
+                break
+            if kind == MINUS:
+                kind = DIGIT if pos + 1 < size and classes[data[pos + 1]] == DIGIT else SYMBOL
+            elif kind == SLASH:
+                follow = data[pos + 1 : pos + 2]
+                kind = HASH if follow == b"/" else BLOCK if follow == b"*" else SYMBOL
+            if kind == WORD:
+                pos = skip(data, pos + 1, WORD_CHARS)
+                content = data[start:pos].decode()
+                code = CODES.get(content)
+                if code is None:
+                    yield "identifier", IDENTIFIER, start, pos - start, content
+                else:
+                    yield "keyword", code, start, pos - start, content
+            elif kind == SYMBOL:
+                pair = pairs.get(data[start : start + 2])
+                if pair is None:
+                    pair = SYMBOL_CHARS[data[start]]
+                    pos += 1
+                else:
+                    pos += 2
+                yield "symbol", pair[1], start, pos - start, pair[0]
+            elif kind == DIGIT:
+                pos = skip(data, pos + 1, DIGITS)
+                if pos < size and data[pos] == 0x2E:  # '.'
+                    pos = skip(data, pos + 1, DIGITS)
+                    yield "float", FLOAT, start, pos - start, data[start:pos].decode()
+                else:
+                    yield "int", INT, start, pos - start, data[start:pos].decode()
+            elif kind == STRING_QUOTE:
+                pos = data.find(b'"', start + 1) + 1
+                if pos == 0:
+                    break
+                yield "string", STRING, start, pos - start, None
+            elif kind == HASH:
+                pos = data.find(b"\n", start) + 1
+                if pos == 0:
+                    break
+                yield "comment", COMMENT, start, pos - start - 1, None
+            elif kind == BLOCK:
+                # from start + 1, so "/*/" closes itself as it does for the regex
+                pos = data.find(b"*/", start + 1) + 2
+                if pos == 1:
+                    break
+                yield "comment", COMMENT, start, pos - start, None
+            elif kind == CHAR_QUOTE:
+                # one ASCII character other than a quote, or one character outside ASCII, between quotes
+                lead = data[start + 1] if start + 1 < size else 0x27
+                pos = start + 2
+                if lead >= 0xC0:
+                    while pos < size and 0x80 <= data[pos] <= 0xBF:
+                        pos += 1
+                elif lead >= 0x80 or lead == 0x27:
+                    pos = size
+                if pos >= size or data[pos] != 0x27:
+                    self.quote(start)
+                    break
+                pos += 1
+                yield "char", CHAR, start, pos - start, data[start:pos].decode()
+            elif kind == WIDE:
+                pos = self.wide(start)
+            else:
+                self.error(f"Invalid character {chr(data[start])}", self.source.location(start))
+
+    def iter_state(self) -> Iterator[Token]:
         state = ""
         content = ""
         p = ""
         pp = ""
         location = (-1, -1)
-        for i, line in enumerate(self.source):
+        lines = self.source.lines()
+        # a trailing space flushes whatever token is still pending at the end of the file
+        lines[-1] += " "
+        for i, line in enumerate(lines):
             for j, char in enumerate(line):
                 p = pp
                 pp = char
                 if state == "comment_1":
                     content += char
                     if p == "*" and char == "/":
-                        tokens.append(Token("comment", content, self.file, location))
+                        yield Token("comment", content, self.file, location)
                         content = ""
                         state = ""
                     continue
                 if state == "+" or state == "%":
                     state = ""
                     if char == "=":
-                        tokens.append(Token("symbol", p + "=", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", p + "=", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", p, self.file, (i + 1, j - 1)))
+                        yield Token("symbol", p, self.file, (i + 1, j - 1))
                 elif state == "-":
                     state = ""
                     if char in digit:
@@ -43,20 +392,20 @@ class Lexer:
                         location = (i + 1, j - 1)
                         continue
                     elif char == "=":
-                        tokens.append(Token("symbol", "-=", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "-=", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", "-", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "-", self.file, (i + 1, j - 1))
                 elif state == "*":
                     state = ""
                     if char == "=":
-                        tokens.append(Token("symbol", "*=", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "*=", self.file, (i + 1, j - 1))
                         continue
                     elif char == "*":
-                        tokens.append(Token("symbol", "**", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "**", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", "*", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "*", self.file, (i + 1, j - 1))
                 elif state == "/":
                     state = ""
                     if char == "/":
@@ -70,58 +419,58 @@ class Lexer:
                         location = (i + 1, j - 1)
                         continue
                     elif char == "=":
-                        tokens.append(Token("symbol", "/=", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "/=", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", "/", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "/", self.file, (i + 1, j - 1))
                 elif state == ">":
                     state = ""
                     if char == "=":
-                        tokens.append(Token("symbol", ">=", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", ">=", self.file, (i + 1, j - 1))
                         continue
                     elif char == ">":
-                        tokens.append(Token("symbol", ">>", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", ">>", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", ">", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", ">", self.file, (i + 1, j - 1))
                 elif state == "<":
                     state = ""
                     if char == "=":
-                        tokens.append(Token("symbol", "<=", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "<=", self.file, (i + 1, j - 1))
                         continue
                     elif char == "<":
-                        tokens.append(Token("symbol", "<<", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "<<", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", "<", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "<", self.file, (i + 1, j - 1))
                 elif state == "=":
                     state = ""
                     if char == "=":
-                        tokens.append(Token("symbol", "==", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "==", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", "=", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "=", self.file, (i + 1, j - 1))
                 elif state == "!":
                     state = ""
                     if char == "=":
-                        tokens.append(Token("symbol", "!=", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "!=", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", "!", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "!", self.file, (i + 1, j - 1))
                 elif state == "&":
                     state = ""
                     if char == "&":
-                        tokens.append(Token("symbol", "&&", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "&&", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", "&", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "&", self.file, (i + 1, j - 1))
                 elif state == "|":
                     state = ""
                     if char == "|":
-                        tokens.append(Token("symbol", "||", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "||", self.file, (i + 1, j - 1))
                         continue
                     else:
-                        tokens.append(Token("symbol", "|", self.file, (i + 1, j - 1)))
+                        yield Token("symbol", "|", self.file, (i + 1, j - 1))
                 elif state == "char":
                     if char != "'":
                         if len(content) == 0:
@@ -130,7 +479,7 @@ class Lexer:
                             self.error("Character constant too long", (i + 1, j))
                     elif char == "'":
                         if len(content) == 1:
-                            tokens.append(Token("char", "'" + content + "'", self.file, (i + 1, j)))
+                            yield Token("char", "'" + content + "'", self.file, (i + 1, j))
                             state = ""
                             content = ""
                         else:
@@ -140,7 +489,7 @@ class Lexer:
                     continue
                 elif state == "string":
                     if char == '"':
-                        tokens.append(Token("string", '"' + content + '"', self.file, location))
+                        yield Token("string", '"' + content + '"', self.file, location)
                         state = ""
                         content = ""
                     else:
@@ -155,7 +504,7 @@ class Lexer:
                         content += char
                         continue
                     else:
-                        tokens.append(Token("int", content, self.file, location))
+                        yield Token("int", content, self.file, location)
                         state = ""
                         content = ""
                 elif state == "float":
@@ -163,14 +512,14 @@ class Lexer:
                         content += char
                         continue
                     else:
-                        tokens.append(Token("float", content, self.file, location))
+                        yield Token("float", content, self.file, location)
                         state = ""
                         content = ""
                 elif state == "comment_0":
                     if char != "\n":
                         content += char
                     else:
-                        tokens.append(Token("comment", content, self.file, location))
+                        yield Token("comment", content, self.file, location)
                         state = ""
                         content = ""
                     continue
@@ -179,10 +528,10 @@ class Lexer:
                         content += char
                         continue
                     else:
-                        if content in keyword:
-                            tokens.append(Token("keyword", content, self.file, location))
+                        if content in KEYWORDS:
+                            yield Token("keyword", content, self.file, location)
                         else:
-                            tokens.append(Token("identifier", content, self.file, location))
+                            yield Token("identifier", content, self.file, location)
                         state = ""
                         content = ""
 
@@ -190,7 +539,7 @@ class Lexer:
                     if char in "+-*/%>=<!&|":
                         state = char
                     else:
-                        tokens.append(Token("symbol", char, self.file, (i + 1, j)))
+                        yield Token("symbol", char, self.file, (i + 1, j))
                 elif char == "'":
                     state = "char"
                 elif char == '"':
@@ -211,4 +560,3 @@ class Lexer:
                 else:
                     if not char.isspace():
                         self.error(f"Invalid character {char}", (i + 1, j))
-        return tokens
@@ -1,8 +1,20 @@
+import re
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from mmap import ACCESS_READ, mmap
+from os import fstat
 from os.path import abspath
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 
+# bumped whenever the shape of the tree changes, cached trees from other versions are ignored
+VERSION = "0.2.0"
+CACHE_DIR = ".njcache"
+# the values of Options.engine and Options.expression
+ENGINES = ("regex", "state", "table")
+EXPRESSIONS = ("postfix", "tree")
 
-symbol = set("()[]{},;.+-*/%<>&|=@^!") | set(("==", "!=", "<=", ">=", "&&", "||", "+=", "-=", "*=", "/=", "%=", "**", "<<", ">>"))
+symbol = set("()[]{},;:.+-*/%<>&|=@^!") | set(("==", "!=", "<=", ">=", "&&", "||", "+=", "-=", "*=", "/=", "%=", "**", "<<", ">>"))
 digit = set("0123456789")
 atoz = set("abcdefghijklmnopqrstuvwxyz")
 AtoZ = set("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
@@ -31,6 +43,7 @@ keyword = (
     "int",
     "method",
     "NULL",
+    "pass",
     "pointer",
     "public",
     "range",
@@ -44,17 +57,136 @@ keyword = (
     "void",
     "while",
 )
+# symbols whose first character puts the state lexer into a pending state, so it reports them one column
+# left of the character that follows them
+PENDING = frozenset(b"+-*/%>=<!&|")
+TOKEN_KINDS = ("comment", "symbol", "char", "string", "int", "float", "keyword", "identifier")
+KIND_CODE = {kind: code for code, kind in enumerate(TOKEN_KINDS)}
+# every keyword and symbol gets its own code after the kind codes, so a token's (type, content) pair can be
+# matched with a single integer compare; other tokens use the code of their kind
+CODES = {value: code for code, value in enumerate((*keyword, *sorted(symbol)), len(TOKEN_KINDS))}
+CODE_TYPE = (*TOKEN_KINDS, *("keyword" for _ in keyword), *("symbol" for _ in symbol))
 
-source: dict[str, list[str]] = {}
+
+class SourceFile:
+    """UTF-8 bytes of one source file, either in memory or memory-mapped.
+
+    Offsets are byte offsets; line starts are only computed once a location is asked for.
+    """
+
+    def __init__(self, path: str, data: Union[str, bytes, mmap], starts: Optional[list[int]] = None) -> None:
+        self.path = path
+        self.data = data.encode() if isinstance(data, str) else data
+        self._starts = starts
+
+    @classmethod
+    def from_lines(cls, path: str, lines: list[str]) -> "SourceFile":
+        encoded = [line.encode() for line in lines]
+        return cls(path, b"".join(encoded), [0, *accumulate(len(line) for line in encoded)][:-1] or [0])
+
+    @classmethod
+    def open(cls, path: str) -> "SourceFile":
+        with open(path, "rb") as f:
+            if fstat(f.fileno()).st_size == 0:
+                return cls(path, b"")
+            return cls(path, mmap(f.fileno(), 0, access=ACCESS_READ))
+
+    @property
+    def starts(self) -> list[int]:
+        if self._starts is None:
+            self._starts = [0, *(m.end() for m in re.finditer(b"\n", self.data))]
+        return self._starts
+
+    def text(self, offset: int, length: int) -> str:
+        return self.data[offset : offset + length].decode()
+
+    def location(self, offset: int) -> tuple[int, int]:
+        starts = self.starts
+        i = bisect_right(starts, offset) - 1
+        return (i + 1, len(self.data[starts[i] : offset].decode(errors="replace")))
+
+    def offset(self, line: int, column: int) -> int:
+        # inverse of location: the byte offset of a 1-based line and a column counted in characters
+        start = self.starts[line - 1]
+        end = self.starts[line] if line < len(self.starts) else len(self.data)
+        return start + len(self.data[start:end].decode(errors="replace")[:column].encode())
+
+    def line(self, line: int) -> str:
+        starts = self.starts
+        if line < len(starts):
+            return self.data[starts[line - 1] : starts[line]].decode(errors="replace")
+        return self.data[starts[line - 1] :].decode(errors="replace")
+
+    def lines(self) -> list[str]:
+        return [self.line(i) for i in range(1, len(self.starts) + 1)]
+
+
+source: dict[str, Union[SourceFile, list[str]]] = {}
+
+
+def get_source(file: str) -> SourceFile:
+    code = source[file]
+    if not isinstance(code, SourceFile):
+        code = source[file] = SourceFile.from_lines(file, code)
+    return code
+
+
+def token_code(type: str, content: str) -> int:
+    if type == "keyword" or type == "symbol":
+        return CODES.get(content, KIND_CODE[type])
+    return KIND_CODE.get(type, -1)
+
+
+def anchor(type: str, lead: int, length: int) -> tuple[int, int]:
+    # (offset from the token start, column shift) of the location the lexer reports for a token
+    # whose first byte is lead
+    if type == "string":
+        return 0, 1
+    elif type == "char":
+        return length - 1, 0
+    elif lead in PENDING:
+        return 1, -1
+    return 0, 0
 
 
 class Token:
+    __slots__ = ("type", "content", "code", "file", "offset", "length", "source", "_location")
+
     def __init__(self, type: str, content: str, file: str = "", location: tuple[int, int] = (-1, -1)) -> None:
         self.type = type
         self.content = content
+        self.code = token_code(type, content)
         self.file = file
-        self.line = location[0] - 1
-        self.location = location
+        self.offset = -1
+        self.length = len(content)
+        self.source: Optional[SourceFile] = None
+        self._location: Optional[tuple[int, int]] = location
+
+    @classmethod
+    def at(cls, type: str, code: int, content: str, source: SourceFile, offset: int, length: int) -> "Token":
+        token = cls.__new__(cls)
+        token.type = type
+        token.content = content
+        token.code = code
+        token.file = source.path
+        token.offset = offset
+        token.length = length
+        token.source = source
+        token._location = None
+        return token
+
+    @property
+    def location(self) -> tuple[int, int]:
+        if self._location is None:
+            assert self.source is not None
+            delta, shift = anchor(self.type, self.source.data[self.offset], self.length)
+            line, column = self.source.location(self.offset + delta)
+            self._location = (line, column + shift)
+        return self._location
+
+    @property
+    def line(self) -> int:
+        return self.location[0] - 1
 
     def __str__(self) -> str:
         return f"<{self.type}> {self.content} {self.location}"
@@ -68,10 +200,108 @@ class Token:
         return f"Token('{self.type}', '{self.content}', '{self.file}', {self.location})"
 
 
+class SpanToken(Token):
+    """Token whose content is only decoded from its source when first read (used for comments and strings)."""
+
+    __slots__ = ("_content",)
+
+    def __init__(self, type: str, source: SourceFile, offset: int, length: int) -> None:
+        self.type = type
+        self.code = KIND_CODE[type]
+        self.file = source.path
+        self.offset = offset
+        self.length = length
+        self.source = source
+        self._location = None
+        self._content: Optional[str] = None
+
+    @property
+    def content(self) -> str:  # type: ignore[override]
+        if self._content is None:
+            assert self.source is not None
+            self._content = self.source.text(self.offset, self.length)
+        return self._content
+
+
+class TokenView(Token):
+    __slots__ = ("buffer", "index")
+
+    def __init__(self, buffer: "TokenBuffer", index: int) -> None:
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def type(self) -> str:  # type: ignore[override]
+        return CODE_TYPE[self.buffer.codes[self.index]]
+
+    @property
+    def code(self) -> int:  # type: ignore[override]
+        return self.buffer.codes[self.index]
+
+    @property
+    def content(self) -> str:  # type: ignore[override]
+        return self.buffer.source.text(self.buffer.offsets[self.index], self.buffer.lengths[self.index])
+
+    @property
+    def file(self) -> str:  # type: ignore[override]
+        return self.buffer.source.path
+
+    @property
+    def offset(self) -> int:  # type: ignore[override]
+        return self.buffer.offsets[self.index]
+
+    @property
+    def length(self) -> int:  # type: ignore[override]
+        return self.buffer.lengths[self.index]
+
+    @property
+    def location(self) -> tuple[int, int]:
+        delta, shift = anchor(self.type, self.buffer.source.data[self.offset], self.length)
+        line, column = self.buffer.source.location(self.offset + delta)
+        return (line, column + shift)
+
+
+class TokenBuffer:
+    """Tokens of one file stored column-wise: a token code and an offset/length span into the shared source."""
+
+    def __init__(self, source: SourceFile) -> None:
+        self.source = source
+        self.codes = array("B")
+        self.offsets = array("L")
+        self.lengths = array("L")
+
+    @property
+    def file(self) -> str:
+        return self.source.path
+
+    def append(self, code: int, offset: int, length: int) -> None:
+        self.codes.append(code)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, index: int) -> TokenView:
+        if index < 0:
+            index += len(self.codes)
+        if not 0 <= index < len(self.codes):
+            raise IndexError("token index out of range")
+        return TokenView(self, index)
+
+    def __iter__(self) -> Iterator[TokenView]:
+        for i in range(len(self.codes)):
+            yield TokenView(self, i)
+
+    def __repr__(self) -> str:
+        return f"TokenBuffer('{self.file}', {len(self)} tokens)"
+
+
 class Tokens:
     def __init__(self, type: str, constants: tuple[str, ...]) -> None:
         self.type = type
         self.constants = constants
+        self.values = frozenset(constants)
 
     def __str__(self) -> str:
         return f"<{self.type}> {self.constants}"
@@ -83,7 +313,7 @@ class Tokens:
         if isinstance(o, Tokens):
             return self.type == o.type and self.constants == o.constants
         elif isinstance(o, Token):
-            return self.type == o.type and o.content in self.constants
+            return self.type == o.type and o.content in self.values
         else:
             return NotImplemented
 
@@ -91,18 +321,28 @@ class Tokens:
         return f"Tokens('{self.type}', {self.constants})"
 
 
+class Options:
+    def __init__(self, engine: str = "regex", expression: str = "postfix", cache_dir: str = CACHE_DIR) -> None:
+        self.engine = engine
+        self.expression = expression
+        self.cache_dir = cache_dir
+
+
 class Args:
-    def __init__(self, path: str = "", flags: Optional[list[str]] = None, args: Optional[list[str]] = None) -> None:
+    def __init__(self, path: str = "", flags: Optional[list[str]] = None, args: Optional[list[str]] = None, paths: Optional[list[str]] = None) -> None:
         if flags is None:
             flags = []
         if args is None:
             args = []
+        if paths is None:
+            paths = [path] if path else []
         self.path = path
         self.flags = flags
         self.args = args
+        self.paths = paths
 
     def __str__(self) -> str:
-        return f"Path: {self.path}, Flags: {self.flags}, Args: {self.args}"
+        return f"Path: {self.path}, Paths: {self.paths}, Flags: {self.flags}, Args: {self.args}"
 
     def __repr__(self) -> str:
         return f"Args('{self.path}', {self.flags}, {self.args})"
@@ -134,6 +374,12 @@ class ASTNode:
         return f"ASTNode('{self.type}', {', '.join(t)})"
 
 
+class ImportCycleError(Exception):
+    def __init__(self, cycle: list[str]) -> None:
+        super().__init__("Import cycle: " + " -> ".join(cycle))
+        self.cycle = cycle
+
+
 class CompileError(Exception):
     def __init__(self, message: str, file: str, source_code: str, location: tuple[int, int]) -> None:
         super().__init__(message)
@@ -210,3 +456,4 @@ PRECEDENCE = {
     "/=": 9,
     "%=": 9,
 }
+RIGHT_ASSOCIATIVE = ("**", "=", "+=", "-=", "*=", "/=", "%=")
@@ -1,39 +1,252 @@
-from os.path import abspath, isfile
-from sys import argv
+import sys
+from os import makedirs
+from os.path import abspath, dirname, isdir, isfile, join, relpath
+from sys import argv, stderr
+from typing import Callable, NoReturn
 
-from .lexer import Lexer
-from .lib import Args, source
-from .parser import Parser
+from .lib import Args, CompileError, ENGINES, EXPRESSIONS, ImportCycleError, Options, source, SourceFile
+
+# the phases are imported by the commands that run them, so `njc lex` never loads the parser and a serial
+# build never loads the process pool
+USAGE = """\
+usage: njc <command> [flags] paths...
+
+commands:
+  lex       print the tokens of each file, -jN lexes each in N processes
+  parse     print the tree of each file
+  dump-ast  write the tree of each file in the binary format, next to it or below --dump=DIR
+  check     parse every file and only report errors
+  run       run a program: its top level, then main() when it has one
+
+flags: --lexer=regex|state|table --expression=postfix|tree --no-cache --cache=DIR --cache-stats -jN --imports
+       --format=repr|jsonl|pretty (parse) --trace[=N] --profile --stream (parse, one file)"""
+
+
+def usage_error(message: str) -> NoReturn:
+    print(f"njc: {message}\n{USAGE.splitlines()[0]}", file=stderr)
+    raise SystemExit(2)
+
+
+def number(flag: str, value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        usage_error(f"{flag} takes a number, not {value!r}")
 
 
 def parse_args(args: list[str]) -> Args:
-    path = ""
+    # anything that is not a flag is a path, and has to exist
+    paths: list[str] = []
     flags: list[str] = []
-    arg: list[str] = []
-    for i in args:
-        if isfile(abspath(i)):
-            path = abspath(i)
+    it = iter(args)
+    for i in it:
+        if isfile(abspath(i)) or isdir(abspath(i)):
+            paths.append(abspath(i))
+        elif i == "-j":
+            flags.append("-j" + next(it, ""))
         elif i.startswith("-"):
             flags.append(i)
         else:
-            arg.append(i)
-    return Args(path, flags, arg)
+            usage_error(f"{i}: no such file or directory")
+    return Args(paths[-1] if paths else "", flags, paths=paths)
+
+
+def parse_options(args: Args, jobs: int = 0) -> tuple[Options, int, list[str]]:
+    # the flags every command shares: the compile options and the number of jobs, jobs when not given. The
+    # other flags are handed back for the command to read
+    options = Options()
+    flags: list[str] = []
+    for i in args.flags:
+        if i.startswith("--lexer="):
+            options.engine = i[len("--lexer=") :]
+            if options.engine not in ENGINES:
+                usage_error(f"unknown lexer {options.engine!r}, expected one of {', '.join(ENGINES)}")
+        elif i.startswith("--expression="):
+            options.expression = i[len("--expression=") :]
+            if options.expression not in EXPRESSIONS:
+                usage_error(f"unknown expression shape {options.expression!r}, expected one of {', '.join(EXPRESSIONS)}")
+        elif i == "--no-cache":
+            options.cache_dir = ""
+        elif i.startswith("--cache="):
+            options.cache_dir = i[len("--cache=") :]
+        elif i.startswith("-j"):
+            jobs = number("-j", i[len("-j") :])
+        elif i.startswith("--jobs="):
+            jobs = number("--jobs", i[len("--jobs=") :])
+        else:
+            flags.append(i)
+    return options, jobs, flags
+
+
+def lex(args: Args) -> None:
+    from .lexer import Lexer
+
+    options, jobs, _ = parse_options(args, 1)
+    engine = options.engine
+    failed = False
+    for path in args.paths:
+        source[path] = SourceFile.open(path)
+        if len(args.paths) > 1:
+            print(f"# {path}")
+        try:
+            lexer = Lexer(path, engine)
+            # the parallel lexer is built on scan(), which the state engine has not, and reports nothing before an error
+            tokens = lexer.lex_parallel(jobs) if jobs != 1 and engine != "state" else lexer.iter_tokens()
+            for token in tokens:
+                line, column = token.location
+                print(f"{line}:{column} {token.type} {token.content!r}")
+        except CompileError as e:
+            failed = True
+            print(e, file=stderr)
+        finally:
+            source.pop(path, None)
+    if failed:
+        raise SystemExit(1)
+
+
+def main(args: Args, command: str = "parse") -> None:
+    from . import trace
+    from .build import collect, compile_files, iter_file, parse_file
+    from .cache import Cache, Stats
+    from .emit import FORMATS, write, write_nodes
+
+    options, jobs, flags = parse_options(args)
+    cache_stats = False
+    dump_path = ""
+    imports = False
+    trace_size = 0
+    profile = False
+    output = "repr"
+    stream = False
+    for i in flags:
+        if i == "--trace":
+            trace_size = 10000
+        elif i.startswith("--trace="):
+            trace_size = number("--trace", i[len("--trace=") :])
+        elif i == "--profile":
+            profile = True
+        elif i == "--cache-stats":
+            cache_stats = True
+        elif i.startswith("--dump="):
+            dump_path = i[len("--dump=") :]
+        elif i == "--imports":
+            imports = True
+        elif i.startswith("--format="):
+            output = i[len("--format=") :]
+            if output not in FORMATS:
+                usage_error(f"unknown format {output!r}, expected one of {', '.join(FORMATS)}")
+        elif i == "--stream":
+            stream = True
+    if trace_size or profile:
+        trace.enable(trace_size or 10000, profile)
+        # a traced run has to parse for real, and in this process
+        options.cache_dir = ""
+        jobs = 1
+
+    if command == "parse" and len(args.paths) == 1 and isfile(args.paths[0]) and not imports:
+        # errors are reported like those of the files of a multi-file run
+        try:
+            if stream and not dump_path:
+                # each top-level node is written and dropped as soon as it is parsed
+                write_nodes(iter_file(args.path, options), args.path, sys.stdout, output)
+                return
+            cache = Cache(options.cache_dir) if options.cache_dir else None
+            try:
+                ast = parse_file(args.path, options, cache)
+            finally:
+                if trace.tracer is not None and trace.tracer.profile:
+                    print(trace.tracer.report(), file=stderr)
+        except CompileError as e:
+            sys.stdout.flush()
+            print(f"{args.path}: {e}", file=stderr)
+            raise SystemExit(1)
+        if cache is not None and cache_stats:
+            print(cache.stats.report(), file=stderr)
+        if dump_path:
+            from .binary import dump
+
+            with open(dump_path, "wb") as f:
+                f.write(dump(ast))
+        else:
+            write(ast, sys.stdout, output)
+        return
+
+    # several files: compile them in parallel and report in the order they were given, or with --imports
+    # together with every userlib they import, dependencies first; --dump names a directory
+    if imports:
+        from .imports import resolve
+
+        graph = resolve(collect(args.paths), options, jobs)
+        try:
+            results = [graph.modules[i].result for i in graph.order()]
+        except ImportCycleError as e:
+            print(e, file=stderr)
+            raise SystemExit(1)
+    else:
+        results = compile_files(collect(args.paths), options, jobs)
+    stats = Stats()
+    failed = 0
+    for result in results:
+        stats.add(result.stats)
+        if result.error:
+            failed += 1
+            print(f"{result.path}: {result.error}", file=stderr)
+        elif dump_path or command == "dump-ast":
+            path = join(dump_path, relpath(result.path)) + "a" if dump_path else result.path + "a"
+            makedirs(dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(result.binary())
+        elif command == "parse":
+            print(f"# {result.path}")
+            assert result.ast is not None
+            write(result.ast, sys.stdout, output)
+    if cache_stats:
+        print(stats.report(), file=stderr)
+    if failed:
+        print(f"{failed} of {len(results)} files failed", file=stderr)
+        raise SystemExit(1)
+
+
+def execute(args: Args) -> None:
+    from .interpreter import Interpreter, RunError
 
+    options = parse_options(args)[0]
+    # the interpreter parses the program itself, keeping where its statements are, which cached trees lack
+    interpreter = Interpreter(options.expression, engine=options.engine)
+    try:
+        result = interpreter.run(interpreter.parse(args.path))
+    except (CompileError, ImportCycleError, RunError) as e:
+        print(e, file=stderr)
+        raise SystemExit(1)
+    # an int from main is the exit status
+    if type(result) is int and result:
+        raise SystemExit(result)
 
-def main(args: Args) -> None:
-    with open(args.path, "r") as f:
-        code = f.readlines()
-    source[args.path] = code
 
-    tokens = Lexer(args.path).lex()
+COMMANDS: dict[str, Callable[[Args], None]] = {
+    "lex": lex,
+    "parse": main,
+    "dump-ast": lambda args: main(args, "dump-ast"),
+    "check": lambda args: main(args, "check"),
+    "run": execute,
+}
 
-    ast = Parser(tokens, args.path).parse()
 
-    print(repr(ast))
+def run(argv: list[str]) -> None:
+    if not argv or argv[0] in ("-h", "--help"):
+        print(USAGE)
+        return
+    command = COMMANDS.get(argv[0])
+    if command is None:
+        # `njc file.nj [flags]` parses, as it always did
+        argv = ["parse", *argv]
+        command = main
+    args = parse_args(argv[1:])
+    if not args.paths:
+        usage_error(f"{argv[0]}: no paths given")
+    command(args)
 
 
-if len(argv) <= 1:
-    args = input("Enter file path and other flag & args: ").split()
-else:
-    args = argv[1:]
-main(parse_args(args))
+# guarded so worker processes that re-import the main module do not start another compile
+if __name__ == "__main__":
+    run(argv[1:])
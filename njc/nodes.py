@@ -0,0 +1,363 @@
+from typing import Any, Optional, Union
+
+from .lib import ASTNode
+
+
+class Node:
+    # typed replacement for ASTNode: fields live in __slots__ instead of a per-node dict. `args` and repr keep
+    # the ASTNode view so existing users see the same shape; fields that are None are left out, like an
+    # ASTNode built without them
+    __slots__ = ()
+    type = ""
+    # slots of the class and its bases, and their ASTNode keys where those differ from the slot names
+    fields: tuple[str, ...] = ()
+    keys: tuple[str, ...] = ()
+
+    def __init_subclass__(cls) -> None:
+        cls.fields = tuple(slot for base in reversed(cls.__mro__) for slot in base.__dict__.get("__slots__", ()))
+        if "keys" not in cls.__dict__:
+            cls.keys = cls.fields
+
+    @property
+    def args(self) -> dict[str, Any]:
+        args: dict[str, Any] = {}
+        for key, slot in zip(self.keys, self.fields):
+            value = getattr(self, slot)
+            if value is not None:
+                args[key] = value
+        return args
+
+    def __str__(self) -> str:
+        return repr(self)
+
+    def __repr__(self) -> str:
+        t: list[str] = []
+        for key, value in self.args.items():
+            if key != "value":
+                t.append(f"{key} = {repr(value)}")
+            else:
+                t.insert(0, repr(value))
+        return f"ASTNode('{self.type}', {', '.join(t)})"
+
+
+class Root(Node):
+    __slots__ = ("value", "file")
+    type = "root"
+
+    def __init__(self, value: list[Node], file: str) -> None:
+        self.value = value
+        self.file = file
+
+
+class Import(Node):
+    __slots__ = ("name", "alias")
+    type = "import"
+
+    def __init__(self, name: str, alias: str) -> None:
+        self.name = name
+        self.alias = alias
+
+
+class Type(Node):
+    __slots__ = ("type_a", "type_b")
+    type = "type"
+
+    def __init__(self, type_a: str, type_b: list["Type"]) -> None:
+        self.type_a = type_a
+        self.type_b = type_b
+
+
+class VarDecl(Node):
+    __slots__ = ("var_type", "var_kind", "name", "expression")
+    type = "var"
+
+    def __init__(self, var_type: Type, var_kind: str, name: str, expression: Node) -> None:
+        self.var_type = var_type
+        self.var_kind = var_kind
+        self.name = name
+        self.expression = expression
+
+
+class Function(Node):
+    __slots__ = ("constant", "func_type", "type_var", "name", "arguments", "body")
+    type = "function"
+    keys = ("constant", "func_type", "type_var", "name", "args", "body")
+
+    def __init__(self, constant: bool, func_type: Type, type_var: list[VarDecl], name: str, arguments: list[VarDecl], body: list[Node]) -> None:
+        self.constant = constant
+        self.func_type = func_type
+        self.type_var = type_var
+        self.name = name
+        self.arguments = arguments
+        self.body = body
+
+
+class Return(Node):
+    __slots__ = ("value",)
+    type = "return"
+
+    def __init__(self, value: Node) -> None:
+        self.value = value
+
+
+class Expression(Node):
+    # a postfix list of terms and operators, or a single term/binary node for the "tree" shape
+    __slots__ = ("value",)
+    type = "expression"
+
+    def __init__(self, value: Union[list[Node], Node]) -> None:
+        self.value = value
+
+
+class Operator(Node):
+    __slots__ = ("value",)
+    type = "operator"
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+
+class Binary(Node):
+    __slots__ = ("value", "left", "right")
+    type = "binary"
+
+    def __init__(self, value: str, left: Node, right: Node) -> None:
+        self.value = value
+        self.left = left
+        self.right = right
+
+
+class Term(Node):
+    __slots__ = ("value",)
+    type = "term"
+
+    def __init__(self, value: Optional[Node] = None) -> None:
+        self.value = value
+
+
+class Variable(Node):
+    __slots__ = ("value", "index", "attr")
+    type = "variable"
+
+    def __init__(self, value: str, index: Optional[Expression] = None, attr: Optional["Variable"] = None) -> None:
+        self.value = value
+        self.index = index
+        self.attr = attr
+
+
+class Call(Node):
+    __slots__ = ("var", "types", "arguments")
+    type = "call"
+    keys = ("var", "types", "args")
+
+    def __init__(self, var: Variable, types: list[Type], arguments: list[Expression]) -> None:
+        self.var = var
+        self.types = types
+        self.arguments = arguments
+
+
+class Arr(Node):
+    __slots__ = ("value",)
+    type = "arr"
+
+    def __init__(self, value: list[Expression]) -> None:
+        self.value = value
+
+
+class Tuple(Node):
+    __slots__ = ("value",)
+    type = "tuple"
+
+    def __init__(self, value: list[Expression]) -> None:
+        self.value = value
+
+
+class Unary(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value: Term) -> None:
+        self.value = value
+
+
+class Pointer(Unary):
+    __slots__ = ()
+    type = "pointer"
+
+
+class Not(Unary):
+    __slots__ = ()
+    type = "not"
+
+
+class Neg(Unary):
+    __slots__ = ()
+    type = "neg"
+
+
+class Depointer(Unary):
+    __slots__ = ()
+    type = "depointer"
+
+
+class Literal(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+
+class Int(Literal):
+    __slots__ = ()
+    type = "int"
+
+
+class Float(Literal):
+    __slots__ = ()
+    type = "float"
+
+
+class String(Literal):
+    __slots__ = ()
+    type = "string"
+
+
+class Char(Literal):
+    __slots__ = ()
+    type = "char"
+
+
+class Bool(Literal):
+    __slots__ = ()
+    type = "bool"
+
+
+class Void(Literal):
+    __slots__ = ()
+    type = "void"
+
+
+class Empty(Literal):
+    # ASTNode("None", "None"): a declaration without a value or a bare return
+    __slots__ = ()
+    type = "None"
+
+
+class Statement(Node):
+    # nodes the parser does not fill in yet
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        pass
+
+
+class Dict(Statement):
+    __slots__ = ()
+    type = "dict"
+
+
+class Class(Statement):
+    __slots__ = ()
+    type = "class"
+
+
+class If(Node):
+    # an elif is an If alone in else_body
+    __slots__ = ("condition", "body", "else_body")
+    type = "if"
+
+    def __init__(self, condition: Expression, body: list[Node], else_body: list[Node]) -> None:
+        self.condition = condition
+        self.body = body
+        self.else_body = else_body
+
+
+class For(Node):
+    __slots__ = ("label", "var", "iterator", "body", "else_body")
+    type = "for"
+
+    def __init__(self, label: Optional[str], var: VarDecl, iterator: Variable, body: list[Node], else_body: list[Node]) -> None:
+        self.label = label
+        self.var = var
+        self.iterator = iterator
+        self.body = body
+        self.else_body = else_body
+
+
+class While(Node):
+    __slots__ = ("label", "condition", "body", "else_body")
+    type = "while"
+
+    def __init__(self, label: Optional[str], condition: Expression, body: list[Node], else_body: list[Node]) -> None:
+        self.label = label
+        self.condition = condition
+        self.body = body
+        self.else_body = else_body
+
+
+class Break(Node):
+    __slots__ = ("label",)
+    type = "break"
+
+    def __init__(self, label: Optional[str] = None) -> None:
+        self.label = label
+
+
+class Continue(Statement):
+    __slots__ = ()
+    type = "continue"
+
+
+class Pass(Statement):
+    __slots__ = ()
+    type = "pass"
+
+
+class Interner:
+    # shares identifier strings and structurally equal type nodes within a compilation, so two types are the
+    # same type exactly when they are the same object. Interned nodes are shared and must not be mutated
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+        self.types: dict[tuple[Any, ...], Type] = {}
+
+    def string(self, value: str) -> str:
+        return self.strings.setdefault(value, value)
+
+    def type(self, type_a: str, type_b: list[Type]) -> Type:
+        # the parameters are interned already, so their identities are the key
+        key = (type_a, *map(id, type_b))
+        node = self.types.get(key)
+        if node is None:
+            node = self.types[key] = Type(self.string(type_a), type_b)
+        return node
+
+
+NODES: dict[str, type[Node]] = {
+    cls.type: cls
+    for cls in (
+        *(Root, Import, Type, VarDecl, Function, Return, Expression, Operator, Binary, Term, Variable, Call, Arr, Tuple),
+        *(Pointer, Not, Neg, Depointer, Int, Float, String, Char, Bool, Void, Empty),
+        *(Dict, Class, If, For, While, Break, Continue, Pass),
+    )
+}
+
+
+def convert(value: Any, to: Any) -> Any:
+    if isinstance(value, list):
+        return [convert(i, to) for i in value]
+    elif isinstance(value, (ASTNode, Node)):
+        return to(value)
+    return value
+
+
+def from_ast(node: ASTNode) -> Node:
+    # build the typed tree for an ASTNode tree
+    cls = NODES[node.type]
+    result = cls.__new__(cls)
+    for key, slot in zip(cls.keys, cls.fields):
+        setattr(result, slot, convert(node.args.get(key), from_ast))
+    return result
+
+
+def to_ast(node: Node) -> ASTNode:
+    # build the ASTNode tree for a typed tree
+    return ASTNode(node.type, **{key: convert(value, to_ast) for key, value in node.args.items()})
@@ -1,532 +1,693 @@
-from typing import Callable, NoReturn, TypeVar
+from collections import deque
+from sys import stderr
+from typing import Iterable, Iterator, NoReturn, Optional
 
-from .lib import ASTNode, BUILTINTYPE, CompileError, OPERATOR, PRECEDENCE, source, STDLIB, Token, Tokens
+from . import trace
+from .lib import BUILTINTYPE, CODES, CompileError, EXPRESSIONS, get_source, keyword, KIND_CODE, OPERATOR, PRECEDENCE, RIGHT_ASSOCIATIVE, STDLIB, Token
+from .nodes import Arr, Binary, Bool, Break, Call, Char, Class, Continue, Depointer, Dict, Empty, Expression, Float, For, Function, If, Import, Int, Interner, Literal, Neg, Node, Not, Operator, Pass, Pointer, Return, Root, String, Term, Tuple, Type, Unary, VarDecl, Variable, Void, While
 
-T = TypeVar("T")
-log: list[str] = []
-
-
-def log_function(func: Callable[..., T]) -> Callable[..., T]:
-    def wrapper(*args: ..., **kwargs: ...) -> T:
-        log.append(f"into-> {func.__name__}")
-        result = func(*args, **kwargs)
-        log.append(f"<-exit {func.__name__}")
-        return result
-
-    return wrapper
+COMMENT, STRING, IDENTIFIER = (KIND_CODE[i] for i in ("comment", "string", "identifier"))
+AS, ATTR, BREAK, CLASS, CONSTANT, CONTINUE, ELIF, ELSE, FALSE, FOR, FUNCTION, GLOBAL, IF, IMPORT, IN, NULL, PASS, RETURN, STATIC, TRUE, VAR, WHILE = (
+    CODES[i]
+    for i in (
+        *("as", "attr", "break", "class", "constant", "continue", "elif", "else", "false", "for", "function", "global", "if", "import", "in"),
+        *("NULL", "pass", "return", "static", "true", "var", "while"),
+    )
+)
+ASSIGN, COLON, COMMA, DOT, GT, LBRACE, LBRACKET, LPAREN, LT, RBRACE, RBRACKET, RPAREN, SEMICOLON = (CODES[i] for i in "=:,.>{[(<}]);")
+DECLARE_VAR = frozenset((VAR, CONSTANT))
+DECLARE_ATTR = frozenset((ATTR, STATIC))
+BUILTINTYPES = frozenset(CODES[i] for i in BUILTINTYPE.constants)
+KEYWORDS = frozenset(CODES[i] for i in keyword)
+OPERATORS = frozenset(CODES[i] for i in OPERATOR.constants)
+STDLIB_NAMES = frozenset(STDLIB.constants)
+LITERALS: dict[int, type[Literal]] = {KIND_CODE["int"]: Int, KIND_CODE["float"]: Float, KIND_CODE["string"]: String, KIND_CODE["char"]: Char}
+UNARY: dict[int, type[Unary]] = {CODES["@"]: Pointer, CODES["!"]: Not, CODES["-"]: Neg, CODES["^"]: Depointer}
+# binding level of every binary operator, lower binds tighter; by content for the "postfix" shape, by code for "tree"
+OPERATOR_LEVEL = {i: PRECEDENCE["power" if i == "**" else i] for i in OPERATOR.constants}
+LEVEL = {CODES[i]: level for i, level in OPERATOR_LEVEL.items()}
+RIGHT = frozenset(CODES[i] for i in RIGHT_ASSOCIATIVE)
+LOOSEST = max(LEVEL.values())
 
 
+@trace.traceable
 class Parser:
-    def __init__(self, tokens: list[Token], file: str) -> None:
-        self.tokens = tokens
+    def __init__(
+        self, tokens: Iterable[Token], file: str, expression: str = "postfix", interner: Optional[Interner] = None, locations: Optional[dict[Node, Token]] = None
+    ) -> None:
+        if expression not in EXPRESSIONS:
+            raise ValueError(f"Unknown expression shape {expression}")
+        # tokens are pulled on demand, only the lookahead of next() is buffered
+        self.tokens = iter(tokens)
+        self.buffer: deque[Token] = deque()
         self.file = file
         self.index = -1
         self.now = Token("", "")
+        self.expression = expression
+        # pass the same interner to the parsers of one compilation to share types and names across files
+        self.interner = interner if interner is not None else Interner()
+        self.intern = self.interner.string
+        # given a dict, the first token of every statement is kept in it, for errors found after parsing
+        self.locations = locations
 
     def error(self, message: str, location: tuple[int, int]) -> NoReturn:
-        raise CompileError(message, self.file, source[self.file][location[0] - 1], location)
-        # print(CompileError(message, self.file, source[self.file][location[0] - 1], location))
+        raise CompileError(message, self.file, get_source(self.file).line(location[0]), location)
+        # print(CompileError(message, self.file, get_source(self.file).line(location[0]), location))
         # exit()
 
+    @trace.token
     def get(self) -> None:
-        self.index += 1
-        if self.index < len(self.tokens):
-            self.now = self.tokens[self.index]
-            if self.now.type == "comment":
-                self.get()
+        while True:
+            self.index += 1
+            if self.buffer:
+                token = self.buffer.popleft()
             else:
-                log.append(str(self.now))
-        else:
-            raise Exception(f"Unexpected EOF in {self.file}")
-            # self.now = Token("EOF", "EOF")
+                token = next(self.tokens, None)
+                if token is None:
+                    # the tokens ran out inside a rule, the error goes just behind the last one
+                    line, column = self.now.location
+                    self.error(f"Unexpected end of file after '{self.now.content}'", (line, column + len(self.now.content)))
+            if token.code != COMMENT:
+                self.now = token
+                break
+
+    def more(self) -> bool:
+        # whether any token but comments is left; the comments before it are dropped
+        while True:
+            if not self.buffer:
+                token = next(self.tokens, None)
+                if token is None:
+                    return False
+                self.buffer.append(token)
+            if self.buffer[0].code != COMMENT:
+                return True
+            self.buffer.popleft()
+            self.index += 1
 
     def next(self, a: int = 1) -> Token:
-        if self.index + a < len(self.tokens):
-            return self.tokens[self.index + a]
-        else:
-            return Token("EOF", "EOF")
+        while len(self.buffer) < a:
+            token = next(self.tokens, None)
+            if token is None:
+                return Token("EOF", "EOF")
+            self.buffer.append(token)
+        return self.buffer[a - 1]
 
-    def parse(self) -> ASTNode:
-        nodes: list[ASTNode] = []
+    def parse(self) -> Root:
+        nodes: list[Node] = []
         try:
-            while True:
-                try:
-                    self.get()
-                except Exception:
-                    break
-                if self.now == Token("keyword", "import"):
-                    nodes.append(self.parse_import())
-                elif self.now == Token("keyword", "function"):
-                    nodes.append(self.parse_function())
-                elif self.now == Token("keyword", "class"):
-                    nodes.append(self.parse_class())
-                elif self.now == Tokens("keyword", ("if", "for", "while", "var", "constant", "attr", "static")):
-                    nodes.extend(self.parse_statement())
-                else:
-                    pass  # TODO: error
-        except Exception as e:
-            for i in log:
-                print(i)
-            print(ASTNode("root", nodes, file=self.file))
-            raise e
-        return ASTNode("root", nodes, file=self.file)
-
-    @log_function
-    def parse_import(self) -> ASTNode:
-        self.get()
-        if self.now in STDLIB:
-            lib_name = self.now.content
-            lib_alias = self.now.content
-        elif self.now.type == "string":
+            for node in self.iter_parse():
+                nodes.append(node)
+        except Exception:
+            # a traced parse shows the rules and tokens before the error and the tree so far
+            if trace.tracer is not None:
+                for i in trace.records():
+                    print(i, file=stderr)
+                print(Root(nodes, self.file), file=stderr)
+            raise
+        return Root(nodes, self.file)
+
+    def iter_parse(self) -> Iterator[Node]:
+        # top-level nodes as soon as each is complete; errors are raised as they are, after the nodes before them
+        while True:
+            unit = self.parse_unit()
+            if unit is None:
+                return
+            yield from unit
+
+    def parse_unit(self) -> Optional[list[Node]]:
+        # one top-level import, function, class or statement, None once the tokens run out
+        if not self.more():
+            return None
+        self.get()
+        code = self.now.code
+        if code == IMPORT:
+            return [self.parse_import()]
+        elif code == FUNCTION:
+            return [self.parse_function()]
+        elif code == CLASS:
+            return [self.parse_class()]
+        return self.located_statement()
+
+    @trace.rule
+    def parse_import(self) -> Import:
+        self.get()
+        if self.now.code == IDENTIFIER and self.now.content in STDLIB_NAMES:
+            lib_name = lib_alias = self.intern(self.now.content)
+        elif self.now.code == STRING:
             lib_name = self.now.content
             self.get()
-            if self.now != Token("keyword", "as"):
+            if self.now.code != AS:
                 self.error(f"Expected 'as' after import statement", self.now.location)
             self.get()
-            if self.now.type != "identifier":  # type: ignore
+            if self.now.code != IDENTIFIER:  # type: ignore
                 self.error(f"Expected identifier after 'as' in import statement", self.now.location)
-            lib_alias = self.now.content
-        elif self.now.type == "identifier":
+            lib_alias = self.intern(self.now.content)
+        elif self.now.code == IDENTIFIER:
             self.error(f"{self.now.content} does not exist in stdlib", self.now.location)
         else:
             self.error(f"Invalid import statement", self.now.location)
-        return ASTNode("import", name=lib_name, alias=lib_alias)
+        self.get()
+        if self.now.code != SEMICOLON:
+            self.error("Expected ';' after import statement", self.now.location)
+        return Import(lib_name, lib_alias)
 
-    @log_function
-    def parse_var(self) -> list[ASTNode]:
-        assert self.now in Tokens("keyword", ("var", "constant", "attr", "static"))
+    @trace.rule
+    def parse_var(self) -> list[VarDecl]:
+        assert self.now.code in DECLARE_VAR or self.now.code in DECLARE_ATTR
         var_kind = self.now.content
         self.get()
-        if self.now == Token("keyword", "global"):
+        if self.now.code == GLOBAL:
             self.get()
             var_kind += " global"
+        var_kind = self.intern(var_kind)
         type_var = self.parse_type()
         self.get()
-        if self.now.type != "identifier":
+        if self.now.code != IDENTIFIER:
             self.error(f"Expected identifier after variable type", self.now.location)
-        declare_var: list[ASTNode] = []
-        var_name = self.now.content
+        declare_var: list[VarDecl] = []
+        var_name = self.intern(self.now.content)
         self.get()
-        var_expression = ASTNode("None", "None")
-        if self.now == Token("symbol", "="):
+        var_expression: Node = Empty("None")
+        if self.now.code == ASSIGN:
             self.get()
             var_expression = self.parse_expression()
         declare_var.append(
-            ASTNode(
-                "var",
+            VarDecl(
                 var_type=type_var,
                 var_kind=var_kind,
                 name=var_name,
                 expression=var_expression,
             )
         )
-        if self.now == Token("symbol", ";"):
+        if self.now.code == SEMICOLON:
             return declare_var
-        elif self.now == Token("symbol", ","):
-            # while self.now == Token("symbol", ";"):
+        elif self.now.code == COMMA:
+            # while self.now.code == SEMICOLON:
             while True:
                 self.get()
-                if self.now.type != "identifier":
+                if self.now.code != IDENTIFIER:
                     self.error(f"Expected identifier after ',' in variable declaration", self.now.location)
-                var_name = self.now.content
+                var_name = self.intern(self.now.content)
                 self.get()
-                var_expression = ASTNode("None", "None")
-                if self.now == Token("symbol", "="):
+                var_expression: Node = Empty("None")
+                if self.now.code == ASSIGN:
                     self.get()
                     var_expression = self.parse_expression()
                 declare_var.append(
-                    ASTNode(
-                        "var",
+                    VarDecl(
                         var_type=type_var,
                         var_kind=var_kind,
                         name=var_name,
                         expression=var_expression,
                     )
                 )
-                if self.now == Token("symbol", ";"):
+                if self.now.code == SEMICOLON:
                     return declare_var
-                elif self.now != Token("symbol", ","):
+                elif self.now.code != COMMA:
                     self.error(f"Invalid variable declaration", self.now.location)
         else:
             self.error(f"Invalid variable declaration", self.now.location)
         return declare_var
 
-    @log_function
-    def parse_type(self) -> ASTNode:
-        if self.now in BUILTINTYPE or self.now.type == "identifier":
+    @trace.rule
+    def parse_type(self) -> Type:
+        if self.now.code in BUILTINTYPES or self.now.code == IDENTIFIER:
             type_a = self.now.content
         else:
             self.error(f"Invalid type declaration", self.now.location)
-        type_b: list[ASTNode] = []
-        if self.next() == Token("symbol", "<"):
+        type_b: list[Type] = []
+        if self.next().code == LT:
             self.get()
             self.get()
             type_b.append(self.parse_type())
             self.get()
-            if self.now == Token("symbol", ","):
+            if self.now.code == COMMA:
                 while True:
+                    self.get()
                     type_b.append(self.parse_type())
                     self.get()
-                    if self.now == Token("symbol", ">"):
+                    if self.now.code == GT:
                         break
-                    elif self.now != Token("symbol", ","):
+                    elif self.now.code != COMMA:
                         self.error(f"Expected '>' after type declaration", self.now.location)
-                    self.get()
-            if self.now != Token("symbol", ">"):
+            if self.now.code != GT:
                 self.error(f"Expected '>' after type declaration", self.now.location)
-        return ASTNode("type", type_a=type_a, type_b=type_b)
+        return self.interner.type(type_a, type_b)
 
-    @log_function
-    def parse_expression(self) -> ASTNode:
-        input: list[ASTNode] = []
-        output: list[ASTNode] = []
-        stack: list[ASTNode] = []
+    @trace.rule
+    def parse_expression(self) -> Expression:
+        if self.expression == "tree":
+            return Expression(self.parse_binary(LOOSEST))
+        input: list[Node] = []
+        output: list[Node] = []
+        stack: list[Operator] = []
         input.append(self.parse_term())
         self.get()
         while True:
-            if self.now in OPERATOR:
-                input.append(ASTNode("operator", self.now.content))
+            if self.now.code in OPERATORS:
+                input.append(Operator(self.now.content))
                 self.get()
             else:
                 break
             input.append(self.parse_term())
             self.get()
         for i in input:
-            if i.type == "operator":
+            if isinstance(i, Operator):
                 while len(stack) > 0:
-                    assert "value" in i.args
-                    assert "value" in stack[-1].args
-                    assert isinstance(i.args["value"], str)
-                    assert isinstance(stack[-1].args["value"], str)
-                    if PRECEDENCE[i.args["value"]] >= PRECEDENCE[stack[-1].args["value"]]:
+                    if OPERATOR_LEVEL[i.value] >= OPERATOR_LEVEL[stack[-1].value]:
                         output.append(stack.pop())
                     else:
                         break
                 stack.append(i)
             else:
-                assert i.type == "term"
                 output.append(i)
         while len(stack) > 0:
             output.append(stack.pop())
-        return ASTNode("expression", output)
-
-    @log_function
-    def parse_term(self) -> ASTNode:
-        if self.now.type == "symbol" and self.now.content in ("-", "^", "!", "@"):
-            t = ""
-            if self.now.content == "@":
-                t = "pointer"
-            elif self.now.content == "!":
-                t = "not"
-            elif self.now.content == "-":
-                t = "neg"
-            elif self.now.content == "^":
-                t = "depointer"
-            assert t != ""
+        return Expression(output)
+
+    @trace.rule
+    def parse_binary(self, limit: int) -> Node:
+        # precedence climbing: consume operators binding at least as tight as limit, recursing for the right
+        # operand with a tighter limit unless the operator is right associative
+        left = self.parse_term()
+        self.get()
+        while self.now.code in LEVEL:
+            code = self.now.code
+            level = LEVEL[code]
+            if level > limit:
+                break
+            operator = self.now.content
             self.get()
-            return ASTNode("term", ASTNode(t, self.parse_term()))
-        elif self.now == Token("symbol", "("):
+            right = self.parse_binary(level if code in RIGHT else level - 1)
+            left = Binary(operator, left, right)
+        return left
+
+    @trace.rule
+    def parse_term(self) -> Term:
+        code = self.now.code
+        if code in UNARY:
+            unary = UNARY[code]
+            self.get()
+            return Term(unary(self.parse_term()))
+        elif code == LPAREN:
             term = self.parse_tuple()
-            assert "value" in term.args
-            assert isinstance(term.args["value"], list)
-            assert len(term.args["value"]) >= 1
-            assert isinstance(term.args["value"][0], ASTNode)
-            assert term.args["value"][0].type == "expression"
-            if len(term.args["value"]) == 1:
-                return ASTNode("term", ASTNode("expression", term.args["value"][0]))
+            assert len(term.value) >= 1
+            if len(term.value) == 1:
+                return Term(Expression(term.value[0]))
             else:
-                return ASTNode("term", ASTNode("tuple", term.args["value"]))
-        elif self.now == Token("symbol", "["):
-            return ASTNode("term", self.parse_arr())
-        elif self.now == Token("symbol", "{"):
-            return ASTNode("term", self.parse_dict())
-        elif self.now.type == "identifier":
-            return ASTNode("term", self.parse_variable())
-        elif self.now.type in ("int", "float", "string", "char"):
-            return ASTNode("term", ASTNode(self.now.type, self.now.content))
-        elif self.now.type == "keyword":
-            if self.now.content in ("true", "false"):
-                return ASTNode("term", ASTNode("bool", self.now.content))
-            elif self.now.content == "NULL":
-                return ASTNode("term", ASTNode("void", "NULL"))
-            elif self.now in BUILTINTYPE:
-                return ASTNode("term", self.parse_variable())
+                return Term(term)
+        elif code == LBRACKET:
+            return Term(self.parse_arr())
+        elif code == LBRACE:
+            return Term(self.parse_dict())
+        elif code == IDENTIFIER:
+            return Term(self.parse_variable())
+        elif code in LITERALS:
+            return Term(LITERALS[code](self.now.content))
+        elif code in KEYWORDS:
+            if code == TRUE or code == FALSE:
+                return Term(Bool(self.now.content))
+            elif code == NULL:
+                return Term(Void("NULL"))
+            elif code in BUILTINTYPES:
+                return Term(self.parse_variable())
             else:
                 self.error(f"The keyword '{self.now.content}' does not exist in term", self.now.location)
         else:
             self.error("Invalid term", self.now.location)
-        return ASTNode("term")
+        return Term()
 
-    @log_function
-    def parse_variable(self) -> ASTNode:
+    @trace.rule
+    def parse_variable(self) -> Variable:
         # TODO: parse variable
-        if self.now.type != "identifier" and self.now not in BUILTINTYPE:
+        if self.now.code != IDENTIFIER and self.now.code not in BUILTINTYPES:
             self.error("Expected identifier in variable", self.now.location)
-        var_name = self.now.content
-        if self.next() == Token("symbol", "["):
+        var_name = self.intern(self.now.content)
+        if self.next().code == LBRACKET:
             self.get()
             self.get()
             index = self.parse_expression()
-            if self.now != Token("symbol", "]"):
+            if self.now.code != RBRACKET:
                 self.error("Expected ']' after index in variable", self.now.location)
-            var = ASTNode("variable", var_name, index=index)
-        elif self.next() == Token("symbol", "."):
+            var = Variable(var_name, index=index)
+        elif self.next().code == DOT:
             self.get()
             self.get()
-            var = ASTNode("variable", var_name, attr=self.parse_variable())
+            var = Variable(var_name, attr=self.parse_variable())
         else:
-            var = ASTNode("variable", var_name)
-        if self.next() == Tokens("symbol", ("(", "<")):
+            var = Variable(var_name)
+        code = self.next().code
+        if code == LPAREN or code == LT and self.type_arguments():
             self.get()
             var = self.parse_call(var)
         return var
 
-    @log_function
-    def parse_call(self, var: ASTNode) -> ASTNode:
-        types: list[ASTNode] = []
-        if self.now == "<":
+    def type_arguments(self) -> bool:
+        # whether the "<" after a name opens the type arguments of a call: names and types up to its matching
+        # ">", which comes right before "(". Otherwise it is the operator
+        depth = 0
+        i = 1
+        while True:
+            code = self.next(i).code
+            i += 1
+            if code == COMMENT or code == COMMA or code == IDENTIFIER or code in BUILTINTYPES:
+                continue
+            elif code == LT:
+                depth += 1
+            elif code == GT:
+                depth -= 1
+                if depth == 0:
+                    while self.next(i).code == COMMENT:
+                        i += 1
+                    return self.next(i).code == LPAREN
+            else:
+                return False
+
+    @trace.rule
+    def parse_call(self, var: Variable) -> Call:
+        types: list[Type] = []
+        if self.now.code == LT:
             self.get()
             types.append(self.parse_type())
             self.get()
-            if self.now == Token("symbol", ","):
+            if self.now.code == COMMA:
                 while True:
+                    self.get()
                     types.append(self.parse_type())
                     self.get()
-                    if self.now == Token("symbol", ">"):
+                    if self.now.code == GT:
                         break
-                    elif self.now != Token("symbol", ","):
+                    elif self.now.code != COMMA:
                         self.error("Expected '>' after type declaration", self.now.location)
-                    self.get()
-            if self.now != Token("symbol", ">"):
+            if self.now.code != GT:
                 self.error("Expected '>' after type declaration", self.now.location)
             self.get()
-        if self.now != Token("symbol", "("):
+        if self.now.code != LPAREN:
             self.error("Expected '(' after function call", self.now.location)
         self.get()
-        args: list[ASTNode] = []
-        if self.now != Token("symbol", ")"):
+        args: list[Expression] = []
+        if self.now.code != RPAREN:
             args.append(self.parse_expression())
-            while self.now == Token("symbol", ","):
+            while self.now.code == COMMA:
                 self.get()
                 args.append(self.parse_expression())
-            if self.now != Token("symbol", ")"):
+            if self.now.code != RPAREN:
                 self.error("Expected ')' after function call", self.now.location)
-        return ASTNode("call", var=var, types=types, args=args)
+        return Call(var, types, args)
 
-    @log_function
-    def parse_arr(self) -> ASTNode:
-        arr: list[ASTNode] = []
-        assert self.now == Token("symbol", "[")
+    @trace.rule
+    def parse_arr(self) -> Arr:
+        arr: list[Expression] = []
+        assert self.now.code == LBRACKET
         self.get()
-        if self.now != Token("symbol", "]"):
+        if self.now.code != RBRACKET:
             arr.append(self.parse_expression())
-            while self.now == Token("symbol", ","):
+            while self.now.code == COMMA:
                 self.get()
                 arr.append(self.parse_expression())
-            if self.now != Token("symbol", "]"):
+            if self.now.code != RBRACKET:
                 self.error("Expected ']' after array declaration", self.now.location)
-        return ASTNode("arr", arr)
+        return Arr(arr)
 
-    @log_function
-    def parse_tuple(self) -> ASTNode:
-        t: list[ASTNode] = []
-        assert self.now == Token("symbol", "(")
+    @trace.rule
+    def parse_tuple(self) -> Tuple:
+        t: list[Expression] = []
+        assert self.now.code == LPAREN
         self.get()
-        if self.now != Token("symbol", ")"):
+        if self.now.code != RPAREN:
             t.append(self.parse_expression())
-            while self.now == Token("symbol", ","):
+            while self.now.code == COMMA:
                 self.get()
                 t.append(self.parse_expression())
-            if self.now != Token("symbol", ")"):
+            if self.now.code != RPAREN:
                 self.error("Expected ')' after tuple declaration", self.now.location)
-        return ASTNode("tuple", t)
+        return Tuple(t)
 
-    @log_function
-    def parse_dict(self) -> ASTNode:
-        d: list[tuple[ASTNode, ASTNode]] = []
-        assert self.now == Token("symbol", "{")
+    @trace.rule
+    def parse_dict(self) -> Dict:
+        d: list[tuple[Expression, Expression]] = []
+        assert self.now.code == LBRACE
         self.get()
-        if self.now != Token("symbol", "}"):
+        if self.now.code != RBRACE:
             a = self.parse_expression()
-            if self.now != Token("symbol", ":"):
+            if self.now.code != COLON:
                 self.error("Expected ':' after key in dict declaration", self.now.location)
             self.get()
             b = self.parse_expression()
             d.append((a, b))
-            while self.now == Token("symbol", ","):
+            while self.now.code == COMMA:
+                self.get()
                 a = self.parse_expression()
-                if self.now != Token("symbol", ":"):
+                if self.now.code != COLON:
                     self.error("Expected ':' after key in dict declaration", self.now.location)
                 self.get()
                 b = self.parse_expression()
                 d.append((a, b))
-            if self.now != Token("symbol", "}"):
+            if self.now.code != RBRACE:
                 self.error("Expected '}' after array declaration", self.now.location)
-        return ASTNode("dict")
+        return Dict()
 
-    @log_function
-    def parse_function(self) -> ASTNode:
-        assert self.now == Token("keyword", "function")
+    @trace.rule
+    def parse_function(self) -> Function:
+        assert self.now.code == FUNCTION
         self.get()
         constant = False
-        if self.now == Token("keyword", "constant"):
+        if self.now.code == CONSTANT:
             constant = True
             self.get()
         func_type = self.parse_type()
         self.get()
-        if self.now.type != "identifier":
+        if self.now.code != IDENTIFIER:
             self.error("Expected identifier after function type", self.now.location)
-        func_name = self.now.content
+        func_name = self.intern(self.now.content)
         self.get()
-        types: list[ASTNode] = []
-        if self.now == Token("symbol", "<"):
+        types: list[VarDecl] = []
+        if self.now.code == LT:
             self.get()
-            if self.now.type != "identifier":
+            if self.now.code != IDENTIFIER:
                 self.error("Expected identifier after '<' in function declaration", self.now.location)
             types.append(
-                ASTNode(
-                    "var",
-                    var_type=ASTNode("type", type_a="type", type_b=[]),
+                VarDecl(
+                    var_type=self.interner.type("type", []),
                     var_kind="typevar",
-                    name=self.now.content,
-                    expression=ASTNode("None", "None"),
+                    name=self.intern(self.now.content),
+                    expression=Empty("None"),
                 )
             )
             self.get()
-            if self.now == Token("symbol", ","):
+            if self.now.code == COMMA:
                 while True:
-                    if self.now.type != "identifier":
+                    self.get()
+                    if self.now.code != IDENTIFIER:
                         self.error("Expected identifier after '<' in function declaration", self.now.location)
                     types.append(
-                        ASTNode(
-                            "var",
-                            var_type=ASTNode("type", type_a="type", type_b=[]),
+                        VarDecl(
+                            var_type=self.interner.type("type", []),
                             var_kind="typevar",
-                            name=self.now.content,
-                            expression=ASTNode("None", "None"),
+                            name=self.intern(self.now.content),
+                            expression=Empty("None"),
                         )
                     )
                     self.get()
-                    if self.now == Token("symbol", ">"):
+                    if self.now.code == GT:
                         break
-                    elif self.now != Token("symbol", ","):
+                    elif self.now.code != COMMA:
                         self.error("Expected '>' after type declaration", self.now.location)
-                    self.get()
-            if self.now != Token("symbol", ">"):
+            if self.now.code != GT:
                 self.error("Expected '>' after type declaration", self.now.location)
             self.get()
-        if self.now != Token("symbol", "("):
+        if self.now.code != LPAREN:
             self.error("Expected '(' after function name", self.now.location)
         args = self.parse_args()
         self.get()
-        if self.now != Token("symbol", "{"):
+        if self.now.code != LBRACE:
             self.error("Expected '{' after function declaration", self.now.location)
+        func_body = self.parse_block()
+        return Function(constant, func_type, types, func_name, args, func_body)
+
+    @trace.rule
+    def parse_block(self) -> list[Node]:
+        # the statements between "{" and "}", from the "{" to the "}"
+        if self.now.code != LBRACE:
+            self.error("Expected '{'", self.now.location)
         self.get()
-        func_body: list[ASTNode] = []
-        while self.now != Token("symbol", "}"):
-            func_body.extend(self.parse_statement())
+        body: list[Node] = []
+        while self.now.code != RBRACE:
+            body.extend(self.located_statement())
             self.get()
-        return ASTNode("function", constant=constant, func_type=func_type, type_var=types, name=func_name, args=args, body=func_body)
+        return body
+
+    def located_statement(self) -> list[Node]:
+        start = self.now
+        nodes = self.parse_statement()
+        if self.locations is not None:
+            for node in nodes:
+                self.locations[node] = start
+        return nodes
+
+    def parse_else(self) -> list[Node]:
+        # an optional "else" block after a loop or if, on its "}" when there is one
+        if self.next().code != ELSE:
+            return []
+        self.get()
+        self.get()
+        return self.parse_block()
+
+    def parse_label(self) -> Optional[str]:
+        self.get()
+        if self.now.code != IDENTIFIER:
+            return None
+        label = self.intern(self.now.content)
+        self.get()
+        return label
+
+    def parse_condition(self, statement: str) -> Expression:
+        # "(" expression ")", from the "(" to the ")"
+        if self.now.code != LPAREN:
+            self.error(f"Expected '(' after {statement}", self.now.location)
+        self.get()
+        condition = self.parse_expression()
+        if self.now.code != RPAREN:
+            self.error(f"Expected ')' after {statement} condition", self.now.location)
+        return condition
 
-    @log_function
-    def parse_class(self) -> ASTNode:
-        return ASTNode("class")
+    @trace.rule
+    def parse_class(self) -> Class:
+        # in grammar.bnf but not built yet: an error rather than the class left out of the tree
+        self.error("Classes are not supported yet", self.now.location)
 
-    @log_function
-    def parse_statement(self) -> list[ASTNode]:
-        if self.now == Token("keyword", "if"):
+    @trace.rule
+    def parse_statement(self) -> list[Node]:
+        code = self.now.code
+        if code == IF:
             return [self.parse_if()]
-        elif self.now == Token("keyword", "for"):
+        elif code == FOR:
             return [self.parse_for()]
-        elif self.now == Token("keyword", "while"):
+        elif code == WHILE:
             return [self.parse_while()]
-        elif self.now == Token("keyword", "break"):
+        elif code == BREAK:
             return [self.parse_break()]
-        elif self.now == Token("keyword", "return"):
+        elif code == RETURN:
             return [self.parse_return()]
-        elif self.now == Tokens("keyword", ("var", "constant")):
+        elif code in DECLARE_VAR:
             return self.parse_var()
-        elif self.now == Tokens("keyword", ("attr", "static")):
+        elif code in DECLARE_ATTR:
             self.error("declare attr not in function", self.now.location)
-        elif self.now == Token("keyword", "continue"):
+        elif code == CONTINUE:
             self.get()
-            if self.now != Token("symbol", ";"):
+            if self.now.code != SEMICOLON:
                 self.error("Expected ';' after continue statement", self.now.location)
-            return [ASTNode("continue")]
-        elif self.now == Token("keyword", "pass"):
+            return [Continue()]
+        elif code == PASS:
             self.get()
-            if self.now != Token("symbol", ";"):
+            if self.now.code != SEMICOLON:
                 self.error("Expected ';' after continue statement", self.now.location)
-            return [ASTNode("pass")]
+            return [Pass()]
         else:
             t = self.parse_expression()
-            if self.now != Token("symbol", ";"):
-                self.error("Expected ';' after continue statement", self.now.location)
+            if self.now.code != SEMICOLON:
+                self.error("Expected ';' after expression", self.now.location)
             return [t]
 
-    @log_function
-    def parse_if(self) -> ASTNode:
-        return ASTNode("if")
+    @trace.rule
+    def parse_if(self) -> If:
+        assert self.now.code == IF or self.now.code == ELIF
+        statement = self.now.content
+        self.get()
+        condition = self.parse_condition(statement)
+        self.get()
+        body = self.parse_block()
+        if self.next().code == ELIF:
+            self.get()
+            return If(condition, body, [self.parse_if()])
+        return If(condition, body, self.parse_else())
 
-    @log_function
-    def parse_for(self) -> ASTNode:
-        return ASTNode("for")
+    @trace.rule
+    def parse_for(self) -> For:
+        assert self.now.code == FOR
+        label = self.parse_label()
+        if self.now.code != LPAREN:
+            self.error("Expected '(' after for", self.now.location)
+        self.get()
+        var_type = self.parse_type()
+        self.get()
+        if self.now.code != IDENTIFIER:
+            self.error("Expected identifier after type in for", self.now.location)
+        var = VarDecl(var_type=var_type, var_kind="for", name=self.intern(self.now.content), expression=Empty("None"))
+        self.get()
+        if self.now.code != IN:
+            self.error("Expected 'in' after variable in for", self.now.location)
+        self.get()
+        iterator = self.parse_variable()
+        self.get()
+        if self.now.code != RPAREN:
+            self.error("Expected ')' after iterator in for", self.now.location)
+        self.get()
+        body = self.parse_block()
+        return For(label, var, iterator, body, self.parse_else())
 
-    @log_function
-    def parse_while(self) -> ASTNode:
-        return ASTNode("while")
+    @trace.rule
+    def parse_while(self) -> While:
+        assert self.now.code == WHILE
+        label = self.parse_label()
+        condition = self.parse_condition("while")
+        self.get()
+        body = self.parse_block()
+        return While(label, condition, body, self.parse_else())
 
-    @log_function
-    def parse_break(self) -> ASTNode:
-        return ASTNode("break")
+    @trace.rule
+    def parse_break(self) -> Break:
+        assert self.now.code == BREAK
+        label = self.parse_label()
+        if self.now.code != SEMICOLON:
+            self.error("Expected ';' after break statement", self.now.location)
+        return Break(label)
 
-    @log_function
-    def parse_return(self) -> ASTNode:
-        assert self.now == Token("keyword", "return")
+    @trace.rule
+    def parse_return(self) -> Return:
+        assert self.now.code == RETURN
         self.get()
-        t = ASTNode("None", "None")
-        if self.now != Token("symbol", ";"):
+        t: Node = Empty("None")
+        if self.now.code != SEMICOLON:
             t = self.parse_expression()
-        if self.now != Token("symbol", ";"):
+        if self.now.code != SEMICOLON:
             self.error("Expected ';' after return statement", self.now.location)
-        return ASTNode("return", t)
+        return Return(t)
 
-    @log_function
-    def parse_args(self) -> list[ASTNode]:
-        assert self.now == Token("symbol", "(")
+    @trace.rule
+    def parse_args(self) -> list[VarDecl]:
+        assert self.now.code == LPAREN
         self.get()
-        args: list[ASTNode] = []
-        if self.now != Token("symbol", ")"):
+        args: list[VarDecl] = []
+        if self.now.code != RPAREN:
             arg_type = self.parse_type()
             self.get()
-            if self.now.type != "identifier":
+            if self.now.code != IDENTIFIER:
                 self.error("Expected identifier after argument type", self.now.location)
             args.append(
-                ASTNode(
-                    "var",
+                VarDecl(
                     var_type=arg_type,
                     var_kind="arg",
-                    name=self.now.content,
-                    expression=ASTNode("None", "None"),
+                    name=self.intern(self.now.content),
+                    expression=Empty("None"),
                 )
             )
             self.get()
-            while self.now == Token("symbol", ","):
+            while self.now.code == COMMA:
                 self.get()
                 arg_type = self.parse_type()
                 self.get()
-                if self.now.type != "identifier":
+                if self.now.code != IDENTIFIER:
                     self.error("Expected identifier after argument type", self.now.location)
                 args.append(
-                    ASTNode(
-                        "var",
+                    VarDecl(
                         var_type=arg_type,
                         var_kind="arg",
-                        name=self.now.content,
-                        expression=ASTNode("None", "None"),
+                        name=self.intern(self.now.content),
+                        expression=Empty("None"),
                     )
                 )
                 self.get()
-            if self.now != Token("symbol", ")"):
+            if self.now.code != RPAREN:
                 self.error("Expected ')' after subroutine arguments", self.now.location)
         return args
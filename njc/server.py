@@ -0,0 +1,257 @@
+import json
+import sys
+from os import stat
+from os.path import abspath
+from socket import AF_UNIX, SOCK_STREAM, socket
+from socketserver import StreamRequestHandler, ThreadingUnixStreamServer
+from threading import Lock
+from typing import Any, BinaryIO, Callable, Optional
+from urllib.parse import unquote, urlparse
+
+from .build import compile_file, Options, Result
+from .incremental import Document
+from .lib import Args
+from .main import parse_args, parse_options
+
+# JSON-RPC error codes
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+Message = dict[str, Any]
+
+
+def read_message(stream: BinaryIO) -> Optional[Message]:
+    # one message framed the way the language server protocol does it, None at the end of the stream
+    length = -1
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        if line in (b"\r\n", b"\n"):
+            break
+        name, _, value = line.decode("ascii").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    if length < 0:
+        raise ValueError("Message without Content-Length")
+    message: Message = json.loads(stream.read(length))
+    return message
+
+
+def write_message(stream: BinaryIO, message: Message) -> None:
+    body = json.dumps(message).encode()
+    stream.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    stream.flush()
+
+
+def uri_path(uri: str) -> str:
+    if uri.startswith("file:"):
+        return unquote(urlparse(uri).path)
+    return abspath(uri)
+
+
+def path_uri(path: str) -> str:
+    return "file://" + path
+
+
+class Server:
+    """Compiler state kept warm between requests.
+
+    Open documents are parsed incrementally as they are edited, other files are compiled once and served from
+    memory until their size or mtime changes. Requests are JSON-RPC, see METHODS.
+    """
+
+    def __init__(self, options: Options) -> None:
+        self.options = options
+        self.documents: dict[str, Document] = {}
+        # path -> ((mtime, size), result) of files compiled from disk
+        self.results: dict[str, tuple[tuple[int, int], Result]] = {}
+        # the parser keeps the source of a file in a module global, one request at a time
+        self.lock = Lock()
+
+    def handle(self, message: Message, send: Callable[[Message], None]) -> None:
+        method = message.get("method", "")
+        params = message.get("params") or {}
+        handler = METHODS.get(method)
+        response: Message = {"jsonrpc": "2.0", "id": message.get("id")}
+        try:
+            if handler is None:
+                response["error"] = {"code": METHOD_NOT_FOUND, "message": f"Unknown method {method}"}
+            else:
+                with self.lock:
+                    response["result"] = handler(self, params, send)
+        except (KeyError, TypeError, ValueError) as e:
+            response["error"] = {"code": INVALID_PARAMS, "message": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            response["error"] = {"code": INTERNAL_ERROR, "message": f"{type(e).__name__}: {e}"}
+        # notifications get no response
+        if "id" in message:
+            send(response)
+
+    def initialize(self, params: Message, send: Callable[[Message], None]) -> Message:
+        # full or ranged document changes
+        return {"capabilities": {"textDocumentSync": 2}, "serverInfo": {"name": "njc"}}
+
+    def initialized(self, params: Message, send: Callable[[Message], None]) -> None:
+        return None
+
+    def shutdown(self, params: Message, send: Callable[[Message], None]) -> None:
+        # state is only dropped on exit
+        return None
+
+    def did_open(self, params: Message, send: Callable[[Message], None]) -> None:
+        document = params["textDocument"]
+        path = uri_path(document["uri"])
+        self.documents[path] = Document(path, document["text"], self.options.expression)
+        self.publish(path, send)
+
+    def did_change(self, params: Message, send: Callable[[Message], None]) -> None:
+        path = uri_path(params["textDocument"]["uri"])
+        document = self.documents[path]
+        for change in params["contentChanges"]:
+            if "range" not in change:
+                document = self.documents[path] = Document(path, change["text"], self.options.expression)
+                continue
+            # protocol positions count lines from 0; characters are taken as code points
+            start, end = change["range"]["start"], change["range"]["end"]
+            document.edit((start["line"] + 1, start["character"]), (end["line"] + 1, end["character"]), change["text"])
+        self.publish(path, send)
+
+    def did_close(self, params: Message, send: Callable[[Message], None]) -> None:
+        path = uri_path(params["textDocument"]["uri"])
+        self.documents.pop(path, None)
+        send({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics", "params": {"uri": path_uri(path), "diagnostics": []}})
+
+    def publish(self, path: str, send: Callable[[Message], None]) -> None:
+        diagnostics: list[Message] = []
+        for unit in self.documents[path].failed:
+            line, column = unit.location
+            start, end = {"line": line - 1, "character": column}, {"line": line - 1, "character": column + 1}
+            diagnostics.append({"range": {"start": start, "end": end}, "severity": 1, "source": "njc", "message": unit.error})
+        send({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics", "params": {"uri": path_uri(path), "diagnostics": diagnostics}})
+
+    def result(self, path: str) -> Result:
+        # open documents win over the file on disk
+        document = self.documents.get(path)
+        if document is not None:
+            return Result(path, error="\n".join(document.errors)) if document.errors else Result(path, document.ast)
+        info = stat(path)
+        version = (info.st_mtime_ns, info.st_size)
+        cached = self.results.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        result = compile_file(path, self.options)
+        self.results[path] = (version, result)
+        return result
+
+    def parse(self, params: Message, send: Callable[[Message], None]) -> Message:
+        # the tree of one file as njc prints it
+        path = uri_path(params["uri"]) if "uri" in params else abspath(params["path"])
+        result = self.result(path)
+        return {"path": path, "error": result.error, "ast": repr(result.ast) if not result.error else None}
+
+    def compile(self, params: Message, send: Callable[[Message], None]) -> list[Message]:
+        # errors only, the trees stay in the server
+        return [{"path": path, "error": self.result(path).error} for path in map(abspath, params["paths"])]
+
+
+METHODS: dict[str, Callable[[Server, Message, Callable[[Message], None]], Any]] = {
+    "initialize": Server.initialize,
+    "initialized": Server.initialized,
+    "shutdown": Server.shutdown,
+    "textDocument/didOpen": Server.did_open,
+    "textDocument/didChange": Server.did_change,
+    "textDocument/didClose": Server.did_close,
+    "njc/parse": Server.parse,
+    "njc/compile": Server.compile,
+}
+
+
+def serve(server: Server, reader: BinaryIO, writer: BinaryIO) -> None:
+    # one connection until exit or the end of its stream
+    write_lock = Lock()
+
+    def send(message: Message) -> None:
+        with write_lock:
+            write_message(writer, message)
+
+    while True:
+        message = read_message(reader)
+        if message is None or message.get("method") == "exit":
+            return
+        server.handle(message, send)
+
+
+def serve_stdio(server: Server) -> None:
+    reader, writer = sys.stdin.buffer, sys.stdout.buffer
+    # the parser prints partial trees when a file fails, keep them out of the protocol stream
+    sys.stdout = sys.stderr
+    serve(server, reader, writer)
+
+
+def listen(server: Server, path: str) -> ThreadingUnixStreamServer:
+    # every connection gets a thread, they share the server state
+    class Handler(StreamRequestHandler):
+        def handle(self) -> None:
+            serve(server, self.rfile, self.wfile)
+
+    listener = ThreadingUnixStreamServer(path, Handler)
+    listener.daemon_threads = True
+    return listener
+
+
+def serve_socket(server: Server, path: str) -> None:
+    with listen(server, path) as listener:
+        listener.serve_forever()
+
+
+class Client:
+    # a blocking connection to a server listening on a Unix socket
+    def __init__(self, path: str) -> None:
+        self.socket = socket(AF_UNIX, SOCK_STREAM)
+        self.socket.connect(path)
+        self.reader = self.socket.makefile("rb")
+        self.writer = self.socket.makefile("wb")
+        self.id = 0
+        # notifications that arrived while waiting for a response
+        self.notifications: list[Message] = []
+
+    def notify(self, method: str, params: Message) -> None:
+        write_message(self.writer, {"jsonrpc": "2.0", "method": method, "params": params})
+
+    def request(self, method: str, params: Message) -> Any:
+        self.id += 1
+        write_message(self.writer, {"jsonrpc": "2.0", "id": self.id, "method": method, "params": params})
+        while True:
+            message = read_message(self.reader)
+            if message is None:
+                raise ConnectionError("Server closed the connection")
+            if message.get("id") != self.id:
+                self.notifications.append(message)
+                continue
+            if "error" in message:
+                raise RuntimeError(message["error"]["message"])
+            return message.get("result")
+
+    def close(self) -> None:
+        self.reader.close()
+        self.writer.close()
+        self.socket.close()
+
+
+def main(args: Args) -> None:
+    options, _, flags = parse_options(args)
+    path = ""
+    for i in flags:
+        if i.startswith("--socket="):
+            path = i[len("--socket=") :]
+    server = Server(options)
+    if path:
+        serve_socket(server, path)
+    else:
+        serve_stdio(server)
+
+
+if __name__ == "__main__":
+    main(parse_args(sys.argv[1:]))
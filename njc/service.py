@@ -0,0 +1,179 @@
+import asyncio
+import json
+import sys
+from base64 import b64encode
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from os import cpu_count
+from os.path import abspath
+from typing import Any, Optional
+
+from .build import compile_file, Options, Result
+from .lib import Args
+from .main import parse_args, parse_options
+
+# defaults: files per worker call, files waiting for a worker before readers stop reading, seconds a batch
+# waits to fill up
+BATCH = 16
+QUEUE = 256
+DELAY = 0.002
+
+Message = dict[str, Any]
+
+
+def compile_batch(paths: list[str], options: Options) -> list[Result]:
+    # one round trip to a worker for several files
+    return [compile_file(i, options) for i in paths]
+
+
+class Job:
+    __slots__ = ("path", "future")
+
+    def __init__(self, path: str, future: "asyncio.Future[Result]") -> None:
+        self.path = path
+        self.future = future
+
+
+class Service:
+    """Compile requests from many connections, batched onto a process pool.
+
+    A request is one line of JSON, {"id": ..., "paths": [...], "binary": false}. Every file is answered on its
+    own line as soon as it is compiled, {"id", "path", "error"} plus the tree in the binary format, base64, when
+    asked for, and {"id", "done": true} follows the last one. Files wait in a bounded queue; when it is full a
+    connection is not read from until there is room again, and only as many batches as there are workers are
+    in flight.
+    """
+
+    def __init__(self, options: Options, jobs: int = 0, batch: int = BATCH, queue: int = QUEUE, delay: float = DELAY) -> None:
+        self.options = options
+        self.jobs = jobs if jobs > 0 else cpu_count() or 1
+        self.batch = batch
+        self.delay = delay
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(queue)
+        # forked workers would inherit the client sockets open at the time and keep them from closing
+        self.pool = ProcessPoolExecutor(self.jobs, get_context("forkserver"))
+        self.workers = asyncio.Semaphore(self.jobs)
+        self.tasks: set[asyncio.Task[None]] = set()
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, path: str) -> None:
+        self.server = await asyncio.start_unix_server(self.connection, path)
+        self.spawn(self.dispatch())
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.pool.shutdown(cancel_futures=True)
+
+    def spawn(self, coroutine: Any) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def dispatch(self) -> None:
+        # take a batch from the queue whenever a worker is free
+        while True:
+            await self.workers.acquire()
+            jobs = [await self.queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.delay
+            while len(jobs) < self.batch:
+                timeout = deadline - asyncio.get_running_loop().time()
+                try:
+                    jobs.append(self.queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self.queue.get(), timeout))
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+            self.spawn(self.run(jobs))
+
+    async def run(self, jobs: list[Job]) -> None:
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self.pool, compile_batch, [i.path for i in jobs], self.options)
+            results = await future
+        except Exception as e:
+            results = [Result(i.path, error=f"{type(e).__name__}: {e}") for i in jobs]
+        finally:
+            self.workers.release()
+        for job, result in zip(jobs, results):
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # requests are read and queued in order, answers go out in the order files finish
+        answers: asyncio.Queue[Optional[Message]] = asyncio.Queue()
+        pending: set[asyncio.Task[None]] = set()
+
+        async def answer(request: Any, jobs: list[Job], binary: bool) -> None:
+            for future in asyncio.as_completed([i.future for i in jobs]):
+                result = await future
+                message: Message = {"id": request, "path": result.path, "error": result.error}
+                if binary and not result.error:
+                    message["ast"] = b64encode(result.binary()).decode("ascii")
+                await answers.put(message)
+            await answers.put({"id": request, "done": True})
+
+        async def send() -> None:
+            while (message := await answers.get()) is not None:
+                writer.write(json.dumps(message).encode() + b"\n")
+                await writer.drain()
+
+        sender = asyncio.ensure_future(send())
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    paths = [abspath(i) for i in request["paths"]]
+                except (ValueError, KeyError, TypeError) as e:
+                    await answers.put({"id": None, "error": f"Bad request: {type(e).__name__}: {e}"})
+                    continue
+                loop = asyncio.get_running_loop()
+                jobs = [Job(i, loop.create_future()) for i in paths]
+                task = asyncio.ensure_future(answer(request.get("id"), jobs, bool(request.get("binary"))))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                for job in jobs:
+                    # blocks while the queue is full, which stops this connection from being read
+                    await self.queue.put(job)
+            await asyncio.gather(*pending)
+        finally:
+            for task in pending:
+                task.cancel()
+            await answers.put(None)
+            # a client that went away early cannot be answered
+            await asyncio.gather(sender, return_exceptions=True)
+            writer.close()
+
+
+async def serve(options: Options, path: str, jobs: int, batch: int, queue: int) -> None:
+    service = Service(options, jobs, batch, queue)
+    await service.start(path)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+
+
+def main(args: Args) -> None:
+    options, jobs, flags = parse_options(args)
+    path = ""
+    batch = BATCH
+    queue = QUEUE
+    for i in flags:
+        if i.startswith("--socket="):
+            path = i[len("--socket=") :]
+        elif i.startswith("--batch="):
+            batch = int(i[len("--batch=") :])
+        elif i.startswith("--queue="):
+            queue = int(i[len("--queue=") :])
+    if not path:
+        raise SystemExit("njc.service needs --socket=PATH")
+    try:
+        asyncio.run(serve(options, path, jobs, batch, queue))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main(parse_args(sys.argv[1:]))
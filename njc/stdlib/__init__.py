@@ -0,0 +1,57 @@
+from os.path import dirname, join
+from typing import Optional
+
+from ..binary import dump, load
+from ..lexer import Lexer
+from ..lib import source, SourceFile, STDLIB
+from ..nodes import Root
+from ..parser import Parser
+
+DIRECTORY = dirname(__file__)
+NAMES = tuple(STDLIB.constants)
+# parsed modules, loaded on first import and kept for the life of the process
+modules: dict[str, Root] = {}
+
+
+def file_name(name: str) -> str:
+    # the file recorded in the tree, the same wherever the package is installed
+    return f"<stdlib>/{name}.nj"
+
+
+def parse(name: str) -> Root:
+    path = file_name(name)
+    source[path] = SourceFile.open(join(DIRECTORY, name + ".nj"))
+    try:
+        return Parser(Lexer(path).iter_tokens(), path).parse()
+    finally:
+        source.pop(path, None)
+
+
+def precompiled(name: str) -> Optional[Root]:
+    try:
+        with open(join(DIRECTORY, name + ".nja"), "rb") as f:
+            tree = load(f.read())
+    except (OSError, ValueError):
+        return None
+    return tree if isinstance(tree, Root) else None
+
+
+def module(name: str) -> Root:
+    # the shipped artifact costs a table lookup after the first import; parse the source only when the artifact
+    # is missing or from another format version
+    tree = modules.get(name)
+    if tree is None:
+        if name not in NAMES:
+            raise KeyError(f"{name} does not exist in stdlib")
+        tree = precompiled(name)
+        if tree is None:
+            tree = parse(name)
+        modules[name] = tree
+    return tree
+
+
+def build() -> None:
+    # regenerate the shipped artifacts from the sources
+    for name in NAMES:
+        with open(join(DIRECTORY, name + ".nja"), "wb") as f:
+            f.write(dump(parse(name)))
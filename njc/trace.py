@@ -0,0 +1,113 @@
+from collections import deque
+from time import perf_counter
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+F = TypeVar("F", bound=Callable[..., Any])
+
+# methods are only marked here; enable() swaps in the recording wrappers and disable() puts the originals
+# back, so a disabled tracer costs nothing on the parser's hot path
+classes: list[type] = []
+
+
+class Tracer:
+    def __init__(self, size: int = 10000, profile: bool = False) -> None:
+        self.records: deque[str] = deque(maxlen=size)
+        self.profile = profile
+        self.calls: dict[str, int] = {}
+        self.times: dict[str, float] = {}
+        self.depth: dict[str, int] = {}
+
+    def wrap(self, func: Callable[..., T], kind: str) -> Callable[..., T]:
+        name = func.__name__
+        records = self.records
+
+        if kind == "token":
+
+            def token(*args: Any, **kwargs: Any) -> T:
+                result = func(*args, **kwargs)
+                records.append(str(args[0].now))
+                return result
+
+            return token
+
+        def rule(*args: Any, **kwargs: Any) -> T:
+            records.append(f"into-> {name}")
+            if not self.profile:
+                result = func(*args, **kwargs)
+                records.append(f"<-exit {name}")
+                return result
+            self.calls[name] = self.calls.get(name, 0) + 1
+            depth = self.depth.get(name, 0)
+            self.depth[name] = depth + 1
+            start = perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                self.depth[name] = depth
+                # only the outermost call of a recursive rule adds to its cumulative time
+                if depth == 0:
+                    self.times[name] = self.times.get(name, 0.0) + perf_counter() - start
+            records.append(f"<-exit {name}")
+            return result
+
+        return rule
+
+    def report(self) -> str:
+        lines = [f"{'rule':<20} {'calls':>10} {'cumulative':>12}"]
+        for name in sorted(self.calls, key=lambda i: self.times.get(i, 0.0), reverse=True):
+            lines.append(f"{name:<20} {self.calls[name]:>10} {self.times.get(name, 0.0) * 1000:>10.3f}ms")
+        return "\n".join(lines)
+
+
+tracer: Optional[Tracer] = None
+originals: list[tuple[type, str, Callable[..., Any]]] = []
+
+
+def traceable(cls: type) -> type:
+    classes.append(cls)
+    if tracer is not None:
+        install(cls, tracer)
+    return cls
+
+
+def rule(func: F) -> F:
+    func.__trace__ = "rule"  # type: ignore[attr-defined]
+    return func
+
+
+def token(func: F) -> F:
+    # records the parser's current token after each call
+    func.__trace__ = "token"  # type: ignore[attr-defined]
+    return func
+
+
+def install(cls: type, tracer: Tracer) -> None:
+    for name, func in list(vars(cls).items()):
+        kind = getattr(func, "__trace__", None)
+        if kind is not None:
+            originals.append((cls, name, func))
+            setattr(cls, name, tracer.wrap(func, kind))
+
+
+def enable(size: int = 10000, profile: bool = False) -> Tracer:
+    global tracer
+    disable()
+    tracer = Tracer(size, profile)
+    for cls in classes:
+        install(cls, tracer)
+    return tracer
+
+
+def disable() -> None:
+    global tracer
+    while originals:
+        cls, name, func = originals.pop()
+        setattr(cls, name, func)
+    tracer = None
+
+
+def records() -> list[str]:
+    if tracer is None:
+        return []
+    return list(tracer.records)
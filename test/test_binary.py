@@ -0,0 +1,65 @@
+import unittest
+
+from njc.binary import dump, load, read_varint, write_varint
+from njc.lexer import Lexer
+from njc.lib import source
+from njc.parser import Parser
+
+
+class TestBinary(unittest.TestCase):
+    def setUp(self):
+        self.file = "test_file.nj"
+        source[self.file] = [
+            "import list;\n",
+            "var pointer<int> a = -1, b = @a;\n",
+            "function constant int main(int x) {\n",
+            "    var float f = (a + x) * 2.5 - g(x, [1, 2]);\n",
+            "    return !f == true;\n",
+            "}\n",
+        ]
+
+    def parse(self, expression="postfix"):
+        return Parser(Lexer(self.file).iter_tokens(), self.file, expression).parse()
+
+    def test_round_trip(self):
+        for expression in ("postfix", "tree"):
+            tree = self.parse(expression)
+            data = dump(tree)
+            self.assertEqual(repr(load(data)), repr(tree))
+            self.assertLess(len(data), len(repr(tree)) // 4)
+
+    def test_shared_nodes(self):
+        _, a, b, main = load(dump(self.parse())).value
+        self.assertIs(a.var_type, b.var_type)
+        self.assertIs(main.func_type, main.arguments[0].var_type)
+        self.assertIs(a.var_type.type_b[0], main.func_type)
+        self.assertIs(main.constant, True)
+
+    def test_long_operands(self):
+        # more strings and list items than fit in one varint byte
+        source[self.file] = [f"var int v{i} = {i};\n" for i in range(300)]
+        tree = self.parse()
+        self.assertEqual(repr(load(dump(tree))), repr(tree))
+        for n in (0, 127, 128, 300, 2**35):
+            out = bytearray()
+            write_varint(out, n)
+            self.assertEqual(read_varint(bytes(out), 0), (n, len(out)))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            load(b"ASTNode('root', [])")
+        with self.assertRaises(ValueError):
+            load(dump(self.parse())[:-40])
+        # cut anywhere, the header and string table included
+        data = dump(self.parse())
+        for n in range(len(data)):
+            with self.assertRaises(ValueError):
+                load(data[:n])
+        with self.assertRaises(ValueError):
+            load(b"NJA\x02")
+        with self.assertRaises(ValueError):
+            load(b"NJA\x02\x02\x04list\x03ma")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import pickle
+import unittest
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from njc.build import collect, compile_files, Options
+from njc.main import parse_args
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.root = self.directory.name
+        makedirs(join(self.root, "sub"))
+        makedirs(join(self.root, ".hidden"))
+        self.files = {
+            "b.nj": "var int b = 2;\n",
+            "a.nj": "var int a = 1;\n",
+            "sub/c.nj": "var int c = $;\n",
+            "sub/d.nj": "var int a = 1;\n",
+            "sub/notes.txt": "",
+            ".hidden/e.nj": "",
+        }
+        for name, code in self.files.items():
+            with open(join(self.root, name), "w") as f:
+                f.write(code)
+
+    def test_collect(self):
+        a = join(self.root, "a.nj")
+        files = collect([a, self.root])
+        self.assertEqual(files, [a, join(self.root, "b.nj"), join(self.root, "sub", "c.nj"), join(self.root, "sub", "d.nj")])
+
+    def test_parse_args(self):
+        args = parse_args([self.root, "-j", "3", "--jobs=2", join(self.root, "a.nj")])
+        self.assertEqual(args.paths, [self.root, join(self.root, "a.nj")])
+        self.assertEqual(args.flags, ["-j3", "--jobs=2"])
+
+    def test_compile_files(self):
+        paths = collect([self.root])
+        options = Options(cache_dir=join(self.root, ".cache"))
+        for jobs in (1, 2, 1):
+            results = compile_files(paths, options, jobs)
+            self.assertEqual([i.path for i in results], paths)
+            self.assertEqual([bool(i.error) for i in results], [False, False, True, False])
+            self.assertIn("Invalid character $", results[2].error)
+            # a.nj and sub/d.nj share a cache entry but keep their own file name
+            self.assertEqual([i.ast.file for i in results if not i.error], [paths[0], paths[1], paths[3]])
+        self.assertEqual(sum(i.stats.hits for i in results), 3)
+
+    def test_result_pickle(self):
+        (result,) = compile_files([join(self.root, "b.nj")], Options(cache_dir=""))
+        copy = pickle.loads(pickle.dumps(result))
+        self.assertEqual(repr(copy.ast), repr(result.ast))
+        self.assertEqual(copy.binary(), result.binary())
+
+
+if __name__ == "__main__":
+    unittest.main()
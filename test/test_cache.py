@@ -0,0 +1,73 @@
+import unittest
+from os import listdir, utime
+from tempfile import TemporaryDirectory
+
+from njc.cache import Cache
+from njc.lexer import Lexer
+from njc.lib import source
+from njc.parser import Parser
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.file = "test_file.nj"
+        source[self.file] = ["var pointer<int> a = 1, b;\n", "function int main(int x) {\n", "    return a + x;\n", "}\n"]
+        self.tree = Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_hit_and_miss(self):
+        cache = Cache(self.directory.name)
+        key = Cache.key(b"var int a;", "postfix")
+        self.assertNotEqual(key, Cache.key(b"var int a;", "tree"))
+        self.assertNotEqual(key, Cache.key(b"var int b;", "postfix"))
+        self.assertIsNone(cache.get(key))
+        cache.put(key, self.tree)
+        tree = cache.get(key)
+        self.assertEqual(repr(tree), repr(self.tree))
+        # shared type nodes stay shared within one tree
+        self.assertIs(tree.value[0].var_type, tree.value[1].var_type)
+        stats = cache.stats
+        self.assertEqual((stats.hits, stats.misses, stats.stores), (1, 1, 1))
+        self.assertEqual(stats.bytes_read, stats.bytes_written)
+        self.assertEqual(stats.bytes_written, cache.size())
+
+    def test_corrupt_entry(self):
+        cache = Cache(self.directory.name)
+        key = Cache.key(b"")
+        cache.put(key, self.tree)
+        with open(cache.path(key), "wb") as f:
+            f.write(b"\x80garbage")
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(listdir(self.directory.name), [])
+
+    def test_lru_eviction(self):
+        cache = Cache(self.directory.name)
+        keys = [Cache.key(str(i).encode()) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, self.tree)
+            utime(cache.path(key), ns=(i * 10**9, i * 10**9))
+        cache.get(keys[0])
+        # room for two entries: the least recently used one goes
+        cache.limit = cache.size() * 2 // 3
+        cache.evict()
+        self.assertEqual(sorted(listdir(self.directory.name)), sorted(k + ".ast" for k in (keys[0], keys[2])))
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_evict_on_put(self):
+        # the directory is only listed again once the bytes written pass the limit
+        cache = Cache(self.directory.name)
+        cache.put(Cache.key(b"0"), self.tree)
+        cache.limit = cache.size() * 5 // 2
+        calls = []
+        size = cache.size
+        cache.size = lambda: calls.append(1) or size()
+        for i in range(1, 5):
+            cache.put(Cache.key(str(i).encode()), self.tree)
+        self.assertEqual(calls, [])
+        self.assertEqual(len(listdir(self.directory.name)), 2)
+        self.assertEqual(cache.stats.evictions, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
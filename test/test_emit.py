@@ -0,0 +1,82 @@
+import json
+import sys
+import unittest
+from io import StringIO
+
+from njc.emit import write, write_jsonl, write_nodes, write_pretty, write_repr
+from njc.lexer import Lexer
+from njc.lib import source
+from njc.nodes import Binary, Expression, Int, to_ast
+from njc.parser import Parser
+
+
+class TestEmit(unittest.TestCase):
+    def setUp(self):
+        self.file = "test_file.nj"
+        source[self.file] = [
+            "import list;\n",
+            "var pointer<int> a = -1, b;\n",
+            "function int main(int x) {\n",
+            "    var str s = \"it's\" + f(x, [1, 2.5]);\n",
+            "    return !x == true;\n",
+            "}\n",
+        ]
+
+    def parse(self, expression="postfix"):
+        return Parser(Lexer(self.file).iter_tokens(), self.file, expression).parse()
+
+    def test_repr(self):
+        for expression in ("postfix", "tree"):
+            tree = self.parse(expression)
+            for node in (tree, to_ast(tree)):
+                stream = StringIO()
+                write_repr(node, stream)
+                self.assertEqual(stream.getvalue(), repr(tree))
+
+    def test_deep(self):
+        # far deeper than repr can recurse
+        depth = sys.getrecursionlimit() * 2
+        tree = Int("0")
+        for i in range(depth):
+            tree = Expression(Binary("+", tree, Int(str(i))))
+        stream = StringIO()
+        write_repr(tree, stream)
+        self.assertEqual(stream.getvalue().count("ASTNode('binary'"), depth)
+        stream = StringIO()
+        write_jsonl(tree, stream)
+        self.assertEqual(len(stream.getvalue().splitlines()), depth * 3 + 1)
+
+    def test_jsonl(self):
+        tree = self.parse()
+        stream = StringIO()
+        write(tree, stream, "jsonl")
+        lines = [json.loads(i) for i in stream.getvalue().splitlines()]
+        self.assertEqual([i["id"] for i in lines], list(range(len(lines))))
+        self.assertEqual(lines[0], {"id": 0, "parent": None, "key": None, "index": None, "type": "root", "file": self.file})
+        self.assertEqual(lines[1], {"id": 1, "parent": 0, "key": "value", "index": 0, "type": "import", "name": "list", "alias": "list"})
+        # every node but the root hangs off one that came before it
+        self.assertTrue(all(0 <= i["parent"] < i["id"] for i in lines[1:]))
+
+    def test_pretty(self):
+        stream = StringIO()
+        write_pretty(self.parse(), stream)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[:2], [f"root file='{self.file}'", "  value[0]: import name='list' alias='list'"])
+        self.assertIn("        value: int value='-1'", lines)
+
+
+    def test_nodes(self):
+        tree = self.parse()
+        for format in ("repr", "jsonl", "pretty"):
+            expected = StringIO()
+            write(tree, expected, format)
+            stream = StringIO()
+            write_nodes(Parser(Lexer(self.file).iter_tokens(), self.file).iter_parse(), self.file, stream, format)
+            self.assertEqual(stream.getvalue(), expected.getvalue())
+        stream = StringIO()
+        write_nodes([], self.file, stream)
+        self.assertEqual(stream.getvalue(), f"ASTNode('root', [], file = '{self.file}')\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from njc.build import Options
+from njc.imports import import_path, resolve
+from njc.lib import ImportCycleError
+
+
+class TestImports(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.root = self.directory.name
+        makedirs(join(self.root, "lib"))
+        # a diamond: main imports left and right, both import base
+        self.write("main.nj", 'import list;\nimport "lib/left" as left;\nimport "lib/right.nj" as right;\n')
+        self.write("lib/left.nj", 'import "base" as base;\nvar int l = 1;\n')
+        self.write("lib/right.nj", 'import "base" as base;\nvar int r = 2;\n')
+        self.write("lib/base.nj", "var int b = 3;\n")
+        self.options = Options(cache_dir="")
+
+    def write(self, name, code):
+        with open(join(self.root, name), "w") as f:
+            f.write(code)
+
+    def path(self, name):
+        return join(self.root, name)
+
+    def test_import_path(self):
+        main = self.path("main.nj")
+        self.assertEqual(import_path(main, '"lib/left"'), self.path("lib/left.nj"))
+        self.assertEqual(import_path(main, '"lib/../lib/left.nj"'), self.path("lib/left.nj"))
+        self.assertEqual(import_path(main, '"/abs/x"'), "/abs/x.nj")
+
+    def test_diamond(self):
+        for jobs in (1, 2):
+            graph = resolve([self.path("main.nj")], self.options, jobs)
+            self.assertEqual(list(graph.modules), sorted(self.path(i) for i in ("main.nj", "lib/left.nj", "lib/right.nj", "lib/base.nj")))
+            base = graph.modules[self.path("lib/base.nj")]
+            self.assertEqual(base.importers, [self.path("lib/left.nj"), self.path("lib/right.nj")])
+            self.assertEqual(
+                graph.levels(),
+                [[self.path("lib/base.nj")], [self.path("lib/left.nj"), self.path("lib/right.nj")], [self.path("main.nj")]],
+            )
+            self.assertEqual(graph.errors(), [])
+
+    def test_missing(self):
+        self.write("lib/base.nj", 'import "gone" as gone;\n')
+        graph = resolve([self.path("main.nj")], self.options, 1)
+        (missing,) = graph.errors()
+        self.assertEqual(missing.path, self.path("lib/gone.nj"))
+        self.assertIn("FileNotFoundError", missing.error)
+        self.assertEqual(graph.order()[0], missing.path)
+
+    def test_cycle(self):
+        self.write("lib/base.nj", 'import "../main" as main;\n')
+        graph = resolve([self.path("main.nj")], self.options, 1)
+        with self.assertRaises(ImportCycleError) as context:
+            graph.order()
+        self.assertEqual(
+            context.exception.cycle,
+            [self.path("lib/base.nj"), self.path("main.nj"), self.path("lib/left.nj"), self.path("lib/base.nj")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
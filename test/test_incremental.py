@@ -0,0 +1,86 @@
+import random
+import unittest
+
+from njc.incremental import Document
+from njc.lexer import Lexer
+from njc.lib import CompileError, source, SourceFile
+from njc.parser import Parser
+
+PROGRAM = """\
+import list;
+var int a = 0;
+constant int b = 1;
+// comment
+var pointer<int> p = @a;
+var float f = 1.5 * a + -b;
+
+function int main<T>(T x, int y) {
+    var int e = 4;
+    e = e + y * 2 - g(x, y) % 7;
+    return e;
+}
+/* block
+comment */
+var str s = "text";
+var char c = 'c';
+"""
+PIECES = ["", "a", "1", " ", "\n", ";", "}", "{", "(", "+ 2", "var int z = 3;\n", "function int h() {\n    return 1;\n}\n", "// note\n", "/*", '"', "@"]
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self.file = "test_file.nj"
+
+    def full(self, text):
+        # the tree of a parse from scratch, None when it fails
+        source[self.file] = SourceFile(self.file, text)
+        parser = Parser(Lexer(self.file).iter_tokens(), self.file)
+        nodes = []
+        try:
+            while (unit := parser.parse_unit()) is not None:
+                nodes.extend(unit)
+        except CompileError:
+            return None
+        return repr(nodes)
+
+    def test_edit(self):
+        document = Document(self.file, PROGRAM)
+        self.assertEqual(document.errors, [])
+        self.assertEqual(repr(document.ast.value), self.full(PROGRAM))
+        document.edit((2, 8), (2, 9), "count")
+        self.assertEqual(document.text, PROGRAM.replace("int a", "int count", 1))
+        self.assertEqual(document.ast.value[1].name, "count")
+        document.edit((9, 0), (9, 0), "    var int $;\n")
+        (error,) = document.errors
+        self.assertIn("Invalid character $", error)
+        self.assertIn("line 9", error)
+        document.edit((9, 12), (9, 13), "q")
+        self.assertEqual(document.errors, [])
+        self.assertEqual(repr(document.ast.value), self.full(document.text))
+
+    def test_random_edits(self):
+        rng = random.Random(16)
+        document = Document(self.file, PROGRAM)
+        for _ in range(400):
+            lines = document.text.split("\n")
+            line = rng.randrange(len(lines))
+            column = rng.randint(0, len(lines[line]))
+            end_line = min(line + rng.choice((0, 0, 0, 1)), len(lines) - 1)
+            end_column = rng.randint(column if end_line == line else 0, len(lines[end_line]))
+            document.edit((line + 1, column), (end_line + 1, end_column), rng.choice(PIECES))
+            if len(document.text) > 4 * len(PROGRAM) or document.text.count("/*") > document.text.count("*/"):
+                document = Document(self.file, PROGRAM)
+                continue
+            expected = self.full(document.text)
+            if expected is None:
+                self.assertTrue(document.errors)
+                # keep some broken documents around to edit them back into shape
+                if rng.random() < 0.5:
+                    document = Document(self.file, PROGRAM)
+            else:
+                self.assertEqual(document.errors, [])
+                self.assertEqual(repr(document.ast.value), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from io import StringIO
+from os.path import basename, join
+from tempfile import TemporaryDirectory
+
+from njc.interpreter import Interpreter, RunError
+from njc.lexer import Lexer
+from njc.lib import ImportCycleError, source
+from njc.parser import Parser
+
+
+class TestInterpreter(unittest.TestCase):
+    def setUp(self):
+        self.file = "test_file.nj"
+
+    def run_code(self, code, expression="postfix"):
+        source[self.file] = code.splitlines(keepends=True)
+        output = StringIO()
+        interpreter = Interpreter(expression, output)
+        tree = Parser(Lexer(self.file).iter_tokens(), self.file, expression, locations=interpreter.locations).parse()
+        result = interpreter.run(tree)
+        return result, output.getvalue()
+
+    def test_arithmetic(self):
+        code = "function int main() {\n    print(1 + 2 * 3, -7 / 2, -7 % 2, 7 / 2.0, 2 ** 10, 1 << 4, 3 == 3);\n    return 0;\n}\n"
+        for expression in ("postfix", "tree"):
+            self.assertEqual(self.run_code(code, expression), (0, "7 -3 -1 3.5 1024 16 true\n"))
+
+    def test_control_flow(self):
+        code = (
+            "var int total = 0;\n"
+            "function int main() {\n"
+            "    var int i = 0;\n"
+            "    while (i < 10) {\n"
+            "        i += 1;\n"
+            "        if (i == 3) { continue; } elif (i == 8) { break; }\n"
+            "        total += i;\n"
+            "    } else { print(\"not printed\"); }\n"
+            "    for outer (int j in range(0, 3, 1)) {\n"
+            "        for (int k in range(0, 3, 1)) {\n"
+            "            if (k == 2) { break outer; }\n"
+            "            print(j, k);\n"
+            "        }\n"
+            "    } else { print(\"not printed\"); }\n"
+            "    while (false) { } else { print(\"else\"); }\n"
+            "    return total;\n"
+            "}\n"
+        )
+        self.assertEqual(self.run_code(code), (25, "0 0\n0 1\nelse\n"))
+
+    def test_functions(self):
+        code = (
+            "import math;\n"
+            "var arr<int> xs = [3, 1, 2];\n"
+            "function int fib(int n) {\n"
+            "    if (n < 2) { return n; }\n"
+            "    return fib(n - 1) + fib(n - 2);\n"
+            "}\n"
+            "function void bump(pointer<int> p) {\n"
+            "    ^p += 10;\n"
+            "}\n"
+            "function int main() {\n"
+            "    var int v = 5;\n"
+            "    bump(@v);\n"
+            "    xs[1] = xs[0] * 2;\n"
+            "    print(fib(15), v, xs, xs.length, math.square(3.0));\n"
+            "}\n"
+        )
+        self.assertEqual(self.run_code(code), (None, "610 15 [3, 6, 2] 3 9.0\n"))
+
+    def test_top_level_statements(self):
+        code = "var int a = 1;\nprint(a);\na += 4;\nfunction void main() {\n    print(a);\n}\n"
+        self.assertEqual(self.run_code(code), (None, "1\n5\n"))
+
+    def test_errors(self):
+        with self.assertRaises(RunError):
+            self.run_code("var int a = b;\n")
+        with self.assertRaises(RunError):
+            self.run_code("function void main() {\n    break;\n}\n")
+        with self.assertRaises(RunError):
+            self.run_code("function void f(int a) {\n}\nfunction void main() {\n    f();\n}\n")
+        # errors of the running program are reported at the statement they come from
+        with self.assertRaises(RunError) as context:
+            self.run_code("function int main() { return 1 / 0; }\n")
+        self.assertIn('line 1, in 22\nZeroDivisionError', str(context.exception))
+        code = "var arr<int> xs = [1, 2];\nfunction void main() {\n    var int i = 2;\n    if (i > 0) {\n        xs[i] = 3;\n        print(i);\n    }\n}\n"
+        with self.assertRaises(RunError) as context:
+            self.run_code(code)
+        self.assertIn("line 5, in 8\nIndexError", str(context.exception))
+        with self.assertRaises(RunError) as context:
+            self.run_code("function int f(int n) {\n    return f(n + 1);\n}\nfunction int main() {\n    return f(0);\n}\n")
+        self.assertIn("maximum recursion depth exceeded", str(context.exception))
+
+    def test_import_cycle(self):
+        with TemporaryDirectory() as directory:
+            for name, imported in (("a", "b"), ("b", "c"), ("c", "a")):
+                with open(join(directory, name + ".nj"), "w") as f:
+                    f.write(f'import "{imported}" as {imported};\n')
+            interpreter = Interpreter()
+            with self.assertRaises(ImportCycleError) as context:
+                interpreter.run(interpreter.parse(join(directory, "a.nj")))
+            self.assertEqual([basename(i) for i in context.exception.cycle], ["a.nj", "b.nj", "c.nj", "a.nj"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
 import unittest
+from os import remove
+from os.path import dirname, join
+from tempfile import NamedTemporaryFile
 
-from njc.lexer import Lexer
-from njc.lib import Token, source, CompileError
+from njc.lexer import Lexer, split
+from njc.lib import CODES, KIND_CODE, Token, source, SourceFile, CompileError
 
 
 class TestLexer(unittest.TestCase):
@@ -61,6 +64,115 @@ class TestLexer(unittest.TestCase):
             lexer.lex()
         self.assertIn("Invalid character @", str(context.exception))
 
+    def test_engines_equivalent(self):
+        with open(join(dirname(dirname(__file__)), "example.nj"), "r") as f:
+            code = f.readlines()
+        code.append("a-1 -2.5 x**=y /*/ '\n' 1..2 \"s\" // end")
+        result = []
+        for engine in ("state", "regex", "table"):
+            source[self.file] = code.copy()
+            result.append([(t.type, t.content, t.location) for t in Lexer(self.file, engine).lex()])
+        self.assertEqual(result[0], result[1])
+        self.assertEqual(result[1], result[2])
+
+    def test_table_engine(self):
+        # the corners of the regex engine: characters outside ASCII, unterminated literals and the error checks
+        cases = ["a\u3000b\xa0'é' \"ü\" /* ö */", "x = \"open", "/* open", "// end", "'", "'a", "a $", "é", "'ab'", "''", "'é"]
+        for code in cases:
+            result = []
+            for engine in ("regex", "table"):
+                source[self.file] = SourceFile(self.file, code)
+                try:
+                    result.append(list(Lexer(self.file, engine).scan()))
+                except CompileError as e:
+                    result.append((e.message, e.location))
+            self.assertEqual(result[0], result[1], code)
+
+    def test_iter_tokens_is_lazy(self):
+        source[self.file] = ["var int a = 10;\n", "$"]
+        tokens = Lexer(self.file).iter_tokens()
+        self.assertEqual(next(tokens), Token("keyword", "var"))
+        with self.assertRaises(CompileError):
+            list(tokens)
+
+    def test_token_buffer(self):
+        expected = [(t.type, t.content, t.location) for t in Lexer(self.file).lex()]
+        buffer = Lexer(self.file).lex_buffer()
+        self.assertEqual([(t.type, t.content, t.location) for t in buffer], expected)
+        self.assertEqual(len(buffer), len(expected))
+        self.assertEqual(buffer[-1], Token("symbol", "}"))
+        self.assertEqual(buffer[2].file, self.file)
+
+    def test_offset_locations(self):
+        source[self.file] = SourceFile(self.file, "var int a = 10;\nif (a >= 5) {\n")
+        tokens = Lexer(self.file).lex()
+        self.assertEqual(tokens[9].offset, 22)
+        self.assertEqual(tokens[9].length, 2)
+        self.assertIsNone(source[self.file]._starts)
+        self.assertEqual(tokens[9].location, (2, 6))
+        self.assertEqual(tokens[9].line, 1)
+        self.assertEqual(source[self.file].line(2), "if (a >= 5) {\n")
+
+    def test_mapped_source(self):
+        with NamedTemporaryFile("w", encoding="utf-8", suffix=".nj", delete=False) as f:
+            f.write('var str s = "héllo"; /* ünïcode */ char c = \'é\';\n')
+        try:
+            source[f.name] = SourceFile.open(f.name)
+            tokens = Lexer(f.name).lex()
+        finally:
+            remove(f.name)
+        self.assertIsNone(tokens[4]._content)
+        self.assertEqual(tokens[4].content, '"héllo"')
+        self.assertEqual(tokens[6].content, "/* ünïcode */")
+        self.assertEqual(tokens[10].content, "'é'")
+        self.assertEqual(tokens[10].location, (1, 46))
+        self.assertEqual(tokens[11].location, (1, 47))
+
+    def test_token_codes(self):
+        tokens = Lexer(self.file).lex()
+        self.assertEqual(tokens[0].code, CODES["var"])
+        self.assertEqual(tokens[3].code, CODES["="])
+        self.assertEqual(tokens[2].code, KIND_CODE["identifier"])
+        self.assertEqual([t.code for t in Lexer(self.file).lex_buffer()], [t.code for t in tokens])
+        self.assertEqual([t.code for t in Lexer(self.file, "state").lex()], [t.code for t in tokens])
+
+    def test_char_constant_errors(self):
+        for engine in ("state", "regex", "table"):
+            source[self.file] = ["var char c = 'ab';"]
+            with self.assertRaises(CompileError) as context:
+                Lexer(self.file, engine).lex()
+            self.assertIn("Character constant too long", str(context.exception))
+            self.assertEqual(context.exception.location, (1, 15))
+
+    def test_split(self):
+        code = 'var str s = "a\nb";\n/* c\n\n */ x = \'\n\';\n// d\n' * 20
+        data = code.encode()
+        points = split(data, 8)
+        self.assertEqual((points[0], points[-1]), (0, len(data)))
+        self.assertGreater(len(points), 2)
+        source[self.file] = SourceFile(self.file, code)
+        tokens = Lexer(self.file).lex()
+        for i in points[1:-1]:
+            # the start of a line, and no token runs over it
+            self.assertEqual(data[i - 1], ord("\n"))
+            self.assertFalse(any(t.offset < i < t.offset + t.length for t in tokens))
+
+    def test_parallel(self):
+        source[self.file] = SourceFile(self.file, 'var str s = "a\nb"; /* c\n */ char c = \'é\';\n# d\nf(-1.5);\n' * 50)
+        expected = Lexer(self.file).lex_buffer()
+        buffer = Lexer(self.file).lex_parallel(2, 64)
+        self.assertEqual((buffer.codes, buffer.offsets, buffer.lengths), (expected.codes, expected.offsets, expected.lengths))
+        buffer = Lexer(self.file, "table").lex_parallel(2, 64)
+        self.assertEqual((buffer.codes, buffer.offsets, buffer.lengths), (expected.codes, expected.offsets, expected.lengths))
+        self.assertEqual([t.location for t in buffer], [t.location for t in expected])
+
+    def test_parallel_error(self):
+        source[self.file] = SourceFile(self.file, "var int a = 1;\n" * 50 + "var int b = $;\n" + "var int c = 2;\n" * 50)
+        with self.assertRaises(CompileError) as context:
+            Lexer(self.file).lex_parallel(2, 64)
+        self.assertIn("Invalid character $", str(context.exception))
+        self.assertEqual(context.exception.location, (51, 12))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,88 @@
+import subprocess
+import sys
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from njc.main import parse_args, parse_options, run
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = join(self.directory.name, "a.nj")
+        with open(self.path, "w") as f:
+            f.write("var int a = 1;\n")
+
+    def output(self, *argv):
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            run(list(argv))
+        return stdout.getvalue()
+
+    def test_lazy_imports(self):
+        code = "import sys, njc.main; print(sorted(i for i in sys.modules if i.startswith(('njc.', 'concurrent'))))"
+        modules = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(modules.strip(), "['njc.lib', 'njc.main']")
+
+    def test_parse_options(self):
+        options, jobs, flags = parse_options(parse_args(["--lexer=table", "--expression=tree", "--no-cache", "-j", "3", "--stream"]))
+        self.assertEqual((options.engine, options.expression, options.cache_dir, jobs, flags), ("table", "tree", "", 3, ["--stream"]))
+        options, jobs, flags = parse_options(parse_args(["--cache=dir"]), 1)
+        self.assertEqual((options.cache_dir, jobs, flags), ("dir", 1, []))
+
+    def test_commands(self):
+        self.assertIn("usage: njc", self.output())
+        self.assertEqual(self.output("lex", self.path).splitlines()[:2], ["1:0 keyword 'var'", "1:4 keyword 'int'"])
+        tree = self.output("parse", self.path, "--no-cache")
+        self.assertTrue(tree.startswith("ASTNode('root'"))
+        self.assertEqual(self.output(self.path, "--no-cache"), tree)
+        self.assertEqual(self.output("check", self.path, "--no-cache"), "")
+        self.output("dump-ast", self.path, "--no-cache")
+        with open(self.path + "a", "rb") as f:
+            self.assertTrue(f.read().startswith(b"NJA"))
+
+    def test_parse_error(self):
+        with open(self.path, "w") as f:
+            f.write("var int a = 1\n")
+        # the error goes to stderr, a failed parse writes nothing to stdout
+        for argv in (["parse", self.path, "--no-cache"], ["check", self.path, "--no-cache"]):
+            stdout = StringIO()
+            with self.assertRaises(SystemExit) as e, redirect_stdout(stdout):
+                run(argv)
+            self.assertEqual(e.exception.code, 1)
+            self.assertEqual(stdout.getvalue(), "")
+
+    def test_missing_paths(self):
+        # a path that does not exist, or none at all, is reported without running the command
+        for argv in (["parse", join(self.directory.name, "b.nj")], ["check", "b.nj", self.path], ["lex", "--no-cache"], ["run"], ["--no-cache"]):
+            stdout = StringIO()
+            with self.assertRaises(SystemExit) as e, redirect_stdout(stdout):
+                run(argv)
+            self.assertEqual(e.exception.code, 2)
+            self.assertEqual(stdout.getvalue(), "")
+
+    def test_bad_flags(self):
+        for flag in ("--format=bogus", "-jx", "--jobs=", "--trace=x", "--lexer=bogus", "--expression=bogus"):
+            stdout = StringIO()
+            with self.assertRaises(SystemExit) as e, redirect_stdout(stdout):
+                run(["parse", self.path, "--no-cache", flag])
+            self.assertEqual(e.exception.code, 2)
+            self.assertEqual(stdout.getvalue(), "")
+
+    def test_run(self):
+        with open(self.path, "w") as f:
+            f.write("var int a = 1;\nfunction int main() {\n    print(a + 1);\n    return a;\n}\n")
+        with self.assertRaises(SystemExit) as e:
+            self.output("run", self.path, "--no-cache")
+        self.assertEqual(e.exception.code, 1)
+        with open(self.path, "w") as f:
+            f.write("var int a = 2 + 1;\nfunction void main() {\n    print(a);\n}\n")
+        self.assertEqual(self.output("run", self.path, "--no-cache"), "3\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from njc.lexer import Lexer
+from njc.lib import ASTNode, source
+from njc.nodes import Call, Expression, from_ast, Function, Interner, Root, Term, to_ast, Variable, VarDecl
+from njc.parser import Parser
+
+
+class TestNodes(unittest.TestCase):
+    def setUp(self):
+        self.file = "test_file.nj"
+        source[self.file] = ["var int a = f(1), b;\n", "function int main(int x) {\n", "    return a[x];\n", "}\n"]
+
+    def test_typed_fields(self):
+        ast = Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        self.assertIsInstance(ast, Root)
+        a, b, main = ast.value
+        assert isinstance(a, VarDecl) and isinstance(b, VarDecl) and isinstance(main, Function)
+        self.assertEqual((a.name, a.var_type.type_a, b.expression.type), ("a", "int", "None"))
+        assert isinstance(a.expression, Expression) and isinstance(a.expression.value, list)
+        term = a.expression.value[0]
+        assert isinstance(term, Term) and isinstance(term.value, Call)
+        self.assertEqual(term.value.var.value, "f")
+        self.assertEqual(main.arguments[0].name, "x")
+        self.assertFalse(hasattr(a, "__dict__"))
+
+    def test_ast_view(self):
+        ast = Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        call = ast.value[0].expression.value[0].value
+        self.assertEqual(list(call.args), ["var", "types", "args"])
+        self.assertEqual(Variable("a").args, {"value": "a"})
+        old = to_ast(ast)
+        self.assertIsInstance(old, ASTNode)
+        self.assertEqual(repr(old), repr(ast))
+        self.assertEqual(repr(from_ast(old)), repr(ast))
+
+    def test_interned(self):
+        source[self.file] = ["var pointer<int> a;\n", "var pointer<int> b;\n", "var pointer<float> c;\n", "function int f(int a) {\n", "}\n"]
+        interner = Interner()
+        a, b, c, f = Parser(Lexer(self.file).iter_tokens(), self.file, interner=interner).parse().value
+        self.assertIs(a.var_type, b.var_type)
+        self.assertIsNot(a.var_type, c.var_type)
+        self.assertIs(a.var_type.type_b[0], f.func_type)
+        self.assertIs(f.arguments[0].var_type, f.func_type)
+        self.assertIs(f.arguments[0].name, a.name)
+        source["other.nj"] = ["var pointer<int> d;\n"]
+        (d,) = Parser(Lexer("other.nj").iter_tokens(), "other.nj", interner=interner).parse().value
+        self.assertIs(d.var_type, a.var_type)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
 
+from njc.lexer import Lexer
 from njc.parser import Parser
 from njc.lib import Token, ASTNode, source, CompileError
+from njc.nodes import Function, VarDecl
 
 
 class TestParser(unittest.TestCase):
@@ -51,8 +53,8 @@ class TestParser(unittest.TestCase):
         )
         assert isinstance(ast.args["value"], list)
         assert len(ast.args["value"]) > 0
-        assert isinstance(ast.args["value"][0], ASTNode)
-        self.assertEqual(ast.args["value"][0], expected_ast)
+        assert isinstance(ast.args["value"][0], VarDecl)
+        self.assertEqual(repr(ast.args["value"][0]), repr(expected_ast.args["value"][0]))
 
     def test_parse_function(self):
         parser = Parser(self.tokens, self.file)
@@ -86,8 +88,8 @@ class TestParser(unittest.TestCase):
         )
         assert isinstance(ast.args["value"], list)
         assert len(ast.args["value"]) > 1
-        assert isinstance(ast.args["value"][0], ASTNode)
-        self.assertEqual(ast.args["value"][1], expected_ast)
+        assert isinstance(ast.args["value"][1], Function)
+        self.assertEqual(repr(ast), repr(expected_ast))
 
     def test_invalid_syntax(self):
         source[self.file] = ["var int = ;"]
@@ -102,6 +104,126 @@ class TestParser(unittest.TestCase):
             parser.parse()
         self.assertIn("Expected identifier after variable type", str(context.exception))
 
+    def test_parse_token_stream(self):
+        expected = repr(Parser(self.tokens, self.file).parse())
+        self.assertEqual(repr(Parser(iter(self.tokens), self.file).parse()), expected)
+
+    def test_parse_lexer_stream(self):
+        source[self.file] = ["var int a = 10;\n", "function int main() {\n", "    return a;\n", "}\n"]
+        ast = Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        self.assertEqual(repr(ast), repr(Parser(self.tokens, self.file).parse()))
+
+    def test_parse_token_buffer(self):
+        source[self.file] = ["var int a = -1, b = @a;\n", "function int main() {\n", "    return (a + b) * 2;\n", "}\n"]
+        expected = repr(Parser(Lexer(self.file, "state").lex(), self.file).parse())
+        self.assertEqual(repr(Parser(Lexer(self.file).lex_buffer(), self.file).parse()), expected)
+        self.assertEqual(repr(Parser(Lexer(self.file).iter_tokens(), self.file).parse()), expected)
+
+    def test_lexer_error_in_stream(self):
+        source[self.file] = ["var int a = 10;\n", "var int b = $;\n"]
+        with self.assertRaises(CompileError) as context:
+            Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        self.assertIn("Invalid character $", str(context.exception))
+
+    def test_iter_parse(self):
+        source[self.file] = ["import list;\n", "var int a = 10, b;\n", "function int main() {\n", "    return a;\n", "}\n"]
+        nodes = Parser(Lexer(self.file).iter_tokens(), self.file).iter_parse()
+        self.assertEqual(next(nodes).type, "import")
+        self.assertEqual([i.type for i in nodes], ["var", "var", "function"])
+        tree = Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        self.assertEqual(repr(list(Parser(Lexer(self.file).iter_tokens(), self.file).iter_parse())), repr(tree.value))
+
+    def test_iter_parse_error(self):
+        # the nodes before the error are still handed out
+        source[self.file] = ["var int a = 10;\n", "var int = ;\n"]
+        nodes = Parser(Lexer(self.file).iter_tokens(), self.file).iter_parse()
+        self.assertEqual(next(nodes).type, "var")
+        with self.assertRaises(CompileError):
+            next(nodes)
+
+    def test_unexpected_end(self):
+        source[self.file] = ["var int a = 1;\n", "var int b = 2\n", "// end\n"]
+        with self.assertRaises(CompileError) as context:
+            Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        self.assertIn("Unexpected end of file after '2'", str(context.exception))
+        self.assertEqual(context.exception.location, (2, 13))
+
+    def test_top_level_statements(self):
+        source[self.file] = ["import math;\n", "print(1);\n", "a = 2;\n", "if (a) { }\n"]
+        ast = Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        self.assertEqual([i.type for i in ast.args["value"]], ["import", "expression", "expression", "if"])
+        for code, message in ((["a = 1\n", "b = 2;\n"], "Expected ';' after expression"), (["class A { }\n"], "Classes are not supported yet")):
+            source[self.file] = code
+            with self.assertRaises(CompileError) as context:
+                Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+            self.assertIn(message, str(context.exception))
+
+    def test_control_flow(self):
+        source[self.file] = [
+            "function void main() {\n",
+            "    if (a) { break; } elif (b) { } else { continue; }\n",
+            "    for outer (int i in xs) { break outer; } else { }\n",
+            "    while (a) { } else { }\n",
+            "}\n",
+        ]
+        body = Parser(Lexer(self.file).iter_tokens(), self.file).parse().args["value"][0].args["body"]
+        self.assertEqual([i.type for i in body], ["if", "for", "while"])
+        branch = body[0].args["else_body"]
+        self.assertEqual([i.type for i in branch], ["if"])
+        self.assertEqual(branch[0].args["else_body"][0].type, "continue")
+        loop = body[1].args
+        self.assertEqual((loop["label"], loop["var"].args["name"], loop["body"][0].args["label"]), ("outer", "i", "outer"))
+
+    def test_type_arguments(self):
+        source[self.file] = [
+            "var int a = f<int, pointer<str>, char>(1);\n",
+            "var tuple<int, str, char> t;\n",
+            "function void main<T, U, V>() {\n",
+            "    pass;\n",
+            "    b = {1: 2, 3: 4};\n",
+            "}\n",
+        ]
+        ast = Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        call = ast.args["value"][0].args["expression"].args["value"][0].args["value"]
+        self.assertEqual([i.args["type_a"] for i in call.args["types"]], ["int", "pointer", "char"])
+        self.assertEqual([i.args["type_a"] for i in ast.args["value"][1].args["var_type"].args["type_b"]], ["int", "str", "char"])
+        function = ast.args["value"][2]
+        self.assertEqual([i.args["name"] for i in function.args["type_var"]], ["T", "U", "V"])
+        self.assertEqual(function.args["body"][0].type, "pass")
+
+    def test_less_than(self):
+        # "<" after a name opens type arguments only when a matching ">" is followed by "("
+        source[self.file] = ["var bool c = a < b;\n", "var bool d = a < b > (c);\n", "var int e = f<int, arr<int> >(1) < g<str>();\n"]
+        ast = Parser(Lexer(self.file).iter_tokens(), self.file, "tree").parse()
+        c, d, e = (i.args["expression"].args["value"] for i in ast.args["value"])
+        self.assertEqual((c.type, c.args["value"]), ("binary", "<"))
+        self.assertEqual(d.args["value"].args["var"].args["value"], "a")
+        self.assertEqual((e.args["left"].args["value"].type, e.args["value"], e.args["right"].args["value"].type), ("call", "<", "call"))
+
+    def test_postfix_power(self):
+        source[self.file] = ["var int a = 1 + 2 ** 3 * 2;\n"]
+        ast = Parser(Lexer(self.file).iter_tokens(), self.file).parse()
+        postfix = [i.args["value"] if i.type == "operator" else i.args["value"].args["value"] for i in ast.args["value"][0].args["expression"].args["value"]]
+        self.assertEqual(postfix, ["1", "2", "3", "**", "2", "*", "+"])
+
+    def test_expression_tree(self):
+        def shape(node):
+            if node.type == "binary":
+                return f"({shape(node.args['left'])} {node.args['value']} {shape(node.args['right'])})"
+            if node.type in ("term", "expression"):
+                return shape(node.args["value"])
+            return str(node.args["value"])
+
+        source[self.file] = ["var int a = b = c = d ** e ** 2 - f - 1 * g + (h - i) << 2;\n"]
+        ast = Parser(Lexer(self.file).iter_tokens(), self.file, "tree").parse()
+        assert isinstance(ast.args["value"], list)
+        self.assertEqual(
+            shape(ast.args["value"][0].args["expression"]),
+            "(b = (c = (((((d ** (e ** 2)) - f) - (1 * g)) + (h - i)) << 2)))",
+        )
+        with self.assertRaises(ValueError):
+            Parser(self.tokens, self.file, "infix")
+
 
 if __name__ == "__main__":
     unittest.main()
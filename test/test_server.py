@@ -0,0 +1,61 @@
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+from threading import Thread
+
+from njc.build import Options
+from njc.server import Client, listen, path_uri, Server
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = join(self.directory.name, "a.nj")
+        with open(self.path, "w") as f:
+            f.write("var int a = 1;\n")
+        self.server = Server(Options(cache_dir=""))
+        self.sent = []
+
+    def call(self, method, params, id=1):
+        self.sent.clear()
+        self.server.handle({"jsonrpc": "2.0", "id": id, "method": method, "params": params}, self.sent.append)
+        return self.sent[-1]
+
+    def test_documents(self):
+        uri = path_uri(self.path)
+        self.call("textDocument/didOpen", {"textDocument": {"uri": uri, "text": "var int a = 1;\nvar int b = 2;\n"}})
+        (published,) = self.sent[:-1]
+        self.assertEqual(published["params"]["diagnostics"], [])
+        change = {"range": {"start": {"line": 1, "character": 12}, "end": {"line": 1, "character": 13}}, "text": "$"}
+        self.call("textDocument/didChange", {"textDocument": {"uri": uri}, "contentChanges": [change]})
+        (diagnostic,) = self.sent[0]["params"]["diagnostics"]
+        self.assertEqual(diagnostic["range"]["start"], {"line": 1, "character": 12})
+        self.assertIn("Invalid character $", diagnostic["message"])
+        change["text"] = "3"
+        self.call("textDocument/didChange", {"textDocument": {"uri": uri}, "contentChanges": [change]})
+        ast = self.call("njc/parse", {"uri": uri})["result"]["ast"]
+        self.assertIn("'b'", ast)
+        self.assertIn("'3'", ast)
+
+    def test_errors(self):
+        self.assertEqual(self.call("njc/nothing", {})["error"]["code"], -32601)
+        self.assertEqual(self.call("njc/parse", {})["error"]["code"], -32602)
+
+    def test_socket(self):
+        listener = listen(self.server, join(self.directory.name, "njc.sock"))
+        self.addCleanup(listener.server_close)
+        Thread(target=listener.serve_forever, daemon=True).start()
+        self.addCleanup(listener.shutdown)
+        client = Client(join(self.directory.name, "njc.sock"))
+        self.addCleanup(client.close)
+        self.assertEqual(client.request("initialize", {})["serverInfo"]["name"], "njc")
+        self.assertEqual(client.request("njc/compile", {"paths": [self.path]}), [{"path": self.path, "error": ""}])
+        # the second compile is answered from memory
+        first = self.server.results[self.path]
+        client.request("njc/compile", {"paths": [self.path]})
+        self.assertIs(self.server.results[self.path], first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import asyncio
+import json
+import unittest
+from base64 import b64decode
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from njc.binary import load
+from njc.build import Options
+from njc.service import Service
+
+
+class TestService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.paths = []
+        for i in range(5):
+            path = join(self.directory.name, f"m{i}.nj")
+            with open(path, "w") as f:
+                f.write(f"var int a{i} = {i};\n" if i != 3 else "var int a = $;\n")
+            self.paths.append(path)
+        # a queue smaller than one request, so its files have to wait for room
+        self.service = Service(Options(cache_dir=""), jobs=1, batch=2, queue=2)
+        self.socket = join(self.directory.name, "njc.sock")
+        await self.service.start(self.socket)
+
+    async def asyncTearDown(self):
+        await self.service.close()
+
+    async def test_stream(self):
+        reader, writer = await asyncio.open_unix_connection(self.socket)
+        writer.write(json.dumps({"id": 1, "paths": self.paths, "binary": True}).encode() + b"\n")
+        writer.write(json.dumps({"id": 2, "paths": self.paths[:1]}).encode() + b"\n")
+        writer.write(b"not json\n")
+        writer.write_eof()
+        answers = [json.loads(line) async for line in reader]
+        writer.close()
+        self.assertIn({"id": 1, "done": True}, answers)
+        self.assertIn({"id": 2, "done": True}, answers)
+        self.assertIsNone(next(i for i in answers if "done" not in i and i["id"] is None)["id"])
+        first = {i["path"]: i for i in answers if i["id"] == 1 and "path" in i}
+        self.assertEqual(sorted(first), sorted(self.paths))
+        self.assertIn("Invalid character $", first[self.paths[3]]["error"])
+        tree = load(b64decode(first[self.paths[0]]["ast"]))
+        self.assertEqual(tree.value[0].name, "a0")
+        # each request ends with its done line
+        self.assertEqual(answers.index({"id": 1, "done": True}), max(i for i, a in enumerate(answers) if a["id"] == 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from njc import stdlib
+from njc.binary import dump
+from njc.build import Options
+from njc.imports import resolve
+
+
+class TestStdlib(unittest.TestCase):
+    def setUp(self):
+        stdlib.modules.clear()
+
+    def test_artifacts_up_to_date(self):
+        # run `python -m njc.stdlib` after changing a stdlib source or the binary format
+        for name in stdlib.NAMES:
+            with open(join(stdlib.DIRECTORY, name + ".nja"), "rb") as f:
+                self.assertEqual(f.read(), dump(stdlib.parse(name)), name)
+
+    def test_lazy_and_memoised(self):
+        self.assertEqual(stdlib.modules, {})
+        math = stdlib.module("math")
+        self.assertEqual(list(stdlib.modules), ["math"])
+        self.assertIs(stdlib.module("math"), math)
+        self.assertEqual(math.file, "<stdlib>/math.nj")
+        self.assertEqual([i.name for i in math.value[:3]], ["PI", "E", "TAU"])
+        with self.assertRaises(KeyError):
+            stdlib.module("os")
+
+    def test_imported_by_program(self):
+        with TemporaryDirectory() as directory:
+            path = join(directory, "main.nj")
+            with open(path, "w") as f:
+                f.write("import random;\nimport list;\nimport random;\nvar int a = 1;\n")
+            graph = resolve([path], Options(cache_dir=""), 1)
+        self.assertEqual(list(graph.stdlib), ["random", "list"])
+        self.assertEqual(graph.modules[path].stdlib, ["random", "list"])
+        self.assertEqual(sorted(stdlib.modules), ["list", "random"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from njc import trace
+from njc.lib import Token
+from njc.parser import Parser
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.file = "test_file.nj"
+        self.tokens = [
+            Token("keyword", "var", self.file, (1, 0)),
+            Token("keyword", "int", self.file, (1, 4)),
+            Token("identifier", "a", self.file, (1, 8)),
+            Token("symbol", "=", self.file, (1, 10)),
+            Token("int", "10", self.file, (1, 12)),
+            Token("symbol", ";", self.file, (1, 14)),
+        ]
+
+    def tearDown(self):
+        trace.disable()
+
+    def test_disabled_is_unwrapped(self):
+        self.assertIsNone(trace.tracer)
+        self.assertIs(Parser.parse_var, vars(Parser)["parse_var"])
+        self.assertEqual(getattr(Parser.parse_var, "__trace__"), "rule")
+        Parser(self.tokens, self.file).parse()
+        self.assertEqual(trace.records(), [])
+
+    def test_ring_buffer(self):
+        original = Parser.parse_var
+        trace.enable(size=4)
+        self.assertIsNot(Parser.parse_var, original)
+        Parser(self.tokens, self.file).parse()
+        self.assertEqual(trace.records(), ["<symbol> ; (1, 14)", "<-exit parse_expression", "<-exit parse_var", "<-exit parse_statement"])
+        trace.disable()
+        self.assertIs(Parser.parse_var, original)
+
+    def test_profile(self):
+        tracer = trace.enable(profile=True)
+        Parser(self.tokens, self.file).parse()
+        self.assertEqual(tracer.calls["parse_var"], 1)
+        self.assertEqual(tracer.calls["parse_term"], 1)
+        self.assertGreater(tracer.times["parse_statement"], 0)
+        self.assertIn("parse_var", tracer.report())
+
+
+if __name__ == "__main__":
+    unittest.main()